@@ -1,15 +1,109 @@
+import asyncio
+import logging
+import os
+import re
+from collections import defaultdict
 from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta, timezone
+import orjson
 from langchain_openai import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate
-from pydantic import BaseModel, Field
+from langchain_core.messages import HumanMessage, SystemMessage
+from pydantic import BaseModel, Field, ValidationError
 
 from agents.data_agent import WeatherAnalysis
 from agents.forecast_agent import ForecastAnalysis, WeatherInsight
+from services.llm_cache import LLMResponseCache
+from services.llm_throttle import LLMThrottle
+from services.structured_output import json_mode_structured_output
+
+logger = logging.getLogger(__name__)
 
 # Setup timezone (GMT+8 for Philippines)
 PHILIPPINE_TZ = timezone(timedelta(hours=8))
 
+# Audiences whose prompts are generated ahead of the first request
+KNOWN_AUDIENCES = ("general", "farmers", "officials", "general_public")
+DEFAULT_PROMPT_CACHE_PATH = os.path.expanduser("~/.cache/advice_prompts.json")
+
+# Shared across AdviceAgent instances so batch runs stay within provider limits
+DEFAULT_LLM_THROTTLE = LLMThrottle(
+    max_concurrency=int(os.getenv("ADVICE_MAX_CONCURRENCY", "10")),
+    requests_per_minute=float(os.getenv("ADVICE_REQUESTS_PER_MINUTE", "0")) or None
+)
+
+
+def _keyword_pattern(*keywords: str) -> re.Pattern:
+    """Compile a case-insensitive substring alternation for keyword checks"""
+    return re.compile("|".join(re.escape(k) for k in keywords), re.IGNORECASE)
+
+
+# Keyword patterns used to classify recommendation text
+CRITICAL_PRIORITY_RE = _keyword_pattern('urgent', 'critical', 'danger', 'warning')
+HIGH_PRIORITY_RE = _keyword_pattern('important', 'should', 'risk', 'protect')
+MEDIUM_PRIORITY_RE = _keyword_pattern('consider', 'plan', 'prepare')
+
+TIMING_NOW_RE = _keyword_pattern('immediately', 'now', 'today', 'asap')
+TIMING_24H_RE = _keyword_pattern('tomorrow', '24 hour', 'within day')
+TIMING_WEEK_RE = _keyword_pattern('this week', '3 day', 'few days')
+
+HIGH_PRIORITIES = frozenset({'critical', 'high'})
+
+# Sort order and checklist labels for recommendations
+PRIORITY_ORDER = {'critical': 0, 'high': 1, 'medium': 2, 'low': 3}
+TIMING_ORDER = {'now': 0, 'within_24h': 1, 'this_week': 2, 'next_week': 3}
+TIMING_LABELS = {
+    'now': '🔴 NOW',
+    'within_24h': '🟡 24H',
+    'this_week': '🟢 WEEK',
+    'next_week': '🔵 LATER'
+}
+
+# Advisory section markers mapped to (section, target audience)
+SECTION_MAP = {
+    'IMMEDIATE ACTIONS': ('immediate', 'general_public'),
+    'FARMING RECOMMENDATIONS': ('farming', 'farmers'),
+    'DISASTER PREPAREDNESS': ('disaster', 'officials'),
+    'PLANNING ADVICE': ('planning', 'general_public'),
+    'MONITORING ALERTS': ('monitoring', 'general_public')
+}
+SECTION_RE = re.compile("|".join(re.escape(marker) for marker in SECTION_MAP))
+
+# Explanatory phrases, checked in order, that introduce a recommendation's reasoning
+REASONING_INDICATORS = ('because', 'due to', 'as', 'since', 'to prevent', 'to avoid')
+
+# Common resources mentioned
+RESOURCE_PATTERNS = [
+    ('water', _keyword_pattern('irrigate', 'water', 'irrigation')),
+    ('equipment', _keyword_pattern('equipment', 'tools', 'machinery')),
+    ('materials', _keyword_pattern('materials', 'supplies', 'cover', 'tarp')),
+    ('help', _keyword_pattern('assistance', 'help', 'support', 'coordination')),
+    ('information', _keyword_pattern('monitor', 'check', 'watch', 'information')),
+    ('transportation', _keyword_pattern('transport', 'vehicle', 'move', 'evacuate'))
+]
+
+# Risk keywords mapped to the contact they suggest
+RISK_CONTACTS = [
+    (('storm', 'wind'), "Local emergency management office for storm preparations"),
+    (('flood', 'rain'), "Agricultural extension office for flood mitigation advice"),
+    (('heat', 'drought'), "Local health department for heat safety information"),
+    (('frost', 'cold'), "Agricultural extension for crop protection guidance")
+]
+# One capture group per contact; the lookahead lets overlapping keywords all match
+RISK_CONTACT_RE = re.compile(
+    "(?=" + "|".join(
+        "(" + "|".join(re.escape(k) for k in keywords) + ")" for keywords, _ in RISK_CONTACTS
+    ) + ")",
+    re.IGNORECASE
+)
+ALL_RISK_CONTACT_FLAGS = (1 << len(RISK_CONTACTS)) - 1
+
+GENERAL_CONTACTS = (
+    "Local weather service for updated forecasts",
+    "Agricultural extension office for farming guidance",
+    "Community emergency coordinator for disaster preparation"
+)
+
 
 class Recommendation(BaseModel):
     """Individual actionable recommendation"""
@@ -33,12 +127,156 @@ class AdviceReport(BaseModel):
     contact_suggestions: List[str] = Field(default_factory=list)
 
 
+class RecommendationList(BaseModel):
+    """Structured LLM output for advice generation"""
+    recommendations: List[Recommendation]
+
+
+STRUCTURED_ADVICE_INSTRUCTIONS = """
+Return your advice as structured recommendations instead of free text.
+
+Classify each recommendation by:
+- target_audience: farmers, officials, general_public
+- action_type: immediate, preparation, planning, monitoring
+- priority: critical, high, medium, low
+- timing: now, within_24h, this_week, next_week
+
+For each recommendation provide a brief 5-8 word title, the specific action to take,
+the reasoning behind it, and the resources needed.
+
+Provide 5-15 actionable recommendations relevant to {audience}. Focus on practical, specific actions.
+"""
+
+
+class AudienceRecommendations(BaseModel):
+    """Recommendations for one audience within a multi-audience response"""
+    audience: str = Field(description="Audience these recommendations are for, exactly as requested")
+    recommendations: List[Recommendation]
+
+
+class MultiAudienceRecommendationList(BaseModel):
+    """Structured LLM output for multi-audience advice generation"""
+    audiences: List[AudienceRecommendations]
+
+
+# Shared weather context goes first so repeated calls reuse the provider's cached prompt prefix
+MULTI_AUDIENCE_CONTEXT = """
+You are a weather advisory specialist helping several audiences at once.
+
+Data Analysis:
+{data_analysis}
+
+Forecast Analysis:
+{forecast_analysis}
+"""
+
+MULTI_AUDIENCE_INSTRUCTIONS = """
+Produce a separate set of advice for each of these audiences: {audiences}.
+Return one entry per audience, using the audience name exactly as given.
+""" + STRUCTURED_ADVICE_INSTRUCTIONS.replace("{audience}", "that audience")
+
+
+# Template for turning free-text advice into structured recommendations
+EXTRACTION_PROMPT = """
+        You are an expert at extracting actionable recommendations from weather advisory text.
+        
+        Analyze the following weather advisory response and extract specific recommendations in JSON format:
+        
+        {ai_response}
+        
+        Extract recommendations and classify them by:
+        - target_audience: farmers, officials, general_public
+        - action_type: immediate, preparation, planning, monitoring
+        - priority: critical, high, medium, low
+        - timing: now, within_24h, this_week, next_week
+        
+        For each recommendation, extract:
+        - title: brief 5-8 word action summary
+        - action: the specific action to take
+        - reasoning: why this action is recommended
+        - resources_needed: what's needed (array of strings)
+        
+        Return ONLY a JSON array with this exact structure:
+        [
+          {{
+            "target_audience": "farmers|officials|general_public",
+            "action_type": "immediate|preparation|planning|monitoring",
+            "priority": "critical|high|medium|low",
+            "title": "Brief action title",
+            "action": "Specific action to take",
+            "reasoning": "Why this action is recommended",
+            "timing": "now|within_24h|this_week|next_week",
+            "resources_needed": ["resource1", "resource2"]
+          }}
+        ]
+        
+        Extract 5-15 actionable recommendations relevant to {audience}. Focus on practical, specific actions.
+        """
+
+# Template for generating an audience-specific advice prompt
+AUDIENCE_PROMPT_GENERATOR = """
+        You are an expert in creating specialized weather advisory prompts for different audiences.
+        
+        Create a comprehensive weather advisory prompt specifically tailored for: {audience}
+        
+        Your task is to design a prompt that will guide a weather advisor to provide the most relevant and actionable recommendations for this specific audience.
+        
+        Consider:
+        1. What are the main responsibilities and concerns of {audience}?
+        2. What weather-related decisions and actions do they need to take?
+        3. What terminology and communication style works best for them?
+        4. What are their primary assets, operations, or activities that weather affects?
+        5. What format and structure would be most useful for their decision-making?
+        6. What timeframes are most critical for their planning?
+        
+        Generate a detailed prompt that includes:
+        - Role definition appropriate for advising {audience}
+        - Specific focus areas relevant to {audience}
+        - Types of recommendations they need (immediate, short-term, planning)
+        - Risk factors and safety considerations specific to their context
+        - Communication style and language complexity
+        - Output format structure that serves their needs
+        - Emphasis on actionable, practical guidance
+        
+        Return ONLY the weather advisory prompt (not meta-commentary). The prompt should start with:
+        "You are a weather advisory specialist helping [audience]..."
+        
+        The prompt should include placeholders for {{data_analysis}} and {{forecast_analysis}} that will be filled with actual weather information.
+        
+        Make sure the prompt generates advice that is:
+        - Highly specific to {audience} needs and context
+        - Actionable with clear steps and timing
+        - Appropriate for their level of weather expertise
+        - Focused on their primary concerns and operations
+        """
+
+
 class AdviceAgent:
     """AI agent that converts weather insights into actionable recommendations"""
     
-    def __init__(self, llm: ChatOpenAI):
+    def __init__(
+        self,
+        llm: ChatOpenAI,
+        response_cache: Optional[LLMResponseCache] = None,
+        prompt_cache_path: Optional[str] = DEFAULT_PROMPT_CACHE_PATH,
+        throttle: Optional[LLMThrottle] = None
+    ):
         self.llm = llm
+        self.structured_llm = json_mode_structured_output(llm, RecommendationList)
+        self.multi_audience_llm = json_mode_structured_output(llm, MultiAudienceRecommendationList)
+        self.response_cache = response_cache or LLMResponseCache()  # Cache for advice/extraction responses
+        self.throttle = throttle or DEFAULT_LLM_THROTTLE
+        self.prompt_cache_path = prompt_cache_path
+        self.extraction_prompt = ChatPromptTemplate.from_template(EXTRACTION_PROMPT)
+        self.prompt_generator = ChatPromptTemplate.from_template(AUDIENCE_PROMPT_GENERATOR)
         self._audience_prompt_cache = {}  # Cache for generated prompts
+        self._audience_prompt_locks = defaultdict(asyncio.Lock)  # One in-flight generation per audience
+        self._audience_prompt_texts = {}  # Raw template strings, persisted to disk
+        self._load_prompt_cache()
+    
+    async def warmup(self, audiences: tuple = KNOWN_AUDIENCES):
+        """Generate audience prompts ahead of time so requests don't pay for them"""
+        await asyncio.gather(*[self._create_audience_prompt(a) for a in audiences])
     
     async def generate_advice(
         self,
@@ -48,40 +286,90 @@ class AdviceAgent:
     ) -> AdviceReport:
         """Generate comprehensive advice based on weather analysis"""
         
-        # Create summaries for AI processing
-        data_summary = self._summarize_data_analysis(data_analysis)
-        forecast_summary = self._summarize_forecast_analysis(forecast_analysis)
-        
-        # Create audience-specific prompt
+        # Audience prompt (precomputed by warmup; only an unknown audience hits the LLM)
         audience_prompt = await self._create_audience_prompt(audience)
         
-        # Get AI-generated advice
+        # Create summaries for AI processing
         messages = audience_prompt.format_messages(
-            data_analysis=data_summary,
-            forecast_analysis=forecast_summary
+            data_analysis=self._summarize_data_analysis(data_analysis),
+            forecast_analysis=self._summarize_forecast_analysis(forecast_analysis)
         )
-        response = await self.llm.ainvoke(messages)
         
-        # Debug: Print the AI response to see what format it's using
-        print(f"🔍 AI Advice Response for {audience}:")
-        print(f"--- START ADVICE RESPONSE ---")
-        print(response.content)
-        print(f"--- END ADVICE RESPONSE ---")
+        # Get AI-generated advice
+        recommendations = await self._generate_recommendations(messages, forecast_analysis.location, audience)
+        contact_suggestions = self._generate_contact_suggestions(forecast_analysis.risk_alerts)
+        
+        return self._build_report(forecast_analysis.location, recommendations, contact_suggestions)
+    
+    async def generate_advice_batch(
+        self,
+        data_analysis: WeatherAnalysis,
+        forecast_analysis: ForecastAnalysis,
+        audiences: List[str]
+    ) -> List[AdviceReport]:
+        """Generate advice for several audiences concurrently"""
+        return await asyncio.gather(*[
+            self.generate_advice(data_analysis, forecast_analysis, audience)
+            for audience in audiences
+        ])
+    
+    async def generate_advice_multi(
+        self,
+        data_analysis: WeatherAnalysis,
+        forecast_analysis: ForecastAnalysis,
+        audiences: List[str]
+    ) -> List[AdviceReport]:
+        """Generate advice for several audiences in one LLM call sharing the weather context"""
+        messages = [
+            SystemMessage(content=MULTI_AUDIENCE_CONTEXT.format(
+                data_analysis=self._summarize_data_analysis(data_analysis),
+                forecast_analysis=self._summarize_forecast_analysis(forecast_analysis)
+            )),
+            HumanMessage(content=MULTI_AUDIENCE_INSTRUCTIONS.format(audiences=", ".join(audiences)))
+        ]
+        contact_suggestions = self._generate_contact_suggestions(forecast_analysis.risk_alerts)
         
-        # Extract structured recommendations using AI
-        recommendations = await self._extract_recommendations_with_ai(response.content, forecast_analysis.location, audience)
+        by_audience = {}
+        try:
+            result = await self._cached_ainvoke(
+                self.multi_audience_llm, messages, namespace="multi_audience_advice"
+            )
+            by_audience = {
+                entry.audience: entry.recommendations
+                for entry in result.audiences if entry.recommendations
+            }
+        except Exception as e:
+            logger.warning("🚨 Multi-audience advice generation failed: %s", e)
         
+        # Fall back to per-audience generation for anything the combined call missed
+        missing = [a for a in audiences if a not in by_audience]
+        if missing:
+            fallback_reports = await self.generate_advice_batch(data_analysis, forecast_analysis, missing)
+            fallback = dict(zip(missing, fallback_reports))
+        else:
+            fallback = {}
+        
+        return [
+            fallback[audience] if audience in fallback
+            else self._build_report(forecast_analysis.location, by_audience[audience], contact_suggestions)
+            for audience in audiences
+        ]
+    
+    def _build_report(
+        self,
+        location: str,
+        recommendations: List[Recommendation],
+        contact_suggestions: List[str]
+    ) -> AdviceReport:
+        """Assemble an AdviceReport from generated recommendations"""
         # Generate priority summary
         priority_summary = self._create_priority_summary(recommendations)
         
         # Create action checklist
         action_checklist = self._create_action_checklist(recommendations)
         
-        # Add contact suggestions
-        contact_suggestions = self._generate_contact_suggestions(forecast_analysis.risk_alerts)
-        
         return AdviceReport(
-            location=forecast_analysis.location,
+            location=location,
             report_time=datetime.now(PHILIPPINE_TZ),
             recommendations=recommendations,
             priority_summary=priority_summary,
@@ -89,6 +377,38 @@ class AdviceAgent:
             contact_suggestions=contact_suggestions
         )
     
+    async def _generate_recommendations(self, messages: list, location: str, audience: str) -> List[Recommendation]:
+        """Generate recommendations in a single structured-output LLM call"""
+        structured_messages = messages + [
+            HumanMessage(content=STRUCTURED_ADVICE_INSTRUCTIONS.format(audience=audience))
+        ]
+        
+        try:
+            result = await self._cached_ainvoke(
+                self.structured_llm, structured_messages, namespace=f"structured_advice:{audience}"
+            )
+            if result and result.recommendations:
+                return result.recommendations
+        except Exception as e:
+            logger.warning("🚨 Structured advice generation failed: %s", e)
+        
+        # Fallback: free-text advice followed by AI extraction
+        response = await self._cached_ainvoke(self.llm, messages, namespace=f"advice:{audience}")
+        
+        # Debug: Log the AI response to see what format it's using
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("🔍 AI Advice Response for %s:\n%s", audience, response.content)
+        
+        return await self._extract_recommendations_with_ai(response.content, location, audience)
+    
+    async def _cached_ainvoke(self, llm: Any, messages: list, namespace: str) -> Any:
+        """Invoke an LLM through the response cache and the shared throttle"""
+        return await self.response_cache.get_or_compute(
+            messages,
+            lambda: self.throttle.run(lambda: llm.ainvoke(messages)),
+            namespace=namespace
+        )
+    
     def _summarize_data_analysis(self, analysis: WeatherAnalysis) -> str:
         """Summarize data quality analysis for AI"""
         return f"""
@@ -100,7 +420,12 @@ class AdviceAgent:
     
     def _summarize_forecast_analysis(self, analysis: ForecastAnalysis) -> str:
         """Summarize forecast analysis for AI"""
-        high_priority_insights = [i for i in analysis.insights if i.priority in ['critical', 'high']]
+        high_priority_insights = []
+        categories = set()
+        for insight in analysis.insights:
+            categories.add(insight.category)
+            if insight.priority in HIGH_PRIORITIES:
+                high_priority_insights.append(insight)
         
         return f"""
         Location: {analysis.location}
@@ -113,7 +438,7 @@ class AdviceAgent:
         All Insights Summary:
         - Total insights: {len(analysis.insights)}
         - Critical/High priority: {len(high_priority_insights)}
-        - Categories: {', '.join(set(i.category for i in analysis.insights))}
+        - Categories: {', '.join(categories)}
         """
     
     def _format_insights(self, insights: List[WeatherInsight]) -> str:
@@ -139,21 +464,9 @@ class AdviceAgent:
             line = line.strip()
             
             # Detect sections
-            if 'IMMEDIATE ACTIONS' in line:
-                current_section = 'immediate'
-                current_audience = 'general_public'
-            elif 'FARMING RECOMMENDATIONS' in line:
-                current_section = 'farming'
-                current_audience = 'farmers'
-            elif 'DISASTER PREPAREDNESS' in line:
-                current_section = 'disaster'
-                current_audience = 'officials'
-            elif 'PLANNING ADVICE' in line:
-                current_section = 'planning'
-                current_audience = 'general_public'
-            elif 'MONITORING ALERTS' in line:
-                current_section = 'monitoring'
-                current_audience = 'general_public'
+            section_match = SECTION_RE.search(line)
+            if section_match:
+                current_section, current_audience = SECTION_MAP[section_match.group(0)]
             elif line.startswith('- ') and current_section:
                 # Parse recommendation
                 text = line[2:]
@@ -176,90 +489,107 @@ class AdviceAgent:
         """Extract structured recommendations from AI response using AI parsing"""
         
         # Use AI to extract structured recommendations from the response
-        extraction_prompt = ChatPromptTemplate.from_template("""
-        You are an expert at extracting actionable recommendations from weather advisory text.
-        
-        Analyze the following weather advisory response and extract specific recommendations in JSON format:
-        
-        {ai_response}
-        
-        Extract recommendations and classify them by:
-        - target_audience: farmers, officials, general_public
-        - action_type: immediate, preparation, planning, monitoring
-        - priority: critical, high, medium, low
-        - timing: now, within_24h, this_week, next_week
-        
-        For each recommendation, extract:
-        - title: brief 5-8 word action summary
-        - action: the specific action to take
-        - reasoning: why this action is recommended
-        - resources_needed: what's needed (array of strings)
-        
-        Return ONLY a JSON array with this exact structure:
-        [
-          {{
-            "target_audience": "farmers|officials|general_public",
-            "action_type": "immediate|preparation|planning|monitoring",
-            "priority": "critical|high|medium|low",
-            "title": "Brief action title",
-            "action": "Specific action to take",
-            "reasoning": "Why this action is recommended",
-            "timing": "now|within_24h|this_week|next_week",
-            "resources_needed": ["resource1", "resource2"]
-          }}
-        ]
-        
-        Extract 5-15 actionable recommendations relevant to {audience}. Focus on practical, specific actions.
-        """)
-        
         try:
-            messages = extraction_prompt.format_messages(
+            messages = self.extraction_prompt.format_messages(
                 ai_response=ai_response,
                 audience=audience
             )
-            response = await self.llm.ainvoke(messages)
-            
-            # Parse JSON response
-            import json
-            recommendations_data = json.loads(response.content.strip())
-            
-            # Convert to Recommendation objects
-            recommendations = []
-            for item in recommendations_data:
-                recommendation = Recommendation(
-                    target_audience=item.get('target_audience', 'general_public'),
-                    action_type=item.get('action_type', 'planning'),
-                    priority=item.get('priority', 'medium'),
-                    title=item.get('title', 'Weather action'),
-                    action=item.get('action', ''),
-                    reasoning=item.get('reasoning', 'Based on weather conditions'),
-                    timing=item.get('timing', 'within_24h'),
-                    resources_needed=item.get('resources_needed', [])
-                )
-                recommendations.append(recommendation)
-            
-            return recommendations
+            return await self.response_cache.get_or_compute(
+                messages,
+                lambda: self.throttle.run(lambda: self._stream_recommendations(messages)),
+                namespace=f"extraction:{audience}"
+            )
             
         except Exception as e:
-            print(f"🚨 AI recommendation extraction failed: {e}")
+            logger.warning("🚨 AI recommendation extraction failed: %s", e)
             # Fallback to original parsing method
             return self._extract_recommendations_fallback(ai_response, location)
     
+    async def _stream_recommendations(self, messages: list) -> List[Recommendation]:
+        """Stream the extraction response, building each recommendation as soon as its JSON object closes"""
+        buffer = ""
+        scanned = 0  # Characters of buffer already scanned
+        depth = 0
+        in_string = False
+        escaped = False
+        start = -1
+        recommendations = []
+        
+        async for chunk in self.llm.astream(messages):
+            buffer += chunk.content
+            
+            # Only scan the new characters, tracking object depth outside JSON strings so braces
+            # and escaped quotes in free-text values (e.g. "{wind gusts}") don't move boundaries.
+            # Strings are only tracked inside objects: quotes in surrounding prose don't count.
+            for i in range(scanned, len(buffer)):
+                char = buffer[i]
+                if in_string:
+                    if escaped:
+                        escaped = False
+                    elif char == '\\':
+                        escaped = True
+                    elif char == '"':
+                        in_string = False
+                elif char == '"' and depth > 0:
+                    in_string = True
+                elif char == '{':
+                    if depth == 0:
+                        start = i
+                    depth += 1
+                elif char == '}' and depth > 0:
+                    depth -= 1
+                    if depth == 0:
+                        self._append_streamed_item(recommendations, buffer[start:i + 1])
+            scanned = len(buffer)
+        
+        if not recommendations:
+            raise ValueError("No recommendations found in extraction response")
+        
+        return recommendations
+    
+    def _append_streamed_item(self, recommendations: List[Recommendation], text: str):
+        """Parse one streamed JSON object; a malformed one is skipped without losing the rest"""
+        try:
+            item = orjson.loads(text)
+        except orjson.JSONDecodeError as e:
+            logger.debug("🔍 Skipping malformed recommendation object: %s", e)
+            return
+        if not isinstance(item, dict):
+            return
+        try:
+            recommendations.append(self._build_recommendation(item))
+        except ValidationError as e:  # Wrong field types even after defaults
+            logger.debug("🔍 Skipping invalid recommendation object: %s", e)
+    
+    def _build_recommendation(self, item: Dict[str, Any]) -> Recommendation:
+        """Validate an extracted item, filling in defaults for missing fields"""
+        try:
+            return Recommendation.model_validate(item)
+        except ValidationError:
+            return Recommendation(
+                target_audience=item.get('target_audience', 'general_public'),
+                action_type=item.get('action_type', 'planning'),
+                priority=item.get('priority', 'medium'),
+                title=item.get('title', 'Weather action'),
+                action=item.get('action', ''),
+                reasoning=item.get('reasoning', 'Based on weather conditions'),
+                timing=item.get('timing', 'within_24h'),
+                resources_needed=item.get('resources_needed', [])
+            )
+    
     def _extract_recommendations_fallback(self, ai_response: str, location: str) -> List[Recommendation]:
         """Fallback method using original parsing logic"""
         return self._extract_recommendations(ai_response, location)
     
     def _determine_priority(self, text: str, section: str) -> str:
         """Determine priority level"""
-        text_lower = text.lower()
-        
         if section == 'immediate':
             return 'critical'
-        elif any(word in text_lower for word in ['urgent', 'critical', 'danger', 'warning']):
+        elif CRITICAL_PRIORITY_RE.search(text):
             return 'critical'
-        elif any(word in text_lower for word in ['important', 'should', 'risk', 'protect']):
+        elif HIGH_PRIORITY_RE.search(text):
             return 'high'
-        elif any(word in text_lower for word in ['consider', 'plan', 'prepare']):
+        elif MEDIUM_PRIORITY_RE.search(text):
             return 'medium'
         else:
             return 'low'
@@ -277,27 +607,24 @@ class AdviceAgent:
     def _extract_reasoning(self, text: str) -> str:
         """Extract reasoning from text"""
         # Look for explanatory phrases
-        reasoning_indicators = ['because', 'due to', 'as', 'since', 'to prevent', 'to avoid']
+        text_lower = text.lower()
         
-        for indicator in reasoning_indicators:
-            if indicator in text.lower():
-                parts = text.lower().split(indicator, 1)
-                if len(parts) > 1:
-                    return f"Because {parts[1].strip()}"
+        for indicator in REASONING_INDICATORS:
+            parts = text_lower.split(indicator, 1)
+            if len(parts) > 1:
+                return f"Because {parts[1].strip()}"
         
         return "Based on current weather conditions and forecast"
     
     def _determine_timing(self, text: str, section: str) -> str:
         """Determine when to act"""
-        text_lower = text.lower()
-        
         if section == 'immediate':
             return 'now'
-        elif any(word in text_lower for word in ['immediately', 'now', 'today', 'asap']):
+        elif TIMING_NOW_RE.search(text):
             return 'now'
-        elif any(word in text_lower for word in ['tomorrow', '24 hour', 'within day']):
+        elif TIMING_24H_RE.search(text):
             return 'within_24h'
-        elif any(word in text_lower for word in ['this week', '3 day', 'few days']):
+        elif TIMING_WEEK_RE.search(text):
             return 'this_week'
         elif section == 'planning':
             return 'this_week'
@@ -306,30 +633,20 @@ class AdviceAgent:
     
     def _identify_resources(self, text: str) -> List[str]:
         """Identify resources needed from text"""
-        resources = []
-        text_lower = text.lower()
-        
-        # Common resources mentioned
-        resource_keywords = {
-            'water': ['irrigate', 'water', 'irrigation'],
-            'equipment': ['equipment', 'tools', 'machinery'],
-            'materials': ['materials', 'supplies', 'cover', 'tarp'],
-            'help': ['assistance', 'help', 'support', 'coordination'],
-            'information': ['monitor', 'check', 'watch', 'information'],
-            'transportation': ['transport', 'vehicle', 'move', 'evacuate']
-        }
-        
-        for resource, keywords in resource_keywords.items():
-            if any(keyword in text_lower for keyword in keywords):
-                resources.append(resource)
+        resources = [resource for resource, pattern in RESOURCE_PATTERNS if pattern.search(text)]
         
         return resources[:3]  # Limit to 3 resources
     
     def _create_priority_summary(self, recommendations: List[Recommendation]) -> str:
         """Create a priority summary of recommendations"""
-        critical = len([r for r in recommendations if r.priority == 'critical'])
-        high = len([r for r in recommendations if r.priority == 'high'])
-        immediate = len([r for r in recommendations if r.timing == 'now'])
+        critical = high = immediate = 0
+        for r in recommendations:
+            if r.priority == 'critical':
+                critical += 1
+            elif r.priority == 'high':
+                high += 1
+            if r.timing == 'now':
+                immediate += 1
         
         summary = f"Priority Overview: {critical} critical actions, {high} high-priority recommendations, {immediate} requiring immediate attention."
         
@@ -350,18 +667,13 @@ class AdviceAgent:
         sorted_recs = sorted(
             recommendations,
             key=lambda r: (
-                {'critical': 0, 'high': 1, 'medium': 2, 'low': 3}[r.priority],
-                {'now': 0, 'within_24h': 1, 'this_week': 2, 'next_week': 3}[r.timing]
+                PRIORITY_ORDER.get(r.priority, len(PRIORITY_ORDER)),
+                TIMING_ORDER.get(r.timing, len(TIMING_ORDER))
             )
         )
         
         for i, rec in enumerate(sorted_recs[:10], 1):  # Top 10 actions
-            timing_label = {
-                'now': '🔴 NOW',
-                'within_24h': '🟡 24H',
-                'this_week': '🟢 WEEK',
-                'next_week': '🔵 LATER'
-            }.get(rec.timing, '⚪ PLAN')
+            timing_label = TIMING_LABELS.get(rec.timing, '⚪ PLAN')
             
             checklist.append(f"{timing_label}: {rec.title}")
         
@@ -369,79 +681,44 @@ class AdviceAgent:
     
     def _generate_contact_suggestions(self, risk_alerts: List[str]) -> List[str]:
         """Generate contact suggestions based on risks"""
-        contacts = []
-        
-        if any('storm' in alert.lower() or 'wind' in alert.lower() for alert in risk_alerts):
-            contacts.append("Local emergency management office for storm preparations")
-        
-        if any('flood' in alert.lower() or 'rain' in alert.lower() for alert in risk_alerts):
-            contacts.append("Agricultural extension office for flood mitigation advice")
-        
-        if any('heat' in alert.lower() or 'drought' in alert.lower() for alert in risk_alerts):
-            contacts.append("Local health department for heat safety information")
+        # Single pass over the alerts, collecting one bit flag per matched contact
+        flags = 0
+        for match in RISK_CONTACT_RE.finditer("\n".join(risk_alerts)):
+            flags |= 1 << (match.lastindex - 1)
+            if flags == ALL_RISK_CONTACT_FLAGS:
+                break
         
-        if any('frost' in alert.lower() or 'cold' in alert.lower() for alert in risk_alerts):
-            contacts.append("Agricultural extension for crop protection guidance")
+        contacts = [contact for i, (_, contact) in enumerate(RISK_CONTACTS) if flags & (1 << i)]
         
-        # Always include general contacts
-        contacts.extend([
-            "Local weather service for updated forecasts",
-            "Agricultural extension office for farming guidance",
-            "Community emergency coordinator for disaster preparation"
-        ])
-        
-        return list(set(contacts))  # Remove duplicates
+        # Always include general contacts, keeping first-seen order while removing duplicates
+        return list(dict.fromkeys([*contacts, *GENERAL_CONTACTS]))
     
     async def _create_audience_prompt(self, audience: str) -> ChatPromptTemplate:
         """Create AI-generated audience-specific prompt for advice generation"""
         
         # Check cache first to avoid regenerating the same prompt
         if audience in self._audience_prompt_cache:
-            print(f"🔄 Using cached advice prompt for audience: {audience}")
+            logger.debug("🔄 Using cached advice prompt for audience: %s", audience)
             return self._audience_prompt_cache[audience]
         
-        print(f"🤖 Generating AI-powered advice prompt for audience: {audience}")
-        
-        # Use AI to generate audience-specific advice prompt
-        prompt_generator = ChatPromptTemplate.from_template("""
-        You are an expert in creating specialized weather advisory prompts for different audiences.
-        
-        Create a comprehensive weather advisory prompt specifically tailored for: {audience}
-        
-        Your task is to design a prompt that will guide a weather advisor to provide the most relevant and actionable recommendations for this specific audience.
+        async with self._audience_prompt_locks[audience]:
+            # Concurrent first requests for an audience wait here and reuse one generation
+            audience_prompt = self._audience_prompt_cache.get(audience)
+            if audience_prompt is None:
+                audience_prompt = await self._generate_audience_prompt(audience)
         
-        Consider:
-        1. What are the main responsibilities and concerns of {audience}?
-        2. What weather-related decisions and actions do they need to take?
-        3. What terminology and communication style works best for them?
-        4. What are their primary assets, operations, or activities that weather affects?
-        5. What format and structure would be most useful for their decision-making?
-        6. What timeframes are most critical for their planning?
-        
-        Generate a detailed prompt that includes:
-        - Role definition appropriate for advising {audience}
-        - Specific focus areas relevant to {audience}
-        - Types of recommendations they need (immediate, short-term, planning)
-        - Risk factors and safety considerations specific to their context
-        - Communication style and language complexity
-        - Output format structure that serves their needs
-        - Emphasis on actionable, practical guidance
-        
-        Return ONLY the weather advisory prompt (not meta-commentary). The prompt should start with:
-        "You are a weather advisory specialist helping [audience]..."
-        
-        The prompt should include placeholders for {{data_analysis}} and {{forecast_analysis}} that will be filled with actual weather information.
-        
-        Make sure the prompt generates advice that is:
-        - Highly specific to {audience} needs and context
-        - Actionable with clear steps and timing
-        - Appropriate for their level of weather expertise
-        - Focused on their primary concerns and operations
-        """)
+        # Later callers hit the cache first, so the lock is only dropped once it's filled;
+        # after a failure it stays, and retries and new callers keep queueing on it
+        self._audience_prompt_locks.pop(audience, None)
+        return audience_prompt
+    
+    async def _generate_audience_prompt(self, audience: str) -> ChatPromptTemplate:
+        """Generate an audience prompt with the LLM and cache it in memory and on disk"""
+        logger.debug("🤖 Generating AI-powered advice prompt for audience: %s", audience)
         
-        # Generate the audience-specific prompt
-        messages = prompt_generator.format_messages(audience=audience)
-        response = await self.llm.ainvoke(messages)
+        # Use AI to generate audience-specific advice prompt
+        messages = self.prompt_generator.format_messages(audience=audience)
+        response = await self.throttle.run(lambda: self.llm.ainvoke(messages))
         
         # Extract the generated prompt text
         generated_prompt = response.content.strip()
@@ -449,6 +726,35 @@ class AdviceAgent:
         # Create the ChatPromptTemplate and cache it
         audience_prompt = ChatPromptTemplate.from_template(generated_prompt)
         self._audience_prompt_cache[audience] = audience_prompt
+        self._audience_prompt_texts[audience] = generated_prompt
+        self._save_prompt_cache()
+        
+        logger.debug("✅ Generated and cached advice prompt for audience: %s", audience)
+        return audience_prompt
+    
+    def _load_prompt_cache(self):
+        """Load previously generated audience prompts from disk"""
+        if not self.prompt_cache_path or not os.path.exists(self.prompt_cache_path):
+            return
         
-        print(f"✅ Generated and cached advice prompt for audience: {audience}")
-        return audience_prompt
\ No newline at end of file
+        try:
+            with open(self.prompt_cache_path, "rb") as f:
+                prompt_texts = orjson.loads(f.read())
+            
+            for audience, prompt_text in prompt_texts.items():
+                self._audience_prompt_cache[audience] = ChatPromptTemplate.from_template(prompt_text)
+                self._audience_prompt_texts[audience] = prompt_text
+        except Exception as e:
+            logger.warning("🚨 Failed to load advice prompt cache: %s", e)
+    
+    def _save_prompt_cache(self):
+        """Persist generated audience prompts to disk"""
+        if not self.prompt_cache_path:
+            return
+        
+        try:
+            os.makedirs(os.path.dirname(self.prompt_cache_path) or ".", exist_ok=True)
+            with open(self.prompt_cache_path, "wb") as f:
+                f.write(orjson.dumps(self._audience_prompt_texts))
+        except Exception as e:
+            logger.warning("🚨 Failed to save advice prompt cache: %s", e)
\ No newline at end of file
@@ -0,0 +1,130 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, List, Optional
+
+from langchain_openai import ChatOpenAI
+from langchain_core.messages import HumanMessage, SystemMessage
+from pydantic import BaseModel, Field
+
+from agents.data_agent import DataAgent, WeatherAnalysis
+from agents.forecast_agent import (
+    ForecastAgent, ForecastAnalysis, ForecastSummary, WeatherInsightList, STRUCTURED_FORECAST_INSTRUCTIONS
+)
+from services.llm_cache import LLMResponseCache
+from services.structured_output import json_mode_structured_output
+from services.weather_api import WeatherData, ForecastData
+
+logger = logging.getLogger(__name__)
+
+
+class DataQualityAssessment(BaseModel):
+    """Structured LLM output for the data quality task"""
+    quality_score: float = Field(ge=0, le=1, description="Data quality score from 0 to 1")
+    issues_found: List[str] = Field(default_factory=list, description="Problems found; empty if none detected")
+    data_summary: str = Field(description="Brief description of the weather data")
+    recommendations: List[str] = Field(default_factory=list, description="Practical suggestions for data usage")
+
+
+class CombinedAnalysis(BaseModel):
+    """Structured LLM output covering data quality and forecast analysis in one response"""
+    data_analysis: DataQualityAssessment
+    forecast_analysis: WeatherInsightList
+
+
+# Static instructions lead the request so every call shares the same prompt prefix,
+# which providers with automatic prompt caching (OpenAI at >=1024 tokens) reuse
+COMBINED_ANALYSIS_INSTRUCTIONS = """
+Complete both tasks below and return them together as structured output:
+- data_analysis: the data quality assessment from TASK 1
+- forecast_analysis: the forecast analysis from TASK 2
+"""
+
+
+@dataclass(slots=True, frozen=True)
+class WeatherPrompts:
+    """Prompt renderings of one observation, shared by every analysis of it"""
+    data: tuple[Any, str]  # DataAgent.render() result
+    forecast: ForecastSummary
+
+
+class AnalysisAgent:
+    """Runs the Data and Forecast agents' analyses as a single structured-output LLM call"""
+    
+    def __init__(
+        self,
+        llm: ChatOpenAI,
+        data_agent: DataAgent,
+        forecast_agent: ForecastAgent,
+        response_cache: Optional[LLMResponseCache] = None
+    ):
+        self.data_agent = data_agent
+        self.forecast_agent = forecast_agent
+        self.structured_llm = json_mode_structured_output(llm, CombinedAnalysis)
+        self.response_cache = response_cache or LLMResponseCache()  # Exact-match prompt cache
+    
+    def render_prompts(self, current_weather: WeatherData, forecast_data: ForecastData) -> WeatherPrompts:
+        """Render the audience-independent prompt text once per observation"""
+        return WeatherPrompts(
+            data=self.data_agent.render(current_weather),
+            forecast=self.forecast_agent.summarize(current_weather, forecast_data)
+        )
+    
+    async def process_combined(
+        self,
+        current_weather: WeatherData,
+        forecast_data: ForecastData,
+        audience: str = "general",
+        prompts: Optional[WeatherPrompts] = None
+    ) -> tuple[WeatherAnalysis, ForecastAnalysis]:
+        """Assess data quality and analyze the forecast with one round trip"""
+        
+        prompts = prompts or self.render_prompts(current_weather, forecast_data)
+        data_dict, data_messages = self.data_agent.prepare_messages(current_weather, prompts.data)
+        prepared = await self.forecast_agent.prepare_analysis(
+            current_weather, forecast_data, audience, prompts.forecast
+        )
+        
+        instructions = "\n\n".join([
+            COMBINED_ANALYSIS_INSTRUCTIONS,
+            STRUCTURED_FORECAST_INSTRUCTIONS.format(audience=audience)
+        ])
+        prompt = "\n\n".join([
+            "TASK 1 - DATA QUALITY",
+            *(message.content for message in data_messages),
+            "TASK 2 - FORECAST ANALYSIS",
+            *(message.content for message in prepared.messages)
+        ])
+        messages = [SystemMessage(content=instructions), HumanMessage(content=prompt)]
+        
+        try:
+            result = await self.response_cache.ainvoke(
+                self.structured_llm, messages, namespace=f"analysis:{audience}", semantic=False
+            )  # Exact keys only: a similar prompt for another location must not reuse its insights
+        except Exception as e:
+            logger.warning("🚨 Combined analysis failed, running agents separately: %s", e)
+            result = None
+        
+        if not result or not result.forecast_analysis.insights:
+            return await asyncio.gather(
+                self.data_agent.process_weather_data(current_weather),
+                self.forecast_agent.analyze_forecast(current_weather, forecast_data, audience)
+            )
+        
+        quality = result.data_analysis
+        data_analysis = self.data_agent.build_analysis(
+            data_dict,
+            quality.data_summary,
+            quality.quality_score,
+            quality.issues_found,
+            quality.recommendations
+        )
+        forecast_analysis = self.forecast_agent.build_analysis(
+            current_weather,
+            forecast_data,
+            prepared.stats,
+            result.forecast_analysis.summary,
+            result.forecast_analysis.insights
+        )
+        
+        return data_analysis, forecast_analysis
@@ -2,6 +2,7 @@ import pandas as pd
 import numpy as np
 from typing import Dict, Any, List, Optional, Union
 from datetime import datetime, timedelta
+from functools import singledispatchmethod
 from langchain.tools import BaseTool
 from langchain_openai import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate
@@ -55,33 +56,52 @@ class DataAgent:
     ) -> WeatherAnalysis:
         """Process weather data from OpenWeather API"""
         
+        data_dict, messages = self.prepare_messages(weather_data)
+        
+        # Get AI analysis
+        response = await self.llm.ainvoke(messages)
+        
+        # Parse AI response
+        quality_score, anomalies, recommendations = self._parse_ai_response(response.content)
+        
+        return self.build_analysis(data_dict, response.content, quality_score, anomalies, recommendations)
+    
+    def prepare_messages(
+        self,
+        weather_data: Union[WeatherData, ForecastData, List[Dict], pd.DataFrame],
+        rendered: Optional[tuple[Any, str]] = None
+    ) -> tuple[Any, list]:
+        """Standardize the input and format the analysis prompt for it, reusing a render() result if given"""
+        data_dict, formatted_data = rendered or self.render(weather_data)
+        return data_dict, self.prompt.format_messages(weather_data=formatted_data)
+    
+    def render(
+        self,
+        weather_data: Union[WeatherData, ForecastData, List[Dict], pd.DataFrame]
+    ) -> tuple[Any, str]:
+        """Convert input to (data_dict, prompt text describing it)"""
+        
         # Convert input to standardized format
-        if isinstance(weather_data, WeatherData):
-            data_dict = weather_data.dict()
-            data_summary = self._summarize_current_weather(weather_data)
-        elif isinstance(weather_data, ForecastData):
-            data_dict = [forecast.dict() for forecast in weather_data.forecasts]
-            data_summary = self._summarize_forecast_data(weather_data)
-        elif isinstance(weather_data, pd.DataFrame):
-            data_dict = weather_data.to_dict('records')
-            data_summary = f"DataFrame with {len(weather_data)} weather records"
-        else:
-            data_dict = weather_data
-            data_summary = f"Raw weather data with {len(data_dict)} records"
+        data_dict, data_summary = self._prepare(weather_data)
         
         # Create human-readable summary for AI analysis
         formatted_data = f"""
         Data Type: {type(weather_data).__name__}
         Summary: {data_summary}
-        Raw Data: {str(data_dict)[:1000]}...  # Truncate for API limits
+        Raw Data: {self._truncated_repr(data_dict, 1000)}...  # Truncate for API limits
         """
         
-        # Get AI analysis
-        messages = self.prompt.format_messages(weather_data=formatted_data)
-        response = await self.llm.ainvoke(messages)
-        
-        # Parse AI response
-        quality_score, anomalies, recommendations = self._parse_ai_response(response.content)
+        return data_dict, formatted_data
+    
+    def build_analysis(
+        self,
+        data_dict: Any,
+        summary: str,
+        quality_score: float,
+        anomalies: List[str],
+        recommendations: List[str]
+    ) -> WeatherAnalysis:
+        """Merge the AI assessment with rule-based validation of the data"""
         
         # Perform basic data validation
         validation_results = self._validate_weather_data(data_dict)
@@ -90,10 +110,53 @@ class DataAgent:
             cleaned_data=data_dict,
             quality_score=max(quality_score, validation_results['score']),  # Take higher score
             anomalies_detected=anomalies + validation_results['anomalies'],
-            summary=response.content,
+            summary=summary,
             recommendations=recommendations + validation_results['recommendations']
         )
     
+    @singledispatchmethod
+    def _prepare(self, weather_data) -> tuple[Any, str]:
+        """Convert input to (data_dict, data_summary); raw records are used as-is"""
+        return weather_data, f"Raw weather data with {len(weather_data)} records"
+    
+    @_prepare.register
+    def _(self, weather_data: WeatherData) -> tuple[Any, str]:
+        return weather_data.model_dump(), self._summarize_current_weather(weather_data)
+    
+    @_prepare.register
+    def _(self, weather_data: ForecastData) -> tuple[Any, str]:
+        return weather_data.model_dump()['forecasts'], self._summarize_forecast_data(weather_data)
+    
+    @_prepare.register
+    def _(self, weather_data: pd.DataFrame) -> tuple[Any, str]:
+        return weather_data.to_dict('records'), f"DataFrame with {len(weather_data)} weather records"
+    
+    def _truncated_repr(self, data: Any, limit: int = 1000) -> str:
+        """Same as str(data)[:limit], but stops rendering once limit characters are produced"""
+        if isinstance(data, dict):
+            opener, closer = "{", "}"
+            parts = (f"{key!r}: {value!r}" for key, value in data.items())
+        elif isinstance(data, list):
+            opener, closer = "[", "]"
+            parts = (repr(item) for item in data)
+        else:
+            return str(data)[:limit]
+        
+        pieces = [opener]
+        length = len(opener)
+        for i, part in enumerate(parts):
+            if i:
+                pieces.append(", ")
+                length += 2
+            pieces.append(part)
+            length += len(part)
+            if length >= limit:
+                break
+        else:
+            pieces.append(closer)
+        
+        return "".join(pieces)[:limit]
+    
     def _summarize_current_weather(self, weather: WeatherData) -> str:
         """Create human-readable summary of current weather"""
         return f"""
@@ -107,14 +170,16 @@ class DataAgent:
     
     def _summarize_forecast_data(self, forecast: ForecastData) -> str:
         """Create human-readable summary of forecast data"""
-        temps = [f.temperature for f in forecast.forecasts]
-        conditions = [f.weather_condition for f in forecast.forecasts]
+        columns = forecast.columns()
+        count = len(forecast.forecasts)
+        temps = columns['temperature']
+        conditions = np.unique(columns['weather_condition'])
         
         return f"""
         Location: {forecast.location}
-        Forecast Period: {len(forecast.forecasts)} time points
-        Temperature Range: {min(temps):.1f}°C to {max(temps):.1f}°C
-        Main Conditions: {', '.join(set(conditions))}
+        Forecast Period: {count} time points
+        Temperature Range: {temps.min():.1f}°C to {temps.max():.1f}°C
+        Main Conditions: {', '.join(conditions)}
         Start Time: {forecast.forecasts[0].timestamp}
         End Time: {forecast.forecasts[-1].timestamp}
         """
@@ -131,38 +196,27 @@ class DataAgent:
         issues = 0
         total_checks = 0
         
-        for record in data_dict:
-            # Temperature validation
-            if 'temperature' in record:
-                temp = record['temperature']
-                total_checks += 1
-                if temp < -60 or temp > 60:  # Extreme temperature check
-                    anomalies.append(f"Extreme temperature reading: {temp}°C")
-                    issues += 1
-            
-            # Humidity validation  
-            if 'humidity' in record:
-                humidity = record['humidity']
-                total_checks += 1
-                if humidity < 0 or humidity > 100:
-                    anomalies.append(f"Invalid humidity reading: {humidity}%")
-                    issues += 1
+        df = pd.DataFrame(data_dict)
+        
+        # (column, is_bad mask builder, anomaly message) for vectorized bounds checks
+        checks = [
+            ('temperature', lambda col: (col < -60) | (col > 60), "Extreme temperature reading: {}°C"),  # Extreme temperature check
+            ('humidity', lambda col: (col < 0) | (col > 100), "Invalid humidity reading: {}%"),
+            ('pressure', lambda col: (col < 800) | (col > 1200), "Unusual pressure reading: {} hPa"),  # Extreme pressure
+            ('wind_speed', lambda col: col > 50, "Extreme wind speed: {} m/s"),  # Hurricane-force winds
+        ]
+        
+        for column, is_bad, message in checks:
+            if column not in df.columns:
+                continue
             
-            # Pressure validation
-            if 'pressure' in record:
-                pressure = record['pressure']
-                total_checks += 1
-                if pressure < 800 or pressure > 1200:  # Extreme pressure
-                    anomalies.append(f"Unusual pressure reading: {pressure} hPa")
-                    issues += 1
+            values = pd.to_numeric(df[column], errors='coerce')
+            present = values.notna()
+            bad = is_bad(values) & present
             
-            # Wind speed validation
-            if 'wind_speed' in record:
-                wind = record['wind_speed']
-                total_checks += 1
-                if wind > 50:  # Hurricane-force winds
-                    anomalies.append(f"Extreme wind speed: {wind} m/s")
-                    issues += 1
+            total_checks += int(present.sum())
+            issues += int(bad.sum())
+            anomalies.extend(message.format(value) for value in df.loc[bad, column].tolist())
         
         # Calculate quality score
         score = 1.0 - (issues / max(total_checks, 1))
@@ -1,19 +1,45 @@
-import pandas as pd
+import asyncio
+import hashlib
+import logging
+import operator
+import os
+import re
 import numpy as np
+import orjson
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from functools import lru_cache
 from typing import Dict, Any, List, Optional, Union
 from datetime import datetime, timedelta, timezone
 from langchain_openai import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate
-from pydantic import BaseModel, Field
+from langchain_core.messages import HumanMessage
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
 
+from services.structured_output import json_mode_structured_output
 from services.weather_api import WeatherData, ForecastData
 
+logger = logging.getLogger(__name__)
+
 # Setup timezone (GMT+8 for Philippines)
 PHILIPPINE_TZ = timezone(timedelta(hours=8))
 
+# OpenWeather main conditions mapped to compact codes; unknown conditions map to -1
+CONDITION_CODES = {
+    'Clear': 0, 'Clouds': 1, 'Rain': 2, 'Drizzle': 3, 'Thunderstorm': 4, 'Squall': 5,
+    'Snow': 6, 'Mist': 7, 'Fog': 8, 'Haze': 9, 'Smoke': 10, 'Dust': 11, 'Sand': 12,
+    'Ash': 13, 'Tornado': 14
+}
+
+# Condition codes counted as rain or storm periods
+RAIN_CODES = np.array(sorted(CONDITION_CODES[c] for c in ('Rain', 'Drizzle', 'Thunderstorm')), dtype=np.int8)
+STORM_CODES = np.array(sorted(CONDITION_CODES[c] for c in ('Thunderstorm', 'Squall')), dtype=np.int8)
+
 
 class WeatherInsight(BaseModel):
     """Individual weather insight or prediction"""
+    model_config = ConfigDict(frozen=True, validate_assignment=False)
+    
     category: str = Field(description="Type of insight: agriculture, disaster, general")
     priority: str = Field(description="Priority level: low, medium, high, critical")
     time_horizon: str = Field(description="Time frame: immediate, 24h, 3-day, weekly")
@@ -22,6 +48,20 @@ class WeatherInsight(BaseModel):
     confidence: float = Field(ge=0, le=1, description="Confidence in prediction")
 
 
+# Validates a whole parsed insight array in one call
+WEATHER_INSIGHT_LIST_ADAPTER = TypeAdapter(List[WeatherInsight])
+
+# Values used for fields the AI extraction leaves out
+INSIGHT_DEFAULTS = {
+    'category': 'general',
+    'priority': 'medium',
+    'time_horizon': '24h',
+    'title': 'Weather insight',
+    'description': '',
+    'confidence': 0.7
+}
+
+
 class ForecastAnalysis(BaseModel):
     """Complete forecast analysis result"""
     location: str
@@ -32,12 +72,136 @@ class ForecastAnalysis(BaseModel):
     summary: str
 
 
+# Meta-prompt used to generate audience-specific analysis prompts
+AUDIENCE_PROMPT_GENERATOR_TEMPLATE = """
+        You are an expert in creating specialized weather analysis prompts for different audiences.
+        
+        Create a comprehensive weather analysis prompt specifically tailored for: {audience}
+        
+        Your task is to design a prompt that will guide a weather analyst to provide the most relevant and actionable insights for this specific audience.
+        
+        Consider:
+        1. What are the main concerns and priorities of {audience}?
+        2. What weather-related decisions do they need to make?
+        3. What terminology and language style is most appropriate?
+        4. What specific weather impacts matter most to them?
+        5. What format would be most useful for their decision-making?
+        
+        Generate a detailed prompt that includes:
+        - Specific focus areas relevant to {audience}
+        - Key activities/operations they need to consider
+        - Risk factors they should be aware of
+        - Decision-making timeframes important to them
+        - Recommended output format structure
+        - Appropriate language tone and complexity level
+        
+        Return ONLY the weather analysis prompt (not meta-commentary). The prompt should start with:
+        "You are a weather forecasting specialist helping [audience]..."
+        
+        The prompt should include placeholders for {{current_weather}} and {{forecast_data}} that will be filled with actual weather information.
+        
+        Make sure the prompt is comprehensive, specific to the audience, and will generate highly relevant weather insights.
+        """
+AUDIENCE_PROMPT_GENERATOR_HASH = hashlib.sha256(AUDIENCE_PROMPT_GENERATOR_TEMPLATE.encode("utf-8")).hexdigest()
+DEFAULT_PROMPT_CACHE_PATH = os.path.expanduser("~/.cache/forecast_prompts.json")
+
+# Generated audience prompts are shared by every agent instance; in-flight generations
+# are tracked so concurrent requests for a new audience wait on a single LLM call
+_AUDIENCE_PROMPTS: Dict[str, ChatPromptTemplate] = {}
+_AUDIENCE_PROMPT_TEXTS: Dict[str, str] = {}
+_PENDING_AUDIENCE_PROMPTS: Dict[str, "asyncio.Task[ChatPromptTemplate]"] = {}
+
+# Extracts structured insights from the weather data, independent of the free-text analysis
+INSIGHT_EXTRACTION_TEMPLATE = """
+        You are an expert at extracting structured information from weather data.
+        
+        Analyze the following weather conditions and forecast and extract specific insights in JSON format:
+        
+        Current Weather:
+        {current_weather}
+        
+        5-Day Forecast:
+        {forecast_data}
+        
+        Extract insights and classify them into these categories:
+        - agriculture: farming, crops, livestock, planting, harvesting insights
+        - disaster: weather risks, warnings, hazards, emergency preparations
+        - general: daily activities, travel, outdoor work recommendations
+        
+        For each insight, determine:
+        - priority: critical, high, medium, low
+        - time_horizon: immediate, 24h, 3-day, weekly  
+        - confidence: 0.0 to 1.0 (how confident is this prediction)
+        - title: brief 5-8 word summary
+        - description: the full insight text
+        
+        Return ONLY a JSON array with this exact structure:
+        [
+          {{
+            "category": "agriculture|disaster|general",
+            "priority": "critical|high|medium|low", 
+            "time_horizon": "immediate|24h|3-day|weekly",
+            "title": "Brief insight title",
+            "description": "Full description of the insight",
+            "confidence": 0.8
+          }}
+        ]
+        
+        Extract at least 3-8 insights. Focus on actionable, specific recommendations relevant to {audience}.
+        """
+
+# Current conditions summary, bound to format_map once at import
+CURRENT_CONDITIONS_TEMPLATE = """
+        Temperature: {temperature}°C (feels like weather condition)
+        Humidity: {humidity}%
+        Pressure: {pressure} hPa
+        Wind: {wind_speed} m/s from {wind_direction}°
+        Conditions: {description}
+        Time: {timestamp:%Y-%m-%d %H:%M}
+        """
+_format_current_conditions = CURRENT_CONDITIONS_TEMPLATE.format_map
+
+
+class WeatherInsightList(BaseModel):
+    """Structured LLM output for forecast analysis"""
+    summary: str = Field(description="Plain-language forecast analysis for the audience")
+    insights: List[WeatherInsight]
+
+
+STRUCTURED_FORECAST_INSTRUCTIONS = """
+Return your analysis as structured output instead of free text.
+
+Write the full analysis in plain language as the summary, then list the individual insights.
+Classify each insight into one of these categories:
+- agriculture: farming, crops, livestock, planting, harvesting insights
+- disaster: weather risks, warnings, hazards, emergency preparations
+- general: daily activities, travel, outdoor work recommendations
+
+For each insight, determine:
+- priority: critical, high, medium, low
+- time_horizon: immediate, 24h, 3-day, weekly
+- confidence: 0.0 to 1.0 (how confident is this prediction)
+- title: brief 5-8 word summary
+- description: the full insight text
+
+Provide 3-8 insights. Focus on actionable, specific recommendations relevant to {audience}.
+"""
+
+
 class ForecastAgent:
     """AI agent that analyzes weather forecasts and predicts implications"""
     
-    def __init__(self, llm: ChatOpenAI):
+    def __init__(self, llm: ChatOpenAI, prompt_cache_path: Optional[str] = DEFAULT_PROMPT_CACHE_PATH):
         self.llm = llm
-        self._audience_prompt_cache = {}  # Cache for generated prompts
+        self.structured_llm = json_mode_structured_output(llm, WeatherInsightList)
+        self.prompt_cache_path = prompt_cache_path
+        self._audience_prompt_cache = _AUDIENCE_PROMPTS  # Cache for generated prompts
+        self._audience_prompt_texts = _AUDIENCE_PROMPT_TEXTS  # Raw template strings, persisted to disk
+        self._load_prompt_cache()
+        
+        # Templates parsed once and reused for every request
+        self._prompt_generator = ChatPromptTemplate.from_template(AUDIENCE_PROMPT_GENERATOR_TEMPLATE)
+        self._extraction_prompt = ChatPromptTemplate.from_template(INSIGHT_EXTRACTION_TEMPLATE)
         
         self.prompt = ChatPromptTemplate.from_template("""
         You are a weather forecasting specialist helping rural communities and farmers.
@@ -88,30 +252,65 @@ class ForecastAgent:
     ) -> ForecastAnalysis:
         """Analyze weather forecast and generate insights"""
         
-        # Prepare data summaries for AI analysis
-        current_summary = self._summarize_current_conditions(current_weather)
-        forecast_summary = self._summarize_forecast_patterns(forecast_data)
+        prepared = await self.prepare_analysis(current_weather, forecast_data, audience)
+        summary, insights = await self._generate_insights(
+            prepared.messages, prepared.current_summary, prepared.forecast_summary, audience
+        )
+        
+        return self.build_analysis(current_weather, forecast_data, prepared.stats, summary, insights)
+    
+    async def prepare_analysis(
+        self,
+        current_weather: WeatherData,
+        forecast_data: ForecastData,
+        audience: str = "general",
+        summary: Optional['ForecastSummary'] = None
+    ) -> 'PreparedForecast':
+        """Format the audience prompt, everything before the LLM call
+        
+        A summary pre-rendered with summarize() is reused instead of recomputed.
+        """
+        summary = summary or self.summarize(current_weather, forecast_data)
         
         # Create audience-specific prompt
         audience_prompt = await self._create_audience_prompt(audience)
         
         # Get AI analysis
         messages = audience_prompt.format_messages(
-            current_weather=current_summary,
-            forecast_data=forecast_summary
+            current_weather=summary.current_summary,
+            forecast_data=summary.forecast_summary
         )
-        response = await self.llm.ainvoke(messages)
         
-        # Debug: Print the AI response to see what format it's using
-        print(f"🔍 AI Forecast Response for {audience}:")
-        print(f"--- START RESPONSE ---")
-        print(response.content)
-        print(f"--- END RESPONSE ---")
+        return PreparedForecast(messages, summary.current_summary, summary.forecast_summary, summary.stats)
+    
+    def summarize(self, current_weather: WeatherData, forecast_data: ForecastData) -> 'ForecastSummary':
+        """Render the audience-independent prompt summaries and aggregate stats"""
         
-        # Generate structured insights using more robust parsing
-        insights = await self._extract_insights_with_ai(response.content, forecast_data.location, audience)
-        trends = self._identify_trends(forecast_data)
-        risks = self._assess_risks(current_weather, forecast_data)
+        # Prepare data summaries for AI analysis
+        current_summary = self._summarize_current_conditions(current_weather)
+        forecast_arrays = self._forecasts_to_arrays(forecast_data)
+        stats = _aggregate_forecast(
+            forecast_arrays['temperature'],
+            forecast_arrays['humidity'],
+            forecast_arrays['pressure'],
+            forecast_arrays['wind_speed'],
+            forecast_arrays['condition_code']
+        )
+        forecast_summary = self._summarize_forecast_patterns(forecast_data, forecast_arrays, stats)
+        
+        return ForecastSummary(current_summary, forecast_summary, stats)
+    
+    def build_analysis(
+        self,
+        current_weather: WeatherData,
+        forecast_data: ForecastData,
+        stats: 'ForecastStats',
+        summary: str,
+        insights: List[WeatherInsight]
+    ) -> ForecastAnalysis:
+        """Combine the LLM summary and insights with rule-based trends and risk alerts"""
+        trends = self._identify_trends(stats)
+        risks = self._assess_risks(current_weather, stats)
         
         return ForecastAnalysis(
             location=forecast_data.location,
@@ -119,52 +318,68 @@ class ForecastAgent:
             insights=insights,
             weather_trends=trends,
             risk_alerts=risks,
-            summary=response.content
+            summary=summary
+        )
+    
+    async def _generate_insights(
+        self,
+        messages: list,
+        current_summary: str,
+        forecast_summary: str,
+        audience: str
+    ) -> tuple[str, List[WeatherInsight]]:
+        """Generate the analysis summary and insights in a single structured-output LLM call"""
+        structured_messages = messages + [
+            HumanMessage(content=STRUCTURED_FORECAST_INSTRUCTIONS.format(audience=audience))
+        ]
+        
+        try:
+            result = await self.structured_llm.ainvoke(structured_messages)
+            if result and result.insights:
+                return result.summary, result.insights
+        except Exception as e:
+            logger.warning("🚨 Structured forecast analysis failed: %s", e)
+        
+        # Fallback: free-text analysis and AI extraction run concurrently
+        response, insights = await asyncio.gather(
+            self.llm.ainvoke(messages),
+            self._extract_insights_with_ai(current_summary, forecast_summary, audience)
         )
+        
+        # Debug: Log the AI response to see what format it's using
+        logger.debug("🔍 AI Forecast Response for %s:\n%s", audience, response.content)
+        
+        # Fallback to original parsing method if AI extraction failed
+        if insights is None:
+            insights = self._extract_insights_fallback(response.content)
+        return response.content, insights
     
     async def _create_audience_prompt(self, audience: str) -> ChatPromptTemplate:
         """Create AI-generated audience-specific prompt for weather analysis"""
         
         # Check cache first to avoid regenerating the same prompt
         if audience in self._audience_prompt_cache:
-            print(f"🔄 Using cached prompt for audience: {audience}")
+            logger.debug("🔄 Using cached prompt for audience: %s", audience)
             return self._audience_prompt_cache[audience]
         
-        print(f"🤖 Generating AI-powered prompt for audience: {audience}")
-        
-        # Use AI to generate audience-specific prompt structure
-        prompt_generator = ChatPromptTemplate.from_template("""
-        You are an expert in creating specialized weather analysis prompts for different audiences.
-        
-        Create a comprehensive weather analysis prompt specifically tailored for: {audience}
-        
-        Your task is to design a prompt that will guide a weather analyst to provide the most relevant and actionable insights for this specific audience.
-        
-        Consider:
-        1. What are the main concerns and priorities of {audience}?
-        2. What weather-related decisions do they need to make?
-        3. What terminology and language style is most appropriate?
-        4. What specific weather impacts matter most to them?
-        5. What format would be most useful for their decision-making?
-        
-        Generate a detailed prompt that includes:
-        - Specific focus areas relevant to {audience}
-        - Key activities/operations they need to consider
-        - Risk factors they should be aware of
-        - Decision-making timeframes important to them
-        - Recommended output format structure
-        - Appropriate language tone and complexity level
-        
-        Return ONLY the weather analysis prompt (not meta-commentary). The prompt should start with:
-        "You are a weather forecasting specialist helping [audience]..."
-        
-        The prompt should include placeholders for {{current_weather}} and {{forecast_data}} that will be filled with actual weather information.
+        # Join an in-flight generation for this audience instead of starting another
+        task = _PENDING_AUDIENCE_PROMPTS.get(audience)
+        if task is None:
+            task = asyncio.create_task(self._generate_audience_prompt(audience))
+            _PENDING_AUDIENCE_PROMPTS[audience] = task
+            task.add_done_callback(lambda _: _PENDING_AUDIENCE_PROMPTS.pop(audience, None))
+        else:
+            logger.debug("⏳ Waiting for in-flight prompt for audience: %s", audience)
         
-        Make sure the prompt is comprehensive, specific to the audience, and will generate highly relevant weather insights.
-        """)
+        # Shield so one cancelled request does not cancel the generation for the others
+        return await asyncio.shield(task)
+    
+    async def _generate_audience_prompt(self, audience: str) -> ChatPromptTemplate:
+        """Generate an audience-specific prompt with the LLM and cache it"""
+        logger.debug("🤖 Generating AI-powered prompt for audience: %s", audience)
         
         # Generate the audience-specific prompt
-        messages = prompt_generator.format_messages(audience=audience)
+        messages = self._prompt_generator.format_messages(audience=audience)
         response = await self.llm.ainvoke(messages)
         
         # Extract the generated prompt text
@@ -173,39 +388,97 @@ class ForecastAgent:
         # Create the ChatPromptTemplate and cache it
         audience_prompt = ChatPromptTemplate.from_template(generated_prompt)
         self._audience_prompt_cache[audience] = audience_prompt
+        self._audience_prompt_texts[audience] = generated_prompt
+        self._save_prompt_cache()
         
-        print(f"✅ Generated and cached prompt for audience: {audience}")
+        logger.debug("✅ Generated and cached prompt for audience: %s", audience)
         return audience_prompt
     
+    def _load_prompt_cache(self):
+        """Load audience prompts generated by the current meta-prompt from disk"""
+        if not self.prompt_cache_path or not os.path.exists(self.prompt_cache_path):
+            return
+        
+        try:
+            with open(self.prompt_cache_path, "rb") as f:
+                cached = orjson.loads(f.read())
+            
+            # Prompts generated by an older meta-prompt are discarded
+            if cached.get("prompt_hash") != AUDIENCE_PROMPT_GENERATOR_HASH:
+                return
+            
+            for audience, prompt_text in cached.get("prompts", {}).items():
+                self._audience_prompt_cache[audience] = ChatPromptTemplate.from_template(prompt_text)
+                self._audience_prompt_texts[audience] = prompt_text
+        except Exception as e:
+            logger.warning("🚨 Failed to load forecast prompt cache: %s", e)
+    
+    def _save_prompt_cache(self):
+        """Persist generated audience prompts to disk"""
+        if not self.prompt_cache_path:
+            return
+        
+        try:
+            os.makedirs(os.path.dirname(self.prompt_cache_path) or ".", exist_ok=True)
+            with open(self.prompt_cache_path, "wb") as f:
+                f.write(orjson.dumps({
+                    "prompt_hash": AUDIENCE_PROMPT_GENERATOR_HASH,
+                    "prompts": self._audience_prompt_texts
+                }))
+        except Exception as e:
+            logger.warning("🚨 Failed to save forecast prompt cache: %s", e)
+    
     def _summarize_current_conditions(self, weather: WeatherData) -> str:
         """Summarize current weather conditions"""
-        return f"""
-        Temperature: {weather.temperature}°C (feels like weather condition)
-        Humidity: {weather.humidity}%
-        Pressure: {weather.pressure} hPa
-        Wind: {weather.wind_speed} m/s from {weather.wind_direction}°
-        Conditions: {weather.description}
-        Time: {weather.timestamp.strftime('%Y-%m-%d %H:%M')}
-        """
+        return _format_current_conditions({
+            'temperature': weather.temperature,
+            'humidity': weather.humidity,
+            'pressure': weather.pressure,
+            'wind_speed': weather.wind_speed,
+            'wind_direction': weather.wind_direction,
+            'description': weather.description,
+            'timestamp': weather.timestamp
+        })
+    
+    def _forecasts_to_arrays(self, forecast: ForecastData) -> Dict[str, np.ndarray]:
+        """Select the analysis columns from the forecast's shared column arrays (SoA)"""
+        columns = forecast.columns()
+        conditions = columns['weather_condition']
+        
+        return {
+            'temperature': columns['temperature'],
+            'humidity': columns['humidity'].astype(np.float64),
+            'pressure': columns['pressure'],
+            'wind_speed': columns['wind_speed'],
+            'weather_condition': conditions,
+            'condition_code': np.fromiter(
+                (CONDITION_CODES.get(c, -1) for c in conditions), dtype=np.int8, count=len(conditions)
+            ),
+            'timestamp': columns['timestamp']
+        }
     
-    def _summarize_forecast_patterns(self, forecast: ForecastData) -> str:
+    def _summarize_forecast_patterns(
+        self,
+        forecast: ForecastData,
+        arrays: Dict[str, np.ndarray],
+        stats: 'ForecastStats'
+    ) -> str:
         """Summarize forecast patterns and trends"""
-        df = pd.DataFrame([f.dict() for f in forecast.forecasts])
+        temperature = arrays['temperature']
         
         # Temperature trends
         temp_trend = "stable"
-        temp_diff = df['temperature'].iloc[-1] - df['temperature'].iloc[0]
+        temp_diff = temperature[-1] - temperature[0]
         if temp_diff > 3:
             temp_trend = "warming"
         elif temp_diff < -3:
             temp_trend = "cooling"
         
         # Precipitation analysis
-        rain_conditions = df[df['weather_condition'].isin(['Rain', 'Drizzle', 'Thunderstorm'])]
-        rain_periods = len(rain_conditions)
+        rain_periods = stats.rain_count
         
         # Humidity patterns
-        avg_humidity = df['humidity'].mean()
+        avg_humidity = stats.humidity_mean
         humidity_trend = "normal"
         if avg_humidity > 80:
             humidity_trend = "high"
@@ -213,100 +486,54 @@ class ForecastAgent:
             humidity_trend = "low"
         
         # Wind analysis
-        max_wind = df['wind_speed'].max()
-        avg_wind = df['wind_speed'].mean()
+        max_wind = stats.wind_max
+        avg_wind = stats.wind_mean
         
         return f"""
         Forecast Period: {len(forecast.forecasts)} data points over 5 days
-        Temperature Trend: {temp_trend} (from {df['temperature'].iloc[0]:.1f}°C to {df['temperature'].iloc[-1]:.1f}°C)
+        Temperature Trend: {temp_trend} (from {temperature[0]:.1f}°C to {temperature[-1]:.1f}°C)
         Precipitation: {rain_periods} periods of rain/storms expected
         Humidity: {humidity_trend} ({avg_humidity:.0f}% average)
         Wind: Average {avg_wind:.1f} m/s, maximum {max_wind:.1f} m/s
         
         Daily Breakdown:
-        {self._create_daily_summary(df)}
+        {self._create_daily_summary(arrays)}
         """
     
-    def _create_daily_summary(self, df: pd.DataFrame) -> str:
+    def _create_daily_summary(self, arrays: Dict[str, np.ndarray]) -> str:
         """Create day-by-day forecast summary"""
-        df['date'] = pd.to_datetime(df['timestamp']).dt.date
-        daily_summary = []
-        
-        for date, day_data in df.groupby('date'):
-            temp_range = f"{day_data['temperature'].min():.1f}-{day_data['temperature'].max():.1f}°C"
-            conditions = day_data['weather_condition'].mode().iloc[0] if not day_data['weather_condition'].empty else "Unknown"
-            avg_humidity = day_data['humidity'].mean()
-            max_wind = day_data['wind_speed'].max()
+        days = defaultdict(list)
+        for row in zip(
+            arrays['timestamp'].tolist(),
+            arrays['temperature'].tolist(),
+            arrays['humidity'].tolist(),
+            arrays['wind_speed'].tolist(),
+            arrays['weather_condition'].tolist()
+        ):
+            days[row[0].date()].append(row[1:])
+        
+        lines = []
+        for date in sorted(days)[:5]:  # Limit to 5 days
+            temps, humidities, winds, conditions = zip(*days[date])
+            
+            # Most frequent condition (ties resolve alphabetically, like Series.mode)
+            counts = Counter(conditions)
+            condition = max(sorted(counts), key=counts.__getitem__)
             
-            daily_summary.append(
-                f"{date}: {temp_range}, {conditions}, {avg_humidity:.0f}% humidity, {max_wind:.1f} m/s wind"
+            lines.append(
+                f"{date}: {min(temps):.1f}-{max(temps):.1f}°C, {condition}, "
+                f"{sum(humidities) / len(humidities):.0f}% humidity, {max(winds):.1f} m/s wind"
             )
         
-        return "\n".join(daily_summary[:5])  # Limit to 5 days
+        return "\n".join(lines)
     
-    def _identify_trends(self, forecast: ForecastData) -> List[str]:
+    def _identify_trends(self, stats: 'ForecastStats') -> List[str]:
         """Identify key weather trends"""
-        df = pd.DataFrame([f.dict() for f in forecast.forecasts])
-        trends = []
-        
-        # Temperature trend
-        temp_slope = np.polyfit(range(len(df)), df['temperature'], 1)[0]
-        if temp_slope > 0.5:
-            trends.append("Temperatures rising over the forecast period")
-        elif temp_slope < -0.5:
-            trends.append("Temperatures falling over the forecast period")
-        else:
-            trends.append("Stable temperature pattern expected")
-        
-        # Humidity trend
-        if df['humidity'].mean() > 75:
-            trends.append("High humidity levels - increased thunderstorm risk")
-        
-        # Pressure trend
-        pressure_slope = np.polyfit(range(len(df)), df['pressure'], 1)[0]
-        if pressure_slope < -0.5:
-            trends.append("Falling atmospheric pressure - potential weather system approaching")
-        elif pressure_slope > 0.5:
-            trends.append("Rising atmospheric pressure - clearing weather expected")
-        
-        # Wind patterns
-        if df['wind_speed'].max() > 15:
-            trends.append("High wind speeds expected - potential for severe weather")
-        
-        return trends
+        return _apply_rules(stats, TREND_RULES)
     
-    def _assess_risks(self, current: WeatherData, forecast: ForecastData) -> List[str]:
+    def _assess_risks(self, current: WeatherData, stats: 'ForecastStats') -> List[str]:
         """Assess weather-related risks"""
-        risks = []
-        df = pd.DataFrame([f.dict() for f in forecast.forecasts])
-        
-        # Heat risk
-        if df['temperature'].max() > 35:
-            risks.append("HEAT WARNING: Extreme temperatures expected - risk of heat stress")
-        
-        # Cold risk
-        if df['temperature'].min() < 0:
-            risks.append("FROST WARNING: Freezing temperatures expected - protect crops and livestock")
-        
-        # Storm risk
-        storm_conditions = df[df['weather_condition'].isin(['Thunderstorm', 'Squall'])]
-        if not storm_conditions.empty:
-            risks.append("STORM ALERT: Thunderstorms predicted - secure outdoor equipment")
-        
-        # Wind risk
-        if df['wind_speed'].max() > 20:
-            risks.append("HIGH WIND WARNING: Strong winds expected - avoid tall structures")
-        
-        # Humidity risk
-        if df['humidity'].mean() > 85:
-            risks.append("HIGH HUMIDITY: Increased risk of plant diseases and heat stress")
-        
-        # Drought risk (low humidity + no rain)
-        rain_forecast = df[df['weather_condition'].isin(['Rain', 'Drizzle', 'Thunderstorm'])]
-        if rain_forecast.empty and df['humidity'].mean() < 50:
-            risks.append("DRY CONDITIONS: No rain expected - monitor irrigation needs")
-        
-        return risks
+        return _apply_rules(stats, RISK_RULES)
     
     def _extract_insights(self, ai_response: str, location: str) -> List[WeatherInsight]:
         """Extract structured insights from AI response"""
@@ -320,15 +547,14 @@ class ForecastAgent:
         }
         
         current_section = None
-        for line in ai_response.split('\n'):
+        for line in ai_response.splitlines():
             line = line.strip()
-            if 'AGRICULTURE INSIGHTS:' in line:
-                current_section = 'agriculture'
-            elif 'DISASTER RISKS:' in line:
-                current_section = 'disaster'  
-            elif 'TIMING RECOMMENDATIONS:' in line:
-                current_section = 'timing'
-            elif line.startswith('- ') and current_section:
+            
+            # Headers may carry markdown decoration, e.g. "**DISASTER RISKS:**"
+            section = INSIGHT_SECTION_HEADERS.get(line.strip('#*: ').upper())
+            if section:
+                current_section = section
+            elif current_section and line.startswith('- '):
                 sections[current_section].append(line[2:])
         
         # Create structured insights
@@ -350,74 +576,32 @@ class ForecastAgent:
         
         return insights
     
-    async def _extract_insights_with_ai(self, ai_response: str, location: str, audience: str) -> List[WeatherInsight]:
-        """Extract structured insights from AI response using AI parsing"""
-        
-        # Use AI to extract structured insights from the response
-        extraction_prompt = ChatPromptTemplate.from_template("""
-        You are an expert at extracting structured information from weather analysis text.
-        
-        Analyze the following weather analysis response and extract specific insights in JSON format:
-        
-        {ai_response}
-        
-        Extract insights and classify them into these categories:
-        - agriculture: farming, crops, livestock, planting, harvesting insights
-        - disaster: weather risks, warnings, hazards, emergency preparations
-        - general: daily activities, travel, outdoor work recommendations
-        
-        For each insight, determine:
-        - priority: critical, high, medium, low
-        - time_horizon: immediate, 24h, 3-day, weekly  
-        - confidence: 0.0 to 1.0 (how confident is this prediction)
-        - title: brief 5-8 word summary
-        - description: the full insight text
-        
-        Return ONLY a JSON array with this exact structure:
-        [
-          {{
-            "category": "agriculture|disaster|general",
-            "priority": "critical|high|medium|low", 
-            "time_horizon": "immediate|24h|3-day|weekly",
-            "title": "Brief insight title",
-            "description": "Full description of the insight",
-            "confidence": 0.8
-          }}
-        ]
-        
-        Extract at least 3-8 insights. Focus on actionable, specific recommendations relevant to {audience}.
-        """)
-        
+    async def _extract_insights_with_ai(
+        self,
+        current_summary: str,
+        forecast_summary: str,
+        audience: str
+    ) -> Optional[List[WeatherInsight]]:
+        """Extract structured insights directly from the weather summaries using AI parsing"""
         try:
-            messages = extraction_prompt.format_messages(
-                ai_response=ai_response,
+            messages = self._extraction_prompt.format_messages(
+                current_weather=current_summary,
+                forecast_data=forecast_summary,
                 audience=audience
             )
             response = await self.llm.ainvoke(messages)
             
             # Parse JSON response
-            import json
-            insights_data = json.loads(response.content.strip())
+            insights_data = orjson.loads(response.content)
             
             # Convert to WeatherInsight objects
-            insights = []
-            for item in insights_data:
-                insight = WeatherInsight(
-                    category=item.get('category', 'general'),
-                    priority=item.get('priority', 'medium'),
-                    time_horizon=item.get('time_horizon', '24h'),
-                    title=item.get('title', 'Weather insight'),
-                    description=item.get('description', ''),
-                    confidence=float(item.get('confidence', 0.7))
-                )
-                insights.append(insight)
-            
-            return insights
+            return WEATHER_INSIGHT_LIST_ADAPTER.validate_python(
+                [{**INSIGHT_DEFAULTS, **item} for item in insights_data]
+            )
             
         except Exception as e:
-            print(f"🚨 AI extraction failed: {e}")
-            # Fallback to original parsing method
-            return self._extract_insights_fallback(ai_response)
+            logger.warning("🚨 AI extraction failed: %s", e)
+            return None
     
     def _extract_insights_fallback(self, ai_response: str) -> List[WeatherInsight]:
         """Fallback method using original parsing logic"""
@@ -425,34 +609,154 @@ class ForecastAgent:
     
     def _determine_priority(self, text: str) -> str:
         """Determine priority level from text content"""
-        text_lower = text.lower()
-        if any(word in text_lower for word in ['critical', 'urgent', 'warning', 'danger']):
-            return 'critical'
-        elif any(word in text_lower for word in ['important', 'risk', 'alert', 'avoid']):
-            return 'high'
-        elif any(word in text_lower for word in ['consider', 'monitor', 'watch']):
-            return 'medium'
-        else:
-            return 'low'
+        return _classify_priority(text)
     
     def _estimate_confidence(self, text: str) -> float:
         """Estimate confidence level"""
-        text_lower = text.lower()
-        if any(word in text_lower for word in ['likely', 'expected', 'will']):
-            return 0.8
-        elif any(word in text_lower for word in ['possible', 'may', 'might']):
-            return 0.6
-        else:
-            return 0.7
+        return _classify_confidence(text)
     
     def _determine_time_horizon(self, text: str) -> str:
         """Determine time horizon from text"""
-        text_lower = text.lower()
-        if any(word in text_lower for word in ['today', 'now', 'immediate']):
-            return 'immediate'
-        elif any(word in text_lower for word in ['tomorrow', '24 hour', 'next day']):
-            return '24h'
-        elif any(word in text_lower for word in ['3 day', 'this week']):
-            return '3-day'
-        else:
-            return 'weekly'
\ No newline at end of file
+        return _classify_time_horizon(text)
+
+
+def _slope(y: np.ndarray) -> float:
+    """Least-squares slope of y against its index (closed form of a degree-1 polyfit)"""
+    n = y.size
+    if n < 2:
+        return 0.0
+    x_centered = np.arange(n) - (n - 1) / 2
+    return float((x_centered * (y - y.mean())).sum() / (n * (n * n - 1) / 12.0))
+
+
+@dataclass(slots=True)
+class ForecastStats:
+    """Scalar aggregates shared by the forecast summary, trend and risk helpers"""
+    temp_min: float
+    temp_max: float
+    temp_mean: float
+    humidity_max: float
+    humidity_mean: float
+    wind_max: float
+    wind_mean: float
+    pressure_slope: float
+    temp_slope: float
+    rain_count: int
+    storm_count: int
+
+
+@dataclass(slots=True, frozen=True)
+class ForecastSummary:
+    """Audience-independent prompt text and stats for one weather observation"""
+    current_summary: str
+    forecast_summary: str
+    stats: ForecastStats
+
+
+@dataclass(slots=True)
+class PreparedForecast:
+    """Prompt messages and data summaries for one forecast analysis"""
+    messages: list
+    current_summary: str
+    forecast_summary: str
+    stats: ForecastStats
+
+
+def _aggregate_forecast(
+    temperature: np.ndarray,
+    humidity: np.ndarray,
+    pressure: np.ndarray,
+    wind_speed: np.ndarray,
+    condition_codes: np.ndarray
+) -> ForecastStats:
+    """Compute every shared forecast aggregate in one pass over the columns"""
+    return ForecastStats(
+        temp_min=float(temperature.min()),
+        temp_max=float(temperature.max()),
+        temp_mean=float(temperature.mean()),
+        humidity_max=float(humidity.max()),
+        humidity_mean=float(humidity.mean()),
+        wind_max=float(wind_speed.max()),
+        wind_mean=float(wind_speed.mean()),
+        pressure_slope=_slope(pressure),
+        temp_slope=_slope(temperature),
+        rain_count=int(np.isin(condition_codes, RAIN_CODES).sum()),
+        storm_count=int(np.isin(condition_codes, STORM_CODES).sum())
+    )
+
+
+# Threshold rules as ((stats field, comparison, threshold), ...) -> message; a rule fires when
+# every condition holds, and messages keep the order of the table
+TREND_RULES = (
+    ((('temp_slope', operator.gt, 0.5),), "Temperatures rising over the forecast period"),
+    ((('temp_slope', operator.lt, -0.5),), "Temperatures falling over the forecast period"),
+    ((('temp_slope', operator.ge, -0.5), ('temp_slope', operator.le, 0.5)), "Stable temperature pattern expected"),
+    ((('humidity_mean', operator.gt, 75),), "High humidity levels - increased thunderstorm risk"),
+    ((('pressure_slope', operator.lt, -0.5),), "Falling atmospheric pressure - potential weather system approaching"),
+    ((('pressure_slope', operator.gt, 0.5),), "Rising atmospheric pressure - clearing weather expected"),
+    ((('wind_max', operator.gt, 15),), "High wind speeds expected - potential for severe weather")
+)
+RISK_RULES = (
+    ((('temp_max', operator.gt, 35),), "HEAT WARNING: Extreme temperatures expected - risk of heat stress"),
+    ((('temp_min', operator.lt, 0),), "FROST WARNING: Freezing temperatures expected - protect crops and livestock"),
+    ((('storm_count', operator.gt, 0),), "STORM ALERT: Thunderstorms predicted - secure outdoor equipment"),
+    ((('wind_max', operator.gt, 20),), "HIGH WIND WARNING: Strong winds expected - avoid tall structures"),
+    ((('humidity_mean', operator.gt, 85),), "HIGH HUMIDITY: Increased risk of plant diseases and heat stress"),
+    # Drought risk (low humidity + no rain)
+    ((('rain_count', operator.eq, 0), ('humidity_mean', operator.lt, 50)), "DRY CONDITIONS: No rain expected - monitor irrigation needs")
+)
+
+
+def _apply_rules(stats: ForecastStats, rules: tuple) -> List[str]:
+    return [
+        message for conditions, message in rules
+        if all(compare(getattr(stats, field), threshold) for field, compare, threshold in conditions)
+    ]
+
+
+# Section headers of the free-text analysis format mapped to insight categories
+INSIGHT_SECTION_HEADERS = {
+    'AGRICULTURE INSIGHTS': 'agriculture',
+    'DISASTER RISKS': 'disaster',
+    'TIMING RECOMMENDATIONS': 'timing'
+}
+
+# Keyword patterns (case-insensitive substring matches) for insight classification
+PRIORITY_PATTERNS = (
+    (re.compile('critical|urgent|warning|danger', re.IGNORECASE), 'critical'),
+    (re.compile('important|risk|alert|avoid', re.IGNORECASE), 'high'),
+    (re.compile('consider|monitor|watch', re.IGNORECASE), 'medium')
+)
+CONFIDENCE_PATTERNS = (
+    (re.compile('likely|expected|will', re.IGNORECASE), 0.8),
+    (re.compile('possible|may|might', re.IGNORECASE), 0.6)
+)
+TIME_HORIZON_PATTERNS = (
+    (re.compile('today|now|immediate', re.IGNORECASE), 'immediate'),
+    (re.compile('tomorrow|24 hour|next day', re.IGNORECASE), '24h'),
+    (re.compile('3 day|this week', re.IGNORECASE), '3-day')
+)
+
+
+@lru_cache(maxsize=1024)
+def _classify_priority(text: str) -> str:
+    for pattern, priority in PRIORITY_PATTERNS:
+        if pattern.search(text):
+            return priority
+    return 'low'
+
+
+@lru_cache(maxsize=1024)
+def _classify_confidence(text: str) -> float:
+    for pattern, confidence in CONFIDENCE_PATTERNS:
+        if pattern.search(text):
+            return confidence
+    return 0.7
+
+
+@lru_cache(maxsize=1024)
+def _classify_time_horizon(text: str) -> str:
+    for pattern, time_horizon in TIME_HORIZON_PATTERNS:
+        if pattern.search(text):
+            return time_horizon
+    return 'weekly'
@@ -1,38 +1,363 @@
 """
 AI Weather Lambda with OpenAI integration - simplified version
 """
+import copy
+import hashlib
+import http.client
 import json
+import logging
+import operator
 import os
-import urllib.request
+import re
+import ssl
+import textwrap
+import threading
+import time
 import urllib.parse
-import urllib.error
+import zlib
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone, timedelta
+from types import MappingProxyType
+
+try:
+    import orjson
+
+    json_dumps_bytes = orjson.dumps
+
+    def json_dumps(obj):
+        return orjson.dumps(obj).decode('utf-8')
+
+    json_loads = orjson.loads
+except ImportError:  # The deployment zip may ship without third-party packages
+    def json_dumps_bytes(obj):
+        return json.dumps(obj).encode('utf-8')
+
+    json_dumps = json.dumps
+    json_loads = json.loads
 
 # Setup timezone (GMT+8 for Philippines)
 PHILIPPINE_TZ = timezone(timedelta(hours=8))
 
-def call_openai_api(messages, model="gpt-3.5-turbo", max_tokens=500):
-    """Call OpenAI API using urllib"""
-    print(f"Starting OpenAI API call...")
+# Chat model used for weather analysis; must support structured outputs
+OPENAI_MODEL = os.environ.get("OPENAI_MODEL", "gpt-4o-mini")
+
+# Output budget for the insights JSON (up to 5 recommendations plus alerts and summary)
+INSIGHTS_MAX_TOKENS = 450
+INSIGHTS_STOP_SEQUENCES = ["```", "\n\n\n"]
+
+def _string_enum(*values):
+    return {"type": "string", "enum": list(values)}
+
+# Strict structured-output schema for the insights JSON, built once per container
+INSIGHTS_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "weather_insights",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "recommendations": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "title": {"type": "string"},
+                            "action": {"type": "string"},
+                            "priority": _string_enum("critical", "high", "medium", "low"),
+                            "timing": _string_enum("immediate", "within 2 hours", "today", "this week"),
+                            "reason": {"type": "string"},
+                            "confidence": {"type": "number"},
+                            "time_horizon": _string_enum("short-term", "medium-term", "long-term"),
+                            "category": _string_enum("safety", "preparation", "maintenance", "planning"),
+                            "target_audience": {"type": "string"}
+                        },
+                        "required": [
+                            "title", "action", "priority", "timing", "reason",
+                            "confidence", "time_horizon", "category", "target_audience"
+                        ],
+                        "additionalProperties": False
+                    }
+                },
+                "risk_alerts": {"type": "array", "items": {"type": "string"}},
+                "summary": {"type": "string"}
+            },
+            "required": ["recommendations", "risk_alerts", "summary"],
+            "additionalProperties": False
+        }
+    }
+}
+
+# Lambda installs a handler on the root logger; verbose request/response logging is
+# only emitted at LOG_LEVEL=DEBUG and formatted lazily
+logger = logging.getLogger()
+logger.setLevel(os.environ.get("LOG_LEVEL", "INFO"))
+
+# OpenWeather responses cached in-process so warm invocations skip the upstream calls
+WEATHER_CACHE_TTL = 600  # seconds
+WEATHER_ERROR_CACHE_TTL = 30  # failed lookups are retried sooner
+WEATHER_CACHE_MAX_ENTRIES = 256
+_WEATHER_CACHE = OrderedDict()  # location key -> (expires_at, data, error)
+_WEATHER_CACHE_LOCK = threading.Lock()
+
+OPENAI_CHAT_URL = "https://api.openai.com/v1/chat/completions"
+OPENWEATHER_BASE_URL = "https://api.openweathermap.org/data/2.5"
+FORECAST_ENTRIES = 8  # 3-hour steps covering the next 24 hours
+
+# Reused across warm invocations for the concurrent OpenWeather requests
+_HTTP_EXECUTOR = ThreadPoolExecutor(max_workers=2)
+
+# Upper bound on any upstream response body, so a misbehaving server cannot exhaust Lambda memory
+MAX_RESPONSE_BYTES = 2_000_000
+
+# Kept-alive HTTP(S) connections per thread and host, so warm invocations skip TCP/TLS setup
+_CONNECTIONS = threading.local()
+# One TLS context for every connection, so reconnects do not reload the CA bundle
+_SSL_CONTEXT = ssl.create_default_context()
+
+# AI analyses cached per location, audience and rounded weather signature
+AI_CACHE_ENABLED = os.environ.get("AI_CACHE_ENABLED", "1") == "1"
+AI_CACHE_TTL = 600  # seconds
+AI_CACHE_MAX_ENTRIES = 2048
+AI_CACHE_HUMIDITY_BUCKET = 10  # percentage points
+_AI_CACHE = OrderedDict()  # signature hash -> (expires_at, analysis)
+_AI_CACHE_LOCK = threading.Lock()
+
+# Markdown code fence the model sometimes wraps JSON output in
+JSON_FENCE_RE = re.compile(r"```(?:json)?\s*(.*?)\s*```", re.S)
+
+# Prompt text is fixed at import so every request for an audience shares a byte-identical prefix
+AUDIENCE_PROMPTS = MappingProxyType({
+    "farmers": "You are an agricultural weather advisor. Focus on crop management, irrigation, livestock care, and farming operations.",
+    "officials": "You are a municipal weather advisor. Focus on public safety, infrastructure, emergency preparedness, and community coordination.",
+    "general": "You are a general weather advisor. Focus on daily activities, safety precautions, and practical recommendations."
+})
+SYSTEM_PROMPT_SUFFIX = "Provide specific, actionable recommendations based on weather conditions. Focus on practical advice relevant to the target audience."
+SYSTEM_MESSAGES = MappingProxyType({
+    audience: f"{context} {SYSTEM_PROMPT_SUFFIX}" for audience, context in AUDIENCE_PROMPTS.items()
+})
+
+# Current-weather fields shared by the AI analysis and the rules-based fallback
+CurrentConditions = namedtuple('CurrentConditions', [
+    'name', 'temp', 'humidity', 'pressure', 'feels_like', 'condition', 'weather_main',
+    'wind_speed', 'wind_direction', 'visibility', 'rainfall_1h', 'rainfall_3h', 'cloudiness'
+])
+
+# Threshold rules for the non-AI fallback: (field, comparison, threshold, recommendation),
+# where the recommendation's action maps audience -> text and None is the default.
+# Rules are data so new checks do not add branches to create_fallback_response.
+FallbackRule = namedtuple('FallbackRule', ['field', 'compare', 'threshold', 'recommendation'])
+FALLBACK_RULES = (
+    FallbackRule('temp', operator.gt, 35, MappingProxyType({
+        "title": "High Temperature Alert",
+        "action": MappingProxyType({
+            "general": "Stay hydrated and avoid prolonged sun exposure",
+            None: "Provide shade for livestock and increase irrigation"
+        }),
+        "priority": "critical",
+        "timing": "immediate",
+        "reason": "Extreme heat can cause health issues"
+    })),
+)
+
+# Short codes for common OpenWeather descriptions in the compact prompt forecast
+CONDITION_CODES = MappingProxyType({
+    "clear sky": "clr",
+    "few clouds": "fcl",
+    "scattered clouds": "scc",
+    "broken clouds": "bkc",
+    "overcast clouds": "ovc",
+    "mist": "mst",
+    "haze": "hze",
+    "fog": "fog",
+    "light intensity drizzle": "ldz",
+    "drizzle": "dzl",
+    "light rain": "lra",
+    "moderate rain": "mra",
+    "heavy intensity rain": "hra",
+    "very heavy rain": "vhr",
+    "shower rain": "shr",
+    "light intensity shower rain": "lsh",
+    "thunderstorm": "tst",
+    "thunderstorm with light rain": "tlr",
+    "thunderstorm with rain": "tsr",
+    "thunderstorm with heavy rain": "thr"
+})
+CONDITION_LEGEND = ", ".join(f"{code}={description}" for description, code in CONDITION_CODES.items())
+
+# Invariant instructions and schema first, per-request readings last
+USER_PROMPT_TEMPLATE = """
+                Generate UNIQUE, LOCATION-SPECIFIC recommendations. Avoid generic advice. Please provide:
+                1. 3-5 specific, actionable recommendations
+                2. Priority level for each (critical/high/medium/low)
+                3. Timing (immediate/within 2 hours/today/this week)
+                4. Brief explanation of why each recommendation is important
+
+                Format as JSON with this structure:
+                {{
+                    "recommendations": [
+                        {{
+                            "title": "recommendation title",
+                            "action": "specific action to take",
+                            "priority": "critical|high|medium|low",
+                            "timing": "immediate|within 2 hours|today|this week",
+                            "reason": "brief explanation",
+                            "confidence": 0.85,
+                            "time_horizon": "short-term|medium-term|long-term",
+                            "category": "safety|preparation|maintenance|planning",
+                            "target_audience": "{audience}"
+                        }}
+                    ],
+                    "risk_alerts": ["alert1", "alert2"],
+                    "summary": "overall weather impact summary"
+                }}
+
+                The forecast is a list of [hours ahead, temperature °C, condition, rain mm in 3h].
+                Condition codes: {condition_legend}
+
+                Target audience: {audience}
+
+                Current weather analysis for {location} at {timestamp}:
+                - Temperature: {temp}°C
+                - Humidity: {humidity}%
+                - Condition: {condition}
+                - Pressure: {pressure} hPa
+                - Wind Speed: {wind_speed} m/s
+                - Rainfall (1h): {rainfall_1h} mm
+                - Cloudiness: {cloudiness}%
+
+                24-hour forecast: {forecast_json}
+
+                Location context: {location}
+                """
+# Dedented once at import so the indentation is not sent (and billed) as prompt tokens
+_format_user_prompt = textwrap.dedent(USER_PROMPT_TEMPLATE).strip().format
+
+def _get_connection(scheme, host, timeout):
+    """Return this thread's pooled connection to a host, creating it if needed"""
+    pool = getattr(_CONNECTIONS, 'pool', None)
+    if pool is None:
+        pool = _CONNECTIONS.pool = {}
+
+    conn = pool.get((scheme, host))
+    if conn is None:
+        if scheme == 'https':
+            conn = http.client.HTTPSConnection(host, timeout=timeout, context=_SSL_CONTEXT)
+        else:
+            conn = http.client.HTTPConnection(host, timeout=timeout)
+        pool[(scheme, host)] = conn
+    else:
+        conn.timeout = timeout
+        if conn.sock:
+            conn.sock.settimeout(timeout)
+    return conn
+
+def _drop_connection(scheme, host):
+    """Close and forget a pooled connection"""
+    conn = getattr(_CONNECTIONS, 'pool', {}).pop((scheme, host), None)
+    if conn:
+        conn.close()
+
+def _read_capped(response):
+    """Read a response body, failing fast if it exceeds MAX_RESPONSE_BYTES"""
+    content_length = int(response.getheader('Content-Length') or 0)
+    if content_length > MAX_RESPONSE_BYTES:
+        raise ValueError(f"Response too large: {content_length} bytes")
+
+    body = response.read(MAX_RESPONSE_BYTES + 1)
+    if len(body) > MAX_RESPONSE_BYTES:
+        raise ValueError(f"Response exceeds {MAX_RESPONSE_BYTES} bytes")
+    return body
+
+def http_request(method, url, body=None, headers=None, timeout=10, reader=None):
+    """Send a request over a pooled connection, returning (status, body)
+
+    A successful response is passed to reader when given, otherwise its bytes are returned.
+    """
+    parts = urllib.parse.urlsplit(url)
+    path = f"{parts.path}?{parts.query}" if parts.query else parts.path
+
+    for attempt in range(2):
+        conn = _get_connection(parts.scheme, parts.netloc, timeout)
+        try:
+            conn.request(method, path, body=body, headers=headers or {})
+            response = conn.getresponse()
+            if reader is None or response.status != 200:
+                return response.status, _read_capped(response)
+            result = reader(response)
+            _read_capped(response)  # Drain the rest so the connection can be reused
+            return response.status, result
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+            # The server closed an idle kept-alive connection; reconnect once
+            _drop_connection(parts.scheme, parts.netloc)
+            if attempt:
+                raise
+        except Exception:
+            _drop_connection(parts.scheme, parts.netloc)
+            raise
+
+def _read_chat_stream(response):
+    """Accumulate streamed chat-completion deltas into a completion-shaped result"""
+    content_parts = []
+    bytes_read = 0
+    for line in response:
+        bytes_read += len(line)
+        if bytes_read > MAX_RESPONSE_BYTES:
+            raise ValueError(f"Response exceeds {MAX_RESPONSE_BYTES} bytes")
+        if not line.startswith(b'data:'):
+            continue
+        data = line[5:].strip()
+        if data == b'[DONE]':
+            break
+        chunk = json_loads(data)
+        choices = chunk.get('choices') or [{}]
+        content = choices[0].get('delta', {}).get('content')
+        if content:
+            content_parts.append(content)
+
+    return {"choices": [{"message": {"role": "assistant", "content": "".join(content_parts)}}]}
+
+def call_openai_api(
+    messages,
+    model="gpt-3.5-turbo",
+    max_tokens=500,
+    cache_key=None,
+    response_format=None,
+    stop=None,
+    top_p=None
+):
+    """Call OpenAI API over a pooled connection"""
+    logger.debug("Starting OpenAI API call...")
     try:
         api_key = os.environ.get('OPENAI_API_KEY')
         if not api_key:
             return None, "OpenAI API key not configured"
 
         # Prepare the request
-        url = "https://api.openai.com/v1/chat/completions"
+        url = OPENAI_CHAT_URL
 
         payload = {
             "model": model,
             "messages": messages,
             "max_tokens": max_tokens,
-            "temperature": 0.7
+            "temperature": 0.7,
+            "stream": True
         }
-        print(f"OpenAI request payload: {json.dumps(payload)}")
+        if response_format:
+            payload["response_format"] = response_format
+        if stop:
+            payload["stop"] = stop
+        if top_p is not None:
+            payload["top_p"] = top_p
+        if cache_key:
+            # Route requests sharing a prompt prefix to the same server-side prompt cache
+            payload["prompt_cache_key"] = cache_key
+            payload["user"] = cache_key
 
         # Validate messages format
         if not messages or not isinstance(messages, list):
-            print(f"ERROR: Invalid messages format: {messages}")
+            logger.error("Invalid messages format: %s", messages)
             return None, "Invalid messages format"
 
         headers = {
@@ -40,221 +365,338 @@ def call_openai_api(messages, model="gpt-3.5-turbo", max_tokens=500):
             'Authorization': f'Bearer {api_key}'
         }
 
-        # Create request
-        data = json.dumps(payload).encode('utf-8')
-        request = urllib.request.Request(url, data=data, headers=headers, method='POST')
-
         # Make request
-        print(f"Making OpenAI API request...")
-        with urllib.request.urlopen(request, timeout=25) as response:
-            if response.getcode() != 200:
-                print(f"OpenAI API returned error code: {response.getcode()}")
-                return None, f"OpenAI API error: {response.getcode()}"
+        data = json_dumps_bytes(payload)
+        logger.debug("Making OpenAI API request: model=%s, %d bytes", payload['model'], len(data))
+        try:
+            # Stream the completion and parse each small SSE event as it arrives
+            status, result = http_request(
+                'POST', url, body=data, headers=headers, timeout=25, reader=_read_chat_stream
+            )
+        except json.JSONDecodeError as e:
+            logger.error("JSON decode error: %s", e)
+            return None, f"JSON parsing failed: {str(e)}"
 
-            # Read the full response
-            response_bytes = response.read()
-            response_text = response_bytes.decode('utf-8')
-            print(f"Response length: {len(response_text)}")
+        if status != 200:
+            logger.error("OpenAI API returned error code: %s", status)
+            return None, f"OpenAI API error: {status}"
 
-            # Don't log the full response as it breaks across lines
-            # print(f"Raw OpenAI response text: '{response_text}'")
+        content = result["choices"][0]["message"]["content"]
+        logger.debug("Response length: %d", len(content))
 
-            if not response_text.strip():
-                print("ERROR: OpenAI returned empty response!")
-                return None, "OpenAI returned empty response"
+        if not content.strip():
+            logger.error("OpenAI returned empty response!")
+            return None, "OpenAI returned empty response"
 
-            try:
-                result = json.loads(response_text)
-            except json.JSONDecodeError as e:
-                print(f"JSON decode error: {str(e)}")
-                print(f"Failed to parse response of length {len(response_text)}")
-                return None, f"JSON parsing failed: {str(e)}"
-            print(f"OpenAI API call completed successfully")
-            return result, None
+        logger.debug("OpenAI API call completed successfully")
+        return result, None
 
     except Exception as e:
         return None, str(e)
 
 def get_weather_data(location):
-    """Get weather data from OpenWeather API using urllib"""
+    """Get weather data for a location, served from the TTL cache when fresh"""
+    key = location.strip().lower()
+    now = time.monotonic()
+
+    with _WEATHER_CACHE_LOCK:
+        cached = _WEATHER_CACHE.get(key)
+        if cached and cached[0] > now:
+            _WEATHER_CACHE.move_to_end(key)
+            logger.debug("Weather cache hit for %s", key)
+            return cached[1], cached[2]
+
+    data, error = fetch_weather_data(location)
+
+    ttl = WEATHER_ERROR_CACHE_TTL if error else WEATHER_CACHE_TTL
+    with _WEATHER_CACHE_LOCK:
+        _WEATHER_CACHE[key] = (time.monotonic() + ttl, data, error)
+        _WEATHER_CACHE.move_to_end(key)
+        while len(_WEATHER_CACHE) > WEATHER_CACHE_MAX_ENTRIES:
+            _WEATHER_CACHE.popitem(last=False)
+
+    return data, error
+
+def _read_json_body(response):
+    """Parse a JSON response body, decompressing it if the server gzipped it"""
+    body = _read_capped(response)
+    if response.getheader('Content-Encoding') == 'gzip':
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        body = decompressor.decompress(body, MAX_RESPONSE_BYTES)
+        if decompressor.unconsumed_tail:
+            raise ValueError(f"Decompressed response exceeds {MAX_RESPONSE_BYTES} bytes")
+    return json_loads(body)
+
+def _fetch_json(url, timeout):
+    """Fetch a JSON document, returning (status, data or None)"""
+    status, data = http_request(
+        'GET', url, headers={'Accept-Encoding': 'gzip'}, timeout=timeout, reader=_read_json_body
+    )
+    if status != 200:
+        return status, None
+    return status, data
+
+def _slim_forecast_item(item):
+    """Keep only the forecast fields read by summarize_forecast_item and compact_forecast"""
+    main_data = item.get('main') or {}
+    weather = (item.get('weather') or [{}])[0]
+    slim = {
+        'dt': item.get('dt'),
+        'dt_txt': item.get('dt_txt', ''),
+        'main': {key: main_data[key] for key in ('temp', 'humidity', 'pressure') if key in main_data},
+        'weather': [{key: weather[key] for key in ('main', 'description') if key in weather}]
+    }
+    if 'speed' in (item.get('wind') or {}):
+        slim['wind'] = {'speed': item['wind']['speed']}
+    if '3h' in (item.get('rain') or {}):
+        slim['rain'] = {'3h': item['rain']['3h']}
+    return slim
+
+def fetch_weather_data(location):
+    """Get weather data from OpenWeather API"""
     try:
         api_key = os.environ.get('OPENWEATHER_API_KEY')
         if not api_key:
             return None, "OpenWeather API key not configured"
 
-        # Get current weather
-        location_encoded = urllib.parse.quote(location)
-        weather_url = f"http://api.openweathermap.org/data/2.5/weather?q={location_encoded}&appid={api_key}&units=metric"
+        # Fetch current weather and forecast concurrently
+        params = {"q": location, "appid": api_key, "units": "metric"}
+        query = urllib.parse.urlencode(params)
+        weather_url = f"{OPENWEATHER_BASE_URL}/weather?{query}"
+        # Only the first day of 3-hour steps is used, so the cached forecast stays small
+        forecast_query = urllib.parse.urlencode({**params, "cnt": FORECAST_ENTRIES})
+        forecast_url = f"{OPENWEATHER_BASE_URL}/forecast?{forecast_query}"
+
+        weather_future = _HTTP_EXECUTOR.submit(_fetch_json, weather_url, 10)
+        forecast_future = _HTTP_EXECUTOR.submit(_fetch_json, forecast_url, 10)
 
-        with urllib.request.urlopen(weather_url, timeout=10) as response:
-            if response.getcode() != 200:
-                return None, f"Weather API error: {response.getcode()}"
-            weather_data = json.loads(response.read().decode('utf-8'))
+        status, weather_data = weather_future.result()
+        if weather_data is None:
+            return None, f"Weather API error: {status}"
 
-        # Get forecast data
-        forecast_url = f"http://api.openweathermap.org/data/2.5/forecast?q={location_encoded}&appid={api_key}&units=metric"
+        # Forecast is optional - return at least current weather
+        try:
+            _, forecast_data = forecast_future.result()
+        except Exception as e:
+            logger.warning("Forecast fetch failed: %s", e)
+            forecast_data = None
 
-        with urllib.request.urlopen(forecast_url, timeout=10) as response:
-            if response.getcode() != 200:
-                return weather_data, None  # Return at least current weather
-            forecast_data = json.loads(response.read().decode('utf-8'))
+        # Drop the unused forecast fields before the response is cached
+        if forecast_data:
+            items = (forecast_data.get('list') or [])[:FORECAST_ENTRIES]
+            forecast_data = {'list': [_slim_forecast_item(item) for item in items]}
 
-        return {"current": weather_data, "forecast": forecast_data}, None
+        return {"current": weather_data, "forecast": forecast_data or {}}, None
 
     except Exception as e:
         return None, str(e)
 
+def extract_json(text):
+    """Strip code fences and return the text only if it looks like complete JSON"""
+    match = JSON_FENCE_RE.search(text)
+    if match:
+        text = match.group(1)
+    text = text.strip()
+    if not text.endswith(("}", "]")):
+        return None
+    return text
+
+def _weather_signature(location, audience, temp, humidity, condition, forecast_summary):
+    """Hash the inputs that materially change the AI analysis"""
+    signature = (
+        location,
+        audience,
+        round(temp),
+        round(humidity / AI_CACHE_HUMIDITY_BUCKET) * AI_CACHE_HUMIDITY_BUCKET,
+        condition,
+        tuple((round(item['temperature']), item['condition']) for item in forecast_summary)
+    )
+    return hashlib.blake2b(repr(signature).encode('utf-8'), digest_size=16).hexdigest()
+
+def get_cached_analysis(signature, now_iso):
+    """Return a fresh copy of a cached analysis, or None"""
+    with _AI_CACHE_LOCK:
+        cached = _AI_CACHE.get(signature)
+        if not cached or cached[0] <= time.monotonic():
+            return None
+        _AI_CACHE.move_to_end(signature)
+        analysis = copy.deepcopy(cached[1])
+
+    analysis["analysis_time"] = now_iso
+    return analysis
+
+def store_cached_analysis(signature, analysis):
+    """Cache a successful AI analysis"""
+    with _AI_CACHE_LOCK:
+        _AI_CACHE[signature] = (time.monotonic() + AI_CACHE_TTL, copy.deepcopy(analysis))
+        _AI_CACHE.move_to_end(signature)
+        while len(_AI_CACHE) > AI_CACHE_MAX_ENTRIES:
+            _AI_CACHE.popitem(last=False)
+
 def create_audience_prompt(audience):
     """Create audience-specific prompt"""
-    prompts = {
-        "farmers": "You are an agricultural weather advisor. Focus on crop management, irrigation, livestock care, and farming operations.",
-        "officials": "You are a municipal weather advisor. Focus on public safety, infrastructure, emergency preparedness, and community coordination.",
-        "general": "You are a general weather advisor. Focus on daily activities, safety precautions, and practical recommendations."
+    return AUDIENCE_PROMPTS.get(audience, AUDIENCE_PROMPTS["general"])
+
+def extract_current(current):
+    """Extract the current-weather fields used by the analysis and fallback in one pass"""
+    main_data = current.get('main') or {}
+    weather = (current.get('weather') or [{}])[0]
+    wind_data = current.get('wind') or {}
+    rain_data = current.get('rain') or {}
+
+    return CurrentConditions(
+        name=current.get('name'),
+        temp=main_data.get('temp', 0),
+        humidity=main_data.get('humidity', 0),
+        pressure=main_data.get('pressure'),
+        feels_like=main_data.get('feels_like'),
+        condition=weather.get('description', 'unknown'),
+        weather_main=weather.get('main', 'unknown'),
+        wind_speed=wind_data.get('speed'),
+        wind_direction=wind_data.get('deg'),
+        visibility=current.get('visibility'),
+        rainfall_1h=rain_data.get('1h'),  # Rain volume last 1 hour
+        rainfall_3h=rain_data.get('3h'),  # Rain volume last 3 hours
+        cloudiness=(current.get('clouds') or {}).get('all')  # Cloudiness percentage
+    )
+
+def summarize_forecast_item(item):
+    """Flatten one OpenWeather forecast entry into the fields the analysis uses"""
+    main_data = item.get('main') or {}
+    weather = (item.get('weather') or [{}])[0]
+    wind_speed = (item.get('wind') or {}).get('speed', 0)
+    rainfall_3h = (item.get('rain') or {}).get('3h', 0)
+    dt_txt = item.get('dt_txt', '')
+
+    return {
+        'temperature': main_data.get('temp', 0),
+        'condition': weather.get('description', ''),
+        'weather_condition': weather.get('main', ''),
+        'humidity': main_data.get('humidity', 0),
+        'pressure': main_data.get('pressure', 0),
+        'wind_speed': wind_speed,
+        'rainfall_3h': rainfall_3h,
+        'timestamp': dt_txt,
+        'time': dt_txt
     }
-    return prompts.get(audience, prompts["general"])
 
-def analyze_weather_with_ai(weather_data, audience="general"):
+def compact_forecast(forecast_items, forecast_summary, current_dt=None):
+    """Encode forecast entries as [hours ahead, temp, condition code, rain] rows for the prompt,
+    reusing the already-flattened summaries so each entry is traversed once"""
+    rows = []
+    for index, (item, summary) in enumerate(zip(forecast_items, forecast_summary)):
+        dt = item.get('dt')
+        hours_ahead = round((dt - current_dt) / 3600) if dt and current_dt else (index + 1) * 3
+        description = summary['condition']
+        rows.append([
+            hours_ahead,
+            round(summary['temperature']),
+            CONDITION_CODES.get(description, description),
+            summary['rainfall_3h']
+        ])
+    return rows
+
+def analyze_weather_with_ai(weather_data, audience="general", now=None):
     """Analyze weather using OpenAI"""
+    now = now or datetime.now(PHILIPPINE_TZ)
+    now_iso = now.isoformat()
     try:
         current = weather_data.get("current", {})
         forecast = weather_data.get("forecast", {})
 
         # Prepare weather summary - Extract more fields from OpenWeather API
-        main_data = current.get('main', {})
-        weather_data_list = current.get('weather', [{}])
-        wind_data = current.get('wind', {})
-        rain_data = current.get('rain', {})
-        clouds_data = current.get('clouds', {})
-
-        temp = main_data.get('temp', 0)
-        humidity = main_data.get('humidity', 0)
-        pressure = main_data.get('pressure', None)
-        feels_like = main_data.get('feels_like', None)
-        condition = weather_data_list[0].get('description', 'unknown')
-        weather_main = weather_data_list[0].get('main', 'unknown')
-        wind_speed = wind_data.get('speed', None)
-        wind_direction = wind_data.get('deg', None)
-        visibility = current.get('visibility', None)
-        rainfall_1h = rain_data.get('1h', None)  # Rain volume last 1 hour
-        rainfall_3h = rain_data.get('3h', None)  # Rain volume last 3 hours
-        cloudiness = clouds_data.get('all', None)  # Cloudiness percentage
-        location = current.get('name', 'Unknown')
+        conditions = extract_current(current)
+        location = conditions.name or 'Unknown'
 
         # Get forecast summary with more details
-        forecast_items = forecast.get('list', [])[:8]  # Next 24 hours
-        forecast_summary = []
-        for item in forecast_items:
-            main_data = item.get('main', {})
-            weather_data = item.get('weather', [{}])[0]
-            wind_data = item.get('wind', {})
-            rain_data = item.get('rain', {})
-
-            forecast_summary.append({
-                'temperature': main_data.get('temp', 0),
-                'condition': weather_data.get('description', ''),
-                'weather_condition': weather_data.get('main', ''),
-                'humidity': main_data.get('humidity', 0),
-                'pressure': main_data.get('pressure', 0),
-                'wind_speed': wind_data.get('speed', 0),
-                'rainfall_3h': rain_data.get('3h', 0),
-                'timestamp': item.get('dt_txt', ''),
-                'time': item.get('dt_txt', '')
-            })
+        forecast_items = (forecast.get('list') or [])[:FORECAST_ENTRIES]  # Next 24 hours
+        forecast_summary = [summarize_forecast_item(item) for item in forecast_items]
+
+        # Reuse a recent analysis when conditions have not materially changed
+        signature = None
+        if AI_CACHE_ENABLED:
+            signature = _weather_signature(
+                location, audience, conditions.temp, conditions.humidity, conditions.condition, forecast_summary
+            )
+            cached_analysis = get_cached_analysis(signature, now_iso)
+            if cached_analysis:
+                logger.debug("AI analysis cache hit for %s (%s)", location, audience)
+                return cached_analysis, None
 
         # Create AI prompt
-        audience_context = create_audience_prompt(audience)
-
         messages = [
             {
                 "role": "system",
-                "content": f"{audience_context} Provide specific, actionable recommendations based on weather conditions. Focus on practical advice relevant to the target audience."
+                "content": SYSTEM_MESSAGES.get(audience, SYSTEM_MESSAGES["general"])
             },
             {
                 "role": "user",
-                "content": f"""
-                Current weather analysis for {location} at {datetime.now(PHILIPPINE_TZ).strftime('%Y-%m-%d %H:%M')}:
-                - Temperature: {temp}°C
-                - Humidity: {humidity}%
-                - Condition: {condition}
-                - Pressure: {pressure if pressure else 'N/A'} hPa
-                - Wind Speed: {wind_speed if wind_speed else 'N/A'} m/s
-                - Rainfall (1h): {rainfall_1h if rainfall_1h else 0} mm
-                - Cloudiness: {cloudiness if cloudiness else 'N/A'}%
-
-                24-hour detailed forecast: {json.dumps(forecast_summary)}
-
-                Target audience: {audience}
-                Location context: {location}
-
-                Generate UNIQUE, LOCATION-SPECIFIC recommendations. Avoid generic advice. Please provide:
-                1. 3-5 specific, actionable recommendations
-                2. Priority level for each (critical/high/medium/low)
-                3. Timing (immediate/within 2 hours/today/this week)
-                4. Brief explanation of why each recommendation is important
-
-                Format as JSON with this structure:
-                {{
-                    "recommendations": [
-                        {{
-                            "title": "recommendation title",
-                            "action": "specific action to take",
-                            "priority": "critical|high|medium|low",
-                            "timing": "immediate|within 2 hours|today|this week",
-                            "reason": "brief explanation",
-                            "confidence": 0.85,
-                            "time_horizon": "short-term|medium-term|long-term",
-                            "category": "safety|preparation|maintenance|planning",
-                            "target_audience": "{audience}"
-                        }}
-                    ],
-                    "risk_alerts": ["alert1", "alert2"],
-                    "summary": "overall weather impact summary"
-                }}
-                """
+                "content": _format_user_prompt(
+                    audience=audience,
+                    location=location,
+                    timestamp=now.strftime('%Y-%m-%d %H:%M'),
+                    temp=conditions.temp,
+                    humidity=conditions.humidity,
+                    condition=conditions.condition,
+                    pressure=conditions.pressure if conditions.pressure else 'N/A',
+                    wind_speed=conditions.wind_speed if conditions.wind_speed else 'N/A',
+                    rainfall_1h=conditions.rainfall_1h if conditions.rainfall_1h else 0,
+                    cloudiness=conditions.cloudiness if conditions.cloudiness else 'N/A',
+                    condition_legend=CONDITION_LEGEND,
+                    forecast_json=json_dumps(compact_forecast(forecast_items, forecast_summary, current.get('dt')))
+                )
             }
         ]
 
         # Call OpenAI
-        print(f"Calling OpenAI API with {len(messages)} messages")
-        ai_response, error = call_openai_api(messages)
+        logger.debug("Calling OpenAI API with %d messages", len(messages))
+        # The strict schema guarantees a parseable object unless the output is cut off
+        ai_response, error = call_openai_api(
+            messages,
+            model=OPENAI_MODEL,
+            max_tokens=INSIGHTS_MAX_TOKENS,
+            cache_key=f"weather::{audience}",
+            response_format=INSIGHTS_RESPONSE_FORMAT,
+            stop=INSIGHTS_STOP_SEQUENCES,
+            top_p=0.9
+        )
 
         if error:
-            print(f"OpenAI API error: {error}")
-            return create_fallback_response(current, audience), f"AI analysis unavailable: {error}"
+            logger.error("OpenAI API error: %s", error)
+            return create_fallback_response(conditions, audience, now_iso), f"AI analysis unavailable: {error}"
 
-        print(f"OpenAI API call successful: {type(ai_response)}")
+        logger.debug("OpenAI API call successful: %s", type(ai_response))
 
         # Parse AI response
         ai_content = ai_response.get('choices', [{}])[0].get('message', {}).get('content', '')
-        print(f"OpenAI raw response: {ai_content}")
 
-        try:
-            # Try to parse as JSON
-            ai_analysis = json.loads(ai_content)
-            print(f"Successfully parsed AI response: {ai_analysis}")
-        except json.JSONDecodeError as e:
-            # Log the parsing error details
-            print(f"JSON parsing failed. Error: {str(e)}")
-            print(f"Raw content that failed: {repr(ai_content)}")
-            return create_fallback_response(current, audience), f"AI response parsing failed: {str(e)}"
+        # Skip parsing output that was cut off or is prose rather than JSON
+        json_text = extract_json(ai_content)
+        if json_text is None:
+            logger.warning("AI response is not complete JSON")
+            logger.debug("Raw content that failed: %r", ai_content)
+            return create_fallback_response(conditions, audience, now_iso), "AI response parsing failed: incomplete JSON"
+
+        ai_analysis = json_loads(json_text)
+        logger.debug("Successfully parsed AI response: %s", ai_analysis)
 
         # Combine with weather data
         result = {
             "location": location,
-            "analysis_time": datetime.now(PHILIPPINE_TZ).isoformat(),
+            "analysis_time": now_iso,
             "current_weather": {
-                "temperature": temp,
-                "humidity": humidity,
-                "condition": condition,
-                "weather_main": weather_main,
-                "pressure": pressure,
-                "feels_like": feels_like,
-                "wind_speed": wind_speed,
-                "wind_direction": wind_direction,
-                "visibility": visibility,
-                "rainfall_1h": rainfall_1h,
-                "rainfall_3h": rainfall_3h,
-                "cloudiness": cloudiness
+                "temperature": conditions.temp,
+                "humidity": conditions.humidity,
+                "condition": conditions.condition,
+                "weather_main": conditions.weather_main,
+                "pressure": conditions.pressure,
+                "feels_like": conditions.feels_like,
+                "wind_speed": conditions.wind_speed,
+                "wind_direction": conditions.wind_direction,
+                "visibility": conditions.visibility,
+                "rainfall_1h": conditions.rainfall_1h,
+                "rainfall_3h": conditions.rainfall_3h,
+                "cloudiness": conditions.cloudiness
             },
             "recommendations": ai_analysis.get("recommendations", []),
             "risk_alerts": ai_analysis.get("risk_alerts", []),
@@ -265,229 +707,299 @@ def analyze_weather_with_ai(weather_data, audience="general"):
             "ai_powered": True
         }
 
+        if signature:
+            store_cached_analysis(signature, result)
+
         return result, None
 
     except Exception as e:
-        return create_fallback_response(current, audience), str(e)
+        return create_fallback_response(extract_current(current), audience, now_iso), str(e)
 
-def create_fallback_response(weather_data, audience):
+def evaluate_fallback_rules(conditions, audience):
+    """Build the recommendations for every fallback rule the current conditions trigger"""
+    recommendations = []
+    for rule in FALLBACK_RULES:
+        value = getattr(conditions, rule.field)
+        if value is None or not rule.compare(value, rule.threshold):
+            continue
+        recommendation = dict(rule.recommendation)
+        actions = recommendation["action"]
+        recommendation["action"] = actions.get(audience, actions[None])
+        recommendation["target_audience"] = audience
+        recommendations.append(recommendation)
+    return recommendations
+
+def create_fallback_response(conditions, audience, now_iso=None):
     """Create basic response when AI is unavailable"""
-    main_data = weather_data.get('main', {})
-    weather_list = weather_data.get('weather', [{}])
-    wind_data = weather_data.get('wind', {})
-    rain_data = weather_data.get('rain', {})
-    clouds_data = weather_data.get('clouds', {})
-
-    temp = main_data.get('temp', 0)
-    humidity = main_data.get('humidity', 0)
-    condition = weather_list[0].get('description', 'unknown')
-    pressure = main_data.get('pressure', None)
-    feels_like = main_data.get('feels_like', None)
-    wind_speed = wind_data.get('speed', None)
-    wind_direction = wind_data.get('deg', None)
-    visibility = weather_data.get('visibility', None)
-    rainfall_1h = rain_data.get('1h', None)
-    rainfall_3h = rain_data.get('3h', None)
-    cloudiness = clouds_data.get('all', None)
-
     # Basic rules-based recommendations
-    recommendations = []
-
-    if temp > 35:
-        recommendations.append({
-            "title": "High Temperature Alert",
-            "action": "Stay hydrated and avoid prolonged sun exposure" if audience == "general" else "Provide shade for livestock and increase irrigation",
-            "priority": "critical",
-            "timing": "immediate",
-            "reason": "Extreme heat can cause health issues",
-            "target_audience": audience
-        })
+    recommendations = evaluate_fallback_rules(conditions, audience)
 
     return {
-        "location": weather_data.get('name', 'Unknown'),
-        "analysis_time": datetime.now(PHILIPPINE_TZ).isoformat(),
+        "location": conditions.name or 'Unknown',
+        "analysis_time": now_iso or datetime.now(PHILIPPINE_TZ).isoformat(),
         "current_weather": {
-            "temperature": temp,
-            "humidity": humidity,
-            "condition": condition,
-            "pressure": pressure,
-            "feels_like": feels_like,
-            "wind_speed": wind_speed,
-            "wind_direction": wind_direction,
-            "visibility": visibility,
-            "rainfall_1h": rainfall_1h,
-            "rainfall_3h": rainfall_3h,
-            "cloudiness": cloudiness
+            "temperature": conditions.temp,
+            "humidity": conditions.humidity,
+            "condition": conditions.condition,
+            "pressure": conditions.pressure,
+            "feels_like": conditions.feels_like,
+            "wind_speed": conditions.wind_speed,
+            "wind_direction": conditions.wind_direction,
+            "visibility": conditions.visibility,
+            "rainfall_1h": conditions.rainfall_1h,
+            "rainfall_3h": conditions.rainfall_3h,
+            "cloudiness": conditions.cloudiness
         },
         "recommendations": recommendations,
         "risk_alerts": [rec["title"] for rec in recommendations if rec["priority"] in ["critical", "high"]],
-        "summary": f"Basic weather analysis for {weather_data.get('name', 'your location')}",
+        "summary": f"Basic weather analysis for {conditions.name or 'your location'}",
         "forecast": [], # No forecast in fallback
         "audience": audience,
         "success": True,
         "ai_powered": False
     }
 
-def lambda_handler(event, context):
-    """Lambda handler with full AI weather functionality"""
-
-    # Add debug logging
-    print(f"Lambda event: {json.dumps(event)}")
-
-    method = event.get('httpMethod', 'GET')
-    path = event.get('path', '/')
-
-    # CORS headers - Enhanced for frontend compatibility
-    cors_headers = {
-        'Content-Type': 'application/json',
-        'Access-Control-Allow-Origin': '*',
-        'Access-Control-Allow-Methods': 'GET, POST, PUT, DELETE, OPTIONS',
-        'Access-Control-Allow-Headers': 'Content-Type, Authorization, X-Requested-With, Accept, Origin',
-        'Access-Control-Max-Age': '3600'
+TIMESTAMP_PLACEHOLDER = '__timestamp__'
+
+def _body_template(payload):
+    """Pre-serialize a response body around its timestamp, as a (prefix, suffix) pair"""
+    prefix, _, suffix = json_dumps(payload).partition(json_dumps(TIMESTAMP_PLACEHOLDER))
+    return prefix, suffix
+
+def _render_body(template, now):
+    """Fill a pre-serialized body with the request timestamp"""
+    prefix, suffix = template
+    return f'{prefix}"{now.isoformat()}"{suffix}'
+
+# Probe endpoints only vary by timestamp, so their JSON is serialized once at import
+HEALTH_BODY = _body_template({
+    'status': 'operational',
+    'version': '1.0.0',
+    'timestamp': TIMESTAMP_PLACEHOLDER,
+    'message': 'AI Weather Lambda backend is working!',
+    'features': ['weather_data', 'ai_insights', 'openai_integration', 'audience_targeting']
+})
+SYSTEM_STATUS_BODIES = {
+    (weather_key, openai_key): _body_template({
+        'weather_api': 'operational' if weather_key else 'missing_key',
+        'openai_api': 'operational' if openai_key else 'missing_key',
+        'backend': 'operational',
+        'timestamp': TIMESTAMP_PLACEHOLDER,
+        'environment': 'lambda',
+        'ai_features': 'enabled'
+    })
+    for weather_key in (False, True)
+    for openai_key in (False, True)
+}
+
+def handle_health(event, cors_headers, now):
+    """Health endpoint"""
+    return {
+        'statusCode': 200,
+        'headers': cors_headers,
+        'body': _render_body(HEALTH_BODY, now)
     }
 
+def handle_weather_insights(event, cors_headers, now):
+    """Weather insights endpoint - FULL AI VERSION"""
     try:
-        # Handle OPTIONS (CORS preflight) - for ANY path
-        if method == 'OPTIONS':
-            return {
-                'statusCode': 200,
-                'headers': cors_headers,
-                'body': ''
-            }
-
-        # Health endpoint
-        if path == '/health':
-            return {
-                'statusCode': 200,
-                'headers': cors_headers,
-                'body': json.dumps({
-                    'status': 'operational',
-                    'version': '1.0.0',
-                    'timestamp': datetime.now(PHILIPPINE_TZ).isoformat(),
-                    'message': 'AI Weather Lambda backend is working!',
-                    'features': ['weather_data', 'ai_insights', 'openai_integration', 'audience_targeting']
-                })
-            }
-
-        # Weather insights endpoint - FULL AI VERSION
-        elif path == '/weather/insights' and method == 'POST':
+        # Safely parse request body
+        body = {}
+        if event.get('body'):
             try:
-                # Safely parse request body
-                body = {}
-                if event.get('body'):
-                    try:
-                        body = json.loads(event.get('body'))
-                    except json.JSONDecodeError:
-                        return {
-                            'statusCode': 400,
-                            'headers': cors_headers,
-                            'body': json.dumps({
-                                'success': False,
-                                'error': 'Invalid JSON in request body'
-                            })
-                        }
-
-                location = body.get('location', 'Manila, PH')
-                audience = body.get('audience', 'general')
-
-                # Get weather data
-                weather_data, error = get_weather_data(location)
-                if error:
-                    return {
-                        'statusCode': 400,
-                        'headers': cors_headers,
-                        'body': json.dumps({
-                            'success': False,
-                            'error': error
-                        })
-                    }
-
-                # Analyze with AI
-                analysis, ai_error = analyze_weather_with_ai(weather_data, audience)
-
-                if ai_error:
-                    analysis['ai_error'] = ai_error
-
-                response = {
-                    'statusCode': 200,
-                    'headers': cors_headers,
-                    'body': json.dumps(analysis)
-                }
-                print(f"Returning successful response: {response}")
-                return response
-
-            except Exception as e:
-                # Log the full error for debugging
-                print(f"Weather insights error: {str(e)}")
-                import traceback
-                print(f"Traceback: {traceback.format_exc()}")
+                body = json_loads(event.get('body'))
+            except json.JSONDecodeError:
                 return {
-                    'statusCode': 500,
+                    'statusCode': 400,
                     'headers': cors_headers,
-                    'body': json.dumps({
+                    'body': json_dumps({
                         'success': False,
-                        'error': f'Weather insights error: {str(e)}',
-                        'timestamp': datetime.now(PHILIPPINE_TZ).isoformat()
+                        'error': 'Invalid JSON in request body'
                     })
                 }
 
-        # System status endpoint
-        elif path == '/system/status':
+        # Validate input before spending an OpenWeather round trip
+        location = (body.get('location', 'Manila, PH') or '').strip()
+        if not location:
             return {
-                'statusCode': 200,
+                'statusCode': 400,
                 'headers': cors_headers,
-                'body': json.dumps({
-                    'weather_api': 'operational' if os.environ.get('OPENWEATHER_API_KEY') else 'missing_key',
-                    'openai_api': 'operational' if os.environ.get('OPENAI_API_KEY') else 'missing_key',
-                    'backend': 'operational',
-                    'timestamp': datetime.now(PHILIPPINE_TZ).isoformat(),
-                    'environment': 'lambda',
-                    'ai_features': 'enabled'
+                'body': json_dumps({
+                    'success': False,
+                    'error': 'location required'
                 })
             }
 
-        # Test connection endpoint
-        elif path == '/api/test-connection' and method == 'POST':
-            try:
-                body = json.loads(event.get('body', '{}')) if event.get('body') else {}
-            except:
-                body = {}
+        audience = body.get('audience', 'general')
+        if audience not in AUDIENCE_PROMPTS:
+            audience = 'general'
 
+        # Get weather data
+        weather_data, error = get_weather_data(location)
+        if error:
             return {
-                'statusCode': 200,
+                'statusCode': 400,
                 'headers': cors_headers,
-                'body': json.dumps({
-                    'status': 'success',
-                    'message': 'AI Weather Lambda received your request!',
-                    'received_data': body,
-                    'timestamp': datetime.now(PHILIPPINE_TZ).isoformat(),
-                    'ai_features': 'enabled'
+                'body': json_dumps({
+                    'success': False,
+                    'error': error
                 })
             }
 
-        # Not found
-        else:
-            return {
-                'statusCode': 404,
-                'headers': cors_headers,
-                'body': json.dumps({
-                    'error': 'Not Found',
-                    'path': path,
-                    'method': method
-                })
-            }
+        # Analyze with AI
+        analysis, ai_error = analyze_weather_with_ai(weather_data, audience, now=now)
+
+        if ai_error:
+            analysis['ai_error'] = ai_error
+
+        response = {
+            'statusCode': 200,
+            'headers': cors_headers,
+            'body': json_dumps(analysis)
+        }
+        logger.debug("Returning successful response: %s", response)
+        return response
 
     except Exception as e:
-        # Global error handler
-        print(f"Global Lambda error: {str(e)}")
-        import traceback
-        print(f"Global Traceback: {traceback.format_exc()}")
+        # Log the full error for debugging
+        logger.error("Weather insights error: %s: %s", type(e).__name__, e)
+        logger.debug("Traceback:", exc_info=True)
         return {
             'statusCode': 500,
             'headers': cors_headers,
-            'body': json.dumps({
+            'body': json_dumps({
+                'success': False,
+                'error': f'Weather insights error: {str(e)}',
+                'timestamp': now.isoformat()
+            })
+        }
+
+def handle_system_status(event, cors_headers, now):
+    """System status endpoint"""
+    return {
+        'statusCode': 200,
+        'headers': cors_headers,
+        'body': _render_body(
+            SYSTEM_STATUS_BODIES[bool(os.environ.get('OPENWEATHER_API_KEY')), bool(os.environ.get('OPENAI_API_KEY'))],
+            now
+        )
+    }
+
+def handle_test_connection(event, cors_headers, now):
+    """Test connection endpoint"""
+    try:
+        body = json_loads(event.get('body', '{}')) if event.get('body') else {}
+    except:
+        body = {}
+
+    return {
+        'statusCode': 200,
+        'headers': cors_headers,
+        'body': json_dumps({
+            'status': 'success',
+            'message': 'AI Weather Lambda received your request!',
+            'received_data': body,
+            'timestamp': now.isoformat(),
+            'ai_features': 'enabled'
+        })
+    }
+
+def handle_not_found(event, cors_headers, now):
+    """Not found"""
+    return {
+        'statusCode': 404,
+        'headers': cors_headers,
+        'body': json_dumps({
+            'error': 'Not Found',
+            'path': event.get('path', '/'),
+            'method': event.get('httpMethod', 'GET')
+        })
+    }
+
+# CORS headers - Enhanced for frontend compatibility. Built once and shared by every
+# response; plain dicts so the Lambda runtime can serialize them, and never mutated
+CORS_HEADERS = {
+    'Content-Type': 'application/json',
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Methods': 'GET, POST, PUT, DELETE, OPTIONS',
+    'Access-Control-Allow-Headers': 'Content-Type, Authorization, X-Requested-With, Accept, Origin',
+    'Access-Control-Max-Age': '3600'
+}
+PREFLIGHT_RESPONSE = {
+    'statusCode': 200,
+    'headers': CORS_HEADERS,
+    'body': ''
+}
+
+# Route table keyed by (method, path); a None method matches any method
+ROUTES = {
+    (None, '/health'): handle_health,
+    ('POST', '/weather/insights'): handle_weather_insights,
+    (None, '/system/status'): handle_system_status,
+    ('POST', '/api/test-connection'): handle_test_connection
+}
+
+def lambda_handler(event, context):
+    """Lambda handler with full AI weather functionality"""
+
+    # One timestamp for the whole request
+    now = datetime.now(PHILIPPINE_TZ)
+
+    # Add debug logging
+    if logger.isEnabledFor(logging.DEBUG):
+        try:
+            logger.debug("Lambda event: %s", json_dumps(event))
+        except (TypeError, ValueError):  # e.g. orjson rejects non-str keys and ints beyond 64 bits
+            logger.debug("Lambda event (not JSON-serializable): %r", event)
+
+    method = event.get('httpMethod', 'GET')
+    path = event.get('path', '/')
+
+    try:
+        # Handle OPTIONS (CORS preflight) - for ANY path
+        if method == 'OPTIONS':
+            return PREFLIGHT_RESPONSE
+
+        handler = ROUTES.get((method, path)) or ROUTES.get((None, path), handle_not_found)
+        return handler(event, CORS_HEADERS, now)
+
+    except Exception as e:
+        # Global error handler
+        logger.error("Global Lambda error: %s: %s", type(e).__name__, e)
+        logger.debug("Global Traceback:", exc_info=True)
+        return {
+            'statusCode': 500,
+            'headers': CORS_HEADERS,
+            'body': json_dumps({
                 'error': 'Internal server error',
                 'details': str(e),
-                'timestamp': datetime.now(PHILIPPINE_TZ).isoformat()
+                'timestamp': now.isoformat()
             })
-        }
\ No newline at end of file
+        }
+
+def _prewarm_connection(url, timeout=5):
+    """Open this thread's pooled connection to a URL's host ahead of the first request"""
+    parts = urllib.parse.urlsplit(url)
+    try:
+        _get_connection(parts.scheme, parts.netloc, timeout).connect()
+    except Exception as e:
+        _drop_connection(parts.scheme, parts.netloc)
+        logger.debug("Connection prewarm for %s failed: %s", parts.netloc, e)
+
+def prewarm_connections():
+    """Complete DNS and TLS setup during Lambda init so the first invocation finds open connections
+
+    Connections are pooled per thread: OpenAI is called from the handler thread, OpenWeather from
+    the two executor workers, so each of those threads warms its own socket.
+    """
+    if os.environ.get('OPENWEATHER_API_KEY'):
+        warmups = [_HTTP_EXECUTOR.submit(_prewarm_connection, OPENWEATHER_BASE_URL) for _ in range(2)]
+    else:
+        warmups = []
+    if os.environ.get('OPENAI_API_KEY'):
+        _prewarm_connection(OPENAI_CHAT_URL)
+    for warmup in warmups:
+        warmup.result()
+
+if os.environ.get('PREWARM_CONNECTIONS', '1') == '1' and os.environ.get('AWS_LAMBDA_FUNCTION_NAME'):
+    prewarm_connections()
@@ -1,13 +1,14 @@
 import asyncio
+import logging
 import time
 from datetime import datetime, timezone, timedelta
-from typing import List
+from typing import List, Optional
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, HTTPException, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-import uvicorn
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+import orjson
 from pydantic_settings import BaseSettings
 
 from workflows.weather_workflow import WeatherInsightsWorkflow, WeatherInsightsResult
@@ -25,6 +26,9 @@ class Settings(BaseSettings):
     openai_api_key: str
     openweather_api_key: str
     qdrant_url: str = "http://localhost:6333"
+    openai_model: str = "gpt-3.5-turbo"
+    redis_url: Optional[str] = None
+    checkpoint_db: Optional[str] = None
     environment: str = "development"
     log_level: str = "INFO"
     
@@ -36,9 +40,12 @@ class Settings(BaseSettings):
 settings = Settings()
 workflow: WeatherInsightsWorkflow = None
 
+logging.basicConfig(level=settings.log_level.upper())
+logger = logging.getLogger(__name__)
+
 # Setup timezone (GMT+8 for Philippines)
 PHILIPPINE_TZ = timezone(timedelta(hours=8))
-start_time = datetime.now(PHILIPPINE_TZ)
+START_MONOTONIC = time.monotonic()
 
 
 @asynccontextmanager
@@ -47,21 +54,28 @@ async def lifespan(app: FastAPI):
     global workflow
     
     # Startup
-    print("🌦️ Starting AI Weather Insights Agent...")
+    logger.info("🌦️ Starting AI Weather Insights Agent...")
     workflow = WeatherInsightsWorkflow(
         openai_api_key=settings.openai_api_key,
         openweather_api_key=settings.openweather_api_key,
-        qdrant_url=settings.qdrant_url
+        qdrant_url=settings.qdrant_url,
+        llm_model=settings.openai_model,
+        redis_url=settings.redis_url,
+        checkpoint_path=settings.checkpoint_db
     )
-    print("✅ Weather Insights Agent ready!")
+    try:
+        await workflow.warmup()
+    except Exception as e:
+        logger.warning("⚠️ Prompt warmup failed, prompts will be generated on demand: %s", e)
+    logger.info("✅ Weather Insights Agent ready!")
     
     yield
     
     # Shutdown
-    print("🔄 Shutting down Weather Insights Agent...")
+    logger.info("🔄 Shutting down Weather Insights Agent...")
     if workflow:
-        workflow.close()
-    print("✅ Shutdown complete!")
+        await workflow.aclose()
+    logger.info("✅ Shutdown complete!")
 
 
 # Create FastAPI app
@@ -69,6 +83,7 @@ app = FastAPI(
     title="AI Weather Insights Agent",
     description="Transforms raw weather data into actionable insights for rural communities, farmers, and local officials",
     version="1.0.0",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
@@ -83,11 +98,24 @@ app.add_middleware(
 
 
 # Helper functions
+def parse_timestamp(value) -> datetime:
+    """Accept a datetime or ISO string, defaulting to now without a format/parse round trip"""
+    if isinstance(value, datetime):
+        return value
+    if value:
+        return datetime.fromisoformat(value)
+    return datetime.now()
+
+
 def convert_workflow_result_to_response(result: WeatherInsightsResult) -> WeatherInsightsResponse:
-    """Convert workflow result to API response format"""
+    """Convert workflow result to API response format
+
+    The workflow result is already typed and validated, so response models are built
+    with model_construct instead of re-validating every field.
+    """
     
     if not result.success:
-        return WeatherInsightsResponse(
+        return WeatherInsightsResponse.model_construct(
             location=result.location,
             analysis_time=result.analysis_time,
             current_weather=None,
@@ -106,7 +134,7 @@ def convert_workflow_result_to_response(result: WeatherInsightsResult) -> Weathe
         if isinstance(weather_dict, list):
             weather_dict = weather_dict[0] if weather_dict else {}
         
-        current_weather_data = WeatherCondition(
+        current_weather_data = WeatherCondition.model_construct(
             location=weather_dict.get('location', result.location),
             temperature=weather_dict.get('temperature', 0),
             humidity=weather_dict.get('humidity', 0),
@@ -114,11 +142,11 @@ def convert_workflow_result_to_response(result: WeatherInsightsResult) -> Weathe
             wind_speed=weather_dict.get('wind_speed', 0),
             weather_condition=weather_dict.get('weather_condition', 'Unknown'),
             description=weather_dict.get('description', ''),
-            timestamp=weather_dict.get('timestamp') if isinstance(weather_dict.get('timestamp'), datetime) else datetime.fromisoformat(weather_dict.get('timestamp', datetime.now().isoformat()))
+            timestamp=parse_timestamp(weather_dict.get('timestamp'))
         )
     
     # Convert data quality
-    data_quality = DataQualityResponse(
+    data_quality = DataQualityResponse.model_construct(
         quality_score=result.data_quality.quality_score,
         anomalies_detected=result.data_quality.anomalies_detected,
         summary=result.data_quality.summary,
@@ -126,10 +154,10 @@ def convert_workflow_result_to_response(result: WeatherInsightsResult) -> Weathe
     )
     
     # Convert forecast insights
-    forecast_insights = ForecastResponse(
+    forecast_insights = ForecastResponse.model_construct(
         location=result.forecast_insights.location,
         insights=[
-            ForecastInsight(
+            ForecastInsight.model_construct(
                 category=insight.category,
                 priority=insight.priority,
                 time_horizon=insight.time_horizon,
@@ -144,10 +172,10 @@ def convert_workflow_result_to_response(result: WeatherInsightsResult) -> Weathe
     )
     
     # Convert recommendations
-    recommendations = AdviceResponse(
+    recommendations = AdviceResponse.model_construct(
         location=result.recommendations.location,
         recommendations=[
-            Recommendation(
+            Recommendation.model_construct(
                 target_audience=rec.target_audience,
                 action_type=rec.action_type,
                 priority=rec.priority,
@@ -166,7 +194,7 @@ def convert_workflow_result_to_response(result: WeatherInsightsResult) -> Weathe
     
     # Convert knowledge items
     knowledge_items = [
-        KnowledgeItem(
+        KnowledgeItem.model_construct(
             content=item.content,
             score=item.score,
             source=item.source,
@@ -175,7 +203,7 @@ def convert_workflow_result_to_response(result: WeatherInsightsResult) -> Weathe
         ) for item in result.relevant_knowledge
     ]
     
-    return WeatherInsightsResponse(
+    return WeatherInsightsResponse.model_construct(
         location=result.location,
         analysis_time=result.analysis_time,
         current_weather=current_weather_data,
@@ -187,24 +215,39 @@ def convert_workflow_result_to_response(result: WeatherInsightsResult) -> Weathe
     )
 
 
+def model_json_response(model) -> Response:
+    """Serialize a built response model in pydantic-core directly
+    
+    Returning the Response skips FastAPI's response_model re-validation and jsonable_encoder walk;
+    response_model stays on the route for the OpenAPI schema.
+    """
+    return Response(content=model.model_dump_json(), media_type="application/json")
+
+
+def format_uptime() -> str:
+    """Uptime as H:MM:SS (days folded into hours), from the monotonic clock"""
+    seconds = int(time.monotonic() - START_MONOTONIC)
+    hours, remainder = divmod(seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}"
+
+
 # API Endpoints
 @app.get("/", response_model=HealthResponse)
 async def root():
     """Root endpoint with basic service info"""
-    uptime = datetime.now(PHILIPPINE_TZ) - start_time
     return HealthResponse(
         status="operational",
-        uptime=str(uptime).split('.')[0]  # Remove microseconds
+        uptime=format_uptime()
     )
 
 
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
     """Health check endpoint"""
-    uptime = datetime.now(PHILIPPINE_TZ) - start_time
     return HealthResponse(
         status="operational",
-        uptime=str(uptime).split('.')[0]
+        uptime=format_uptime()
     )
 
 @app.post("/api/test-connection")
@@ -222,76 +265,128 @@ async def test_connection(data: dict):
 async def get_weather_insights(request: WeatherRequest):
     """Get comprehensive weather insights for a single location"""
     try:
-        print(f"🔍 Starting analysis for {request.location}, audience: {request.audience}")
-        start_analysis = time.time()
+        logger.info("🔍 Starting analysis for %s, audience: %s", request.location, request.audience)
+        start_analysis = time.perf_counter()
         
-        print(f"🔍 Calling workflow.run_analysis...")
+        logger.debug("🔍 Calling workflow.run_analysis...")
         result = await workflow.run_analysis(
             location=request.location,
             audience=request.audience,
             latitude=request.latitude,
-            longitude=request.longitude
+            longitude=request.longitude,
+            request_id=request.request_id
         )
         
-        print(f"🔍 Converting workflow result to response...")
+        logger.debug("🔍 Converting workflow result to response...")
         response = convert_workflow_result_to_response(result)
         
         # Log processing time
-        processing_time = time.time() - start_analysis
-        print(f"✅ Analysis completed for {request.location} in {processing_time:.2f}s")
+        processing_time = time.perf_counter() - start_analysis
+        logger.info("✅ Analysis completed for %s in %.2fs", request.location, processing_time)
         
-        return response
+        return model_json_response(response)
         
     except Exception as e:
-        print(f"❌ DETAILED ERROR for {request.location}:")
-        print(f"❌ Error type: {type(e).__name__}")
-        print(f"❌ Error message: {str(e)}")
-        import traceback
-        print(f"❌ Full traceback:")
-        traceback.print_exc()
+        logger.exception("❌ Analysis failed for %s: %s: %s", request.location, type(e).__name__, e)
         raise HTTPException(
             status_code=500,
             detail=f"Analysis failed: {str(e)}"
         )
 
 
+@app.post("/api/weather/insights/stream")
+async def stream_weather_insights(request: WeatherRequest):
+    """Stream workflow progress as NDJSON, ending with the full insights response"""
+    
+    async def events():
+        try:
+            async for kind, payload in workflow.stream_analysis(
+                location=request.location,
+                audience=request.audience,
+                latitude=request.latitude,
+                longitude=request.longitude,
+                request_id=request.request_id
+            ):
+                if kind == "stage":
+                    yield orjson.dumps({"event": "stage", "stage": payload}) + b"\n"
+                elif kind == "partial":
+                    yield orjson.dumps(
+                        {"event": "partial", "data": payload},
+                        default=lambda model: model.model_dump(mode="json")
+                    ) + b"\n"
+                else:
+                    # Splice the model's own JSON in rather than dumping to dicts and re-encoding
+                    response = convert_workflow_result_to_response(payload)
+                    yield b'{"event":"result","data":' + response.model_dump_json().encode() + b"}\n"
+        except Exception as e:
+            logger.exception("❌ Streaming analysis failed for %s: %s", request.location, e)
+            yield orjson.dumps({"event": "error", "message": f"Analysis failed: {str(e)}"}) + b"\n"
+    
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
 @app.post("/api/weather/batch", response_model=BatchWeatherInsightsResponse)
 async def get_batch_weather_insights(request: BatchWeatherRequest):
     """Get weather insights for multiple locations"""
     try:
-        start_batch = time.time()
+        start_batch = time.perf_counter()
         
         results = await workflow.run_batch_analysis(
             locations=request.locations,
             audience=request.audience
         )
         
-        # Convert results to response format
-        responses = [convert_workflow_result_to_response(result) for result in results]
+        # Convert results to response format off the event loop
+        responses = await asyncio.to_thread(
+            lambda: [convert_workflow_result_to_response(result) for result in results]
+        )
         
         # Calculate statistics
         successful = sum(1 for r in responses if r.success)
         failed = len(responses) - successful
-        processing_time = time.time() - start_batch
+        processing_time = time.perf_counter() - start_batch
         
-        print(f"✅ Batch analysis completed: {successful}/{len(request.locations)} successful in {processing_time:.2f}s")
+        logger.info(
+            "✅ Batch analysis completed: %d/%d successful in %.2fs",
+            successful, len(request.locations), processing_time
+        )
         
-        return BatchWeatherInsightsResponse(
+        # Responses were built by convert_workflow_result_to_response; skip re-validating them
+        return model_json_response(BatchWeatherInsightsResponse.model_construct(
             results=responses,
             total_locations=len(request.locations),
             successful_analyses=successful,
             failed_analyses=failed,
             processing_time=processing_time
-        )
+        ))
         
     except Exception as e:
-        print(f"❌ Error processing batch request: {str(e)}")
+        logger.error("❌ Error processing batch request: %s", e)
         raise HTTPException(
             status_code=500,
             detail=f"Batch analysis failed: {str(e)}"
         )
 
 
+@app.post("/api/weather/batch/stream")
+async def stream_batch_weather_insights(request: BatchWeatherRequest):
+    """Stream batch results as NDJSON in completion order, each tagged with its request index"""
+    
+    async def events():
+        try:
+            async for index, result in workflow.run_batch_analysis_iter(
+                locations=request.locations,
+                audience=request.audience
+            ):
+                response = convert_workflow_result_to_response(result)
+                yield b'{"event":"result","index":%d,"data":' % index + response.model_dump_json().encode() + b"}\n"
+        except Exception as e:
+            logger.exception("❌ Streaming batch failed: %s", e)
+            yield orjson.dumps({"event": "error", "message": f"Batch analysis failed: {str(e)}"}) + b"\n"
+    
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
 @app.get("/api/system/status", response_model=SystemStatusResponse)
 async def get_system_status():
     """Get system status and health information"""
@@ -311,11 +406,11 @@ async def get_system_status():
             workflow=status_info.get("workflow", "unknown"),
             services=services,
             knowledge_base_stats=status_info.get("rag_knowledge_base", {}),
-            timestamp=datetime.fromisoformat(status_info.get("timestamp", datetime.now().isoformat()))
+            timestamp=parse_timestamp(status_info.get("timestamp"))
         )
         
     except Exception as e:
-        print(f"❌ Error getting system status: {str(e)}")
+        logger.error("❌ Error getting system status: %s", e)
         raise HTTPException(
             status_code=500,
             detail=f"Status check failed: {str(e)}"
@@ -326,7 +421,7 @@ async def get_system_status():
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
     """Handle HTTP exceptions"""
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=exc.status_code,
         content=ErrorResponse(
             error_type="HTTP_ERROR",
@@ -339,8 +434,8 @@ async def http_exception_handler(request, exc):
 @app.exception_handler(Exception)
 async def general_exception_handler(request, exc):
     """Handle general exceptions"""
-    print(f"❌ Unhandled exception: {str(exc)}")
-    return JSONResponse(
+    logger.error("❌ Unhandled exception: %s", exc)
+    return ORJSONResponse(
         status_code=500,
         content=ErrorResponse(
             error_type="INTERNAL_SERVER_ERROR",
@@ -351,7 +446,10 @@ async def general_exception_handler(request, exc):
 
 
 if __name__ == "__main__":
-    print("🚀 Starting AI Weather Insights Agent API...")
+    # Only needed when run directly, so ASGI/serverless imports of main skip it
+    import uvicorn
+    
+    logger.info("🚀 Starting AI Weather Insights Agent API...")
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
@@ -10,6 +10,7 @@ class WeatherRequest(BaseModel):
     audience: str = Field(default="general", description="Target audience: farmers, officials, general")
     latitude: Optional[float] = Field(None, description="Optional latitude coordinate")
     longitude: Optional[float] = Field(None, description="Optional longitude coordinate")
+    request_id: Optional[str] = Field(None, description="Optional client request ID; retrying with the same ID resumes a failed analysis")
 
 
 class BatchWeatherRequest(BaseModel):
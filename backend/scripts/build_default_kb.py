@@ -0,0 +1,43 @@
+"""Precompute the default knowledge embeddings shipped with RAGService.
+
+Run from backend/ whenever the default documents or the embedding model change:
+
+    python scripts/build_default_kb.py
+"""
+import json
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.embeddings import load_encoder
+from services.rag_service import (
+    DEFAULT_KB_EMBEDDINGS_PATH, DEFAULT_KB_META_PATH, DEFAULT_KB_SCHEMA_VERSION,
+    default_knowledge_fingerprint, default_knowledge_items
+)
+
+
+def main():
+    items = default_knowledge_items()
+    encoder = load_encoder()
+    embeddings = np.asarray(
+        encoder.encode([knowledge.content for knowledge in items], normalize_embeddings=True),
+        dtype=np.float32
+    )
+
+    np.save(DEFAULT_KB_EMBEDDINGS_PATH, embeddings)
+    with open(DEFAULT_KB_META_PATH, "w", encoding="utf-8") as f:
+        json.dump({
+            "schema_version": DEFAULT_KB_SCHEMA_VERSION,
+            "encoder": type(encoder).__name__,
+            "fingerprint": default_knowledge_fingerprint(items),
+            "titles": [knowledge.title for knowledge in items]
+        }, f, indent=2)
+
+    print(f"✅ Saved {embeddings.shape[0]}x{embeddings.shape[1]} embeddings to {DEFAULT_KB_EMBEDDINGS_PATH}")
+
+
+if __name__ == "__main__":
+    main()
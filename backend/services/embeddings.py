@@ -0,0 +1,141 @@
+import logging
+import os
+from typing import List, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL_ID = "sentence-transformers/all-MiniLM-L6-v2"
+STATIC_MODEL_ID = "minishlab/potion-base-8M"
+DEFAULT_ONNX_MODEL_DIR = os.path.expanduser("~/.cache/onnx/all-MiniLM-L6-v2-int8")
+QUANTIZED_MODEL_FILE = "model_quantized.onnx"
+
+
+class OnnxSentenceEncoder:
+    """int8-quantized ONNX Runtime port of all-MiniLM-L6-v2 with a SentenceTransformer-style encode()
+
+    Mirrors the model's Transformer → mean Pooling → Normalize pipeline, so vectors match
+    the ones already stored in Qdrant to within quantization error.
+    """
+
+    def __init__(self, model_dir: str = DEFAULT_ONNX_MODEL_DIR):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        model_path = os.path.join(model_dir, QUANTIZED_MODEL_FILE)
+        if not os.path.exists(model_path):
+            self._export_quantized(model_dir)
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = os.cpu_count() or 1
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+
+    @staticmethod
+    def _export_quantized(model_dir: str):
+        """Export the model to ONNX and apply dynamic int8 (VNNI) quantization, once per machine"""
+        from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer
+        from optimum.onnxruntime.configuration import AutoQuantizationConfig
+        from transformers import AutoTokenizer
+
+        logger.info("📦 Exporting int8 ONNX embedding model to %s", model_dir)
+        model = ORTModelForFeatureExtraction.from_pretrained(EMBEDDING_MODEL_ID, export=True)
+        quantizer = ORTQuantizer.from_pretrained(model)
+        quantizer.quantize(
+            save_dir=model_dir,
+            quantization_config=AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False)
+        )
+        AutoTokenizer.from_pretrained(EMBEDDING_MODEL_ID).save_pretrained(model_dir)
+
+    def encode(
+        self,
+        sentences: Union[str, List[str]],
+        batch_size: int = 32,
+        normalize_embeddings: bool = True,
+        convert_to_numpy: bool = True,
+        **kwargs
+    ) -> np.ndarray:
+        """Embed one sentence (1-D result) or a list of sentences (2-D result)"""
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+
+        batches = []
+        for start in range(0, len(texts), batch_size):
+            encoded = self.tokenizer(
+                texts[start:start + batch_size],
+                padding=True,
+                truncation=True,
+                max_length=256,
+                return_tensors="np"
+            )
+            feeds = {name: value.astype(np.int64) for name, value in encoded.items() if name in self.input_names}
+            token_embeddings = self.session.run(None, feeds)[0]
+
+            # Mean pooling over non-padding tokens, then L2 normalization as in the original pipeline
+            mask = encoded["attention_mask"][..., np.newaxis].astype(np.float32)
+            pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+            batches.append(pooled / np.clip(norms, 1e-12, None))
+
+        embeddings = np.concatenate(batches) if batches else np.empty((0, 384), dtype=np.float32)
+        return embeddings[0] if single else embeddings
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return 384
+
+
+class StaticSentenceEncoder:
+    """Model2Vec static embeddings (token lookup + mean pool) behind a SentenceTransformer-style encode()"""
+
+    def __init__(self, model_id: str = STATIC_MODEL_ID):
+        from model2vec import StaticModel
+
+        self.model = StaticModel.from_pretrained(model_id)
+
+    def encode(
+        self,
+        sentences: Union[str, List[str]],
+        batch_size: int = 1024,
+        normalize_embeddings: bool = True,
+        convert_to_numpy: bool = True,
+        **kwargs
+    ) -> np.ndarray:
+        """Embed one sentence (1-D result) or a list of sentences (2-D result)"""
+        single = isinstance(sentences, str)
+        embeddings = np.asarray(
+            self.model.encode([sentences] if single else list(sentences), batch_size=batch_size),
+            dtype=np.float32
+        )
+        if normalize_embeddings:
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            embeddings = embeddings / np.clip(norms, 1e-12, None)
+        return embeddings[0] if single else embeddings
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return int(self.model.dim)
+
+
+def load_encoder():
+    """Load the RAG encoder selected by EMBEDDING_BACKEND, falling back down the chain
+
+    model2vec (default, static embeddings) → onnx (int8 MiniLM) → sentence-transformers (MiniLM).
+    """
+    backend = os.getenv("EMBEDDING_BACKEND", "model2vec")
+
+    if backend == "model2vec":
+        try:
+            return StaticSentenceEncoder(os.getenv("STATIC_MODEL_ID", STATIC_MODEL_ID))
+        except Exception as e:
+            logger.warning("⚠️ Model2Vec embedding model unavailable, trying ONNX: %s", e)
+            backend = "onnx"
+
+    if backend == "onnx":
+        try:
+            return OnnxSentenceEncoder(os.getenv("ONNX_MODEL_DIR", DEFAULT_ONNX_MODEL_DIR))
+        except Exception as e:
+            logger.warning("⚠️ ONNX embedding model unavailable, using SentenceTransformer: %s", e)
+
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer('all-MiniLM-L6-v2')  # Lightweight model
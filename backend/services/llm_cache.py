@@ -0,0 +1,108 @@
+import asyncio
+import hashlib
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+class LLMResponseCache:
+    """Two-tier (exact + optional semantic) cache for LLM responses"""
+    
+    def __init__(
+        self,
+        max_entries: int = 256,
+        encoder: Optional[Callable[[str], Any]] = None,
+        similarity_threshold: float = 0.97
+    ):
+        self.max_entries = max_entries
+        # e.g. SentenceTransformer.encode; enables semantic matching. Only suitable when the
+        # variable part dominates the prompt: encoders truncate long prompts, so mostly fixed
+        # instructions would match across different locations and readings.
+        self.encoder = encoder
+        self.similarity_threshold = similarity_threshold
+        self._exact: "OrderedDict[str, Any]" = OrderedDict()
+        self._semantic: Dict[str, List[Tuple[np.ndarray, str]]] = {}
+    
+    async def ainvoke(self, llm: Any, messages: Any, namespace: str = "default", semantic: bool = True) -> Any:
+        """Return a cached response for these messages or invoke the LLM and store it"""
+        return await self.get_or_compute(messages, lambda: llm.ainvoke(messages), namespace, semantic)
+    
+    async def get_or_compute(
+        self,
+        messages: Any,
+        compute: Callable[[], Awaitable[Any]],
+        namespace: str = "default",
+        semantic: bool = True
+    ) -> Any:
+        """Return a cached value for these messages or await compute() and store its result
+        
+        semantic=False restricts the lookup to exact prompt matches.
+        """
+        prompt_text = self._messages_to_text(messages)
+        key = self._make_key(namespace, prompt_text)
+        
+        # 1. Exact match
+        if key in self._exact:
+            self._exact.move_to_end(key)
+            return self._exact[key]
+        
+        # 2. Semantic match
+        vector = None
+        if semantic and self.encoder is not None:
+            vector = await asyncio.to_thread(self._embed, prompt_text)
+            semantic_key = self._find_similar(namespace, vector)
+            if semantic_key is not None and semantic_key in self._exact:
+                self._exact.move_to_end(semantic_key)
+                return self._exact[semantic_key]
+        
+        response = await compute()
+        self._store(namespace, key, response, vector)
+        return response
+    
+    def clear(self):
+        """Drop all cached responses"""
+        self._exact.clear()
+        self._semantic.clear()
+    
+    def _messages_to_text(self, messages: Any) -> str:
+        """Flatten chat messages into a single string"""
+        if isinstance(messages, list):
+            return "\n".join(
+                f"{getattr(m, 'type', type(m).__name__)}: {getattr(m, 'content', m)}" for m in messages
+            )
+        return str(messages)
+    
+    def _make_key(self, namespace: str, prompt_text: str) -> str:
+        """SHA256 key over namespace and prompt"""
+        return hashlib.sha256(f"{namespace}\x00{prompt_text}".encode("utf-8")).hexdigest()
+    
+    def _embed(self, text: str) -> np.ndarray:
+        """Embed and L2-normalize text for cosine comparison"""
+        vector = np.asarray(self.encoder(text), dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+    
+    def _find_similar(self, namespace: str, vector: np.ndarray) -> Optional[str]:
+        """Find the cached key whose prompt is most similar above the threshold"""
+        entries = self._semantic.get(namespace)
+        if not entries:
+            return None
+        
+        matrix = np.stack([v for v, _ in entries])
+        scores = matrix @ vector
+        best = int(np.argmax(scores))
+        if scores[best] >= self.similarity_threshold:
+            return entries[best][1]
+        return None
+    
+    def _store(self, namespace: str, key: str, response: Any, vector: Optional[np.ndarray]):
+        """Store response and evict the least recently used entry when full"""
+        self._exact[key] = response
+        if vector is not None:
+            self._semantic.setdefault(namespace, []).append((vector, key))
+        
+        while len(self._exact) > self.max_entries:
+            evicted_key, _ = self._exact.popitem(last=False)
+            for ns, entries in self._semantic.items():
+                self._semantic[ns] = [(v, k) for v, k in entries if k != evicted_key]
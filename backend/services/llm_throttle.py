@@ -0,0 +1,74 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Awaitable, Callable, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class LLMThrottle:
+    """Bounds concurrent LLM calls, paces request rate and retries rate-limit errors"""
+    
+    def __init__(
+        self,
+        max_concurrency: int = 10,
+        requests_per_minute: Optional[float] = None,
+        max_attempts: int = 5,
+        base_backoff: float = 1.0
+    ):
+        self.max_concurrency = max_concurrency
+        self.requests_per_minute = requests_per_minute
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._rate_lock = asyncio.Lock()
+        
+        # Token bucket for request pacing
+        self._capacity = requests_per_minute or 0
+        self._tokens = self._capacity
+        self._last_refill = time.monotonic()
+    
+    async def run(self, call: Callable[[], Awaitable[T]]) -> T:
+        """Run an LLM call under the concurrency limit, retrying on rate limiting"""
+        for attempt in range(self.max_attempts):
+            async with self._semaphore:
+                await self._acquire_rate_slot()
+                try:
+                    return await call()
+                except Exception as e:
+                    if not self._is_rate_limit_error(e) or attempt == self.max_attempts - 1:
+                        raise
+            
+            # Back off outside the semaphore so other callers can proceed
+            delay = self.base_backoff * (2 ** attempt) + random.uniform(0, self.base_backoff)
+            logger.warning(
+                "⏳ LLM rate limited, retrying in %.1fs (attempt %d/%d)", delay, attempt + 1, self.max_attempts
+            )
+            await asyncio.sleep(delay)
+    
+    async def _acquire_rate_slot(self):
+        """Wait for a token from the requests-per-minute bucket"""
+        if not self.requests_per_minute:
+            return
+        
+        async with self._rate_lock:
+            while True:
+                now = time.monotonic()
+                refill = (now - self._last_refill) * self.requests_per_minute / 60
+                self._tokens = min(self._capacity, self._tokens + refill)
+                self._last_refill = now
+                
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                
+                await asyncio.sleep((1 - self._tokens) * 60 / self.requests_per_minute)
+    
+    def _is_rate_limit_error(self, error: Exception) -> bool:
+        """Detect provider rate-limit (HTTP 429) errors"""
+        if type(error).__name__ == "RateLimitError":
+            return True
+        return getattr(error, "status_code", None) == 429
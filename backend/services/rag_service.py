@@ -1,28 +1,73 @@
 import asyncio
+import hashlib
+import heapq
+import json
+import os
 import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from functools import lru_cache
 from typing import Dict, Any, List, Optional
 from datetime import datetime
-from qdrant_client import QdrantClient
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.http import models
 from qdrant_client.http.models import Distance, VectorParams, PointStruct
-from sentence_transformers import SentenceTransformer
 import numpy as np
-from pydantic import BaseModel
 
+from services.embeddings import StaticSentenceEncoder, load_encoder
 
-class WeatherKnowledge(BaseModel):
-    """Weather knowledge document for RAG"""
+
+# int8 scalar quantization keeps the quantized vectors in RAM; queries oversample
+# candidates on them and rescore with the original float vectors
+QUANTIZATION_CONFIG = models.ScalarQuantization(
+    scalar=models.ScalarQuantizationConfig(
+        type=models.ScalarType.INT8,
+        quantile=0.99,
+        always_ram=True
+    )
+)
+HNSW_CONFIG = models.HnswConfigDiff(m=16, ef_construct=128)
+
+QUERY_EMBEDDING_CACHE_SIZE = 2048
+
+KNOWN_CATEGORIES = ("weather_advisory", "historical_pattern", "best_practice")
+
+PAYLOAD_INDEX_FIELDS = ("category", "location")
+
+READY_MARKER_DIR = os.path.expanduser("~/.cache/ragservice")
+
+# Precomputed default-knowledge embeddings (see scripts/build_default_kb.py); bump the
+# schema version to invalidate assets built by an older script
+DEFAULT_KB_SCHEMA_VERSION = 1
+DEFAULT_KB_EMBEDDINGS_PATH = os.path.join(os.path.dirname(__file__), "default_kb.npy")
+DEFAULT_KB_META_PATH = os.path.join(os.path.dirname(__file__), "default_kb.json")
+# Contextual-knowledge queries arriving within the window (e.g. from a batch run) share
+# one query_batch_points round trip; a full batch is sent immediately
+QUERY_BATCH_WINDOW = 0.02  # seconds
+QUERY_BATCH_MAX_REQUESTS = 32
+
+SEARCH_PARAMS = models.SearchParams(
+    hnsw_ef=64,
+    quantization=models.QuantizationSearchParams(rescore=True, oversampling=2.0)
+)
+
+
+@dataclass(slots=True, frozen=True, kw_only=True)
+class WeatherKnowledge:
+    """Weather knowledge document for RAG (internal carrier, so a slotted dataclass)"""
     id: str
     title: str
     content: str
     category: str = "weather_advisory"  # weather_advisory, historical_pattern, best_practice
     location: Optional[str] = None
     date_created: datetime
-    tags: List[str] = []
+    tags: List[str] = field(default_factory=list)
     source: str = "system"  # system, pagasa, noah, user_upload
 
 
-class RAGResult(BaseModel):
-    """RAG search result"""
+@dataclass(slots=True, frozen=True)
+class RAGResult:
+    """RAG search result (internal carrier, so a slotted dataclass)"""
     content: str
     score: float
     source: str
@@ -30,6 +75,90 @@ class RAGResult(BaseModel):
     location: Optional[str] = None
 
 
+def default_knowledge_items() -> List[WeatherKnowledge]:
+    """Built-in weather knowledge seeded into a new collection"""
+    return [
+        WeatherKnowledge(
+            id=str(uuid.uuid4()),
+            title="High Humidity and Thunderstorm Formation",
+            content="When humidity levels exceed 80% combined with rising temperatures, the likelihood of thunderstorm formation increases significantly. Farmers should secure outdoor equipment and avoid tall structures. Livestock should be moved to sheltered areas.",
+            category="weather_advisory",
+            tags=["humidity", "thunderstorms", "farming", "safety"],
+            date_created=datetime.now(),
+            source="system"
+        ),
+        WeatherKnowledge(
+            id=str(uuid.uuid4()),
+            title="Temperature Drop and Frost Protection",
+            content="When nighttime temperatures are forecast to drop below 2°C, there is high risk of frost formation. Farmers should cover sensitive crops, drain irrigation systems, and provide additional shelter for livestock. Morning inspections are critical.",
+            category="best_practice",
+            tags=["frost", "temperature", "crops", "livestock"],
+            date_created=datetime.now(),
+            source="system"
+        ),
+        WeatherKnowledge(
+            id=str(uuid.uuid4()),
+            title="Wind Speed and Agricultural Activities",
+            content="Wind speeds above 15 m/s (54 km/h) make most agricultural activities dangerous. Avoid operating tall equipment, postpone spraying activities, and secure loose materials. Harvest operations should be suspended until winds subside.",
+            category="best_practice",
+            tags=["wind", "farming", "safety", "equipment"],
+            date_created=datetime.now(),
+            source="system"
+        ),
+        WeatherKnowledge(
+            id=str(uuid.uuid4()),
+            title="Pressure Drop and Weather System Approach",
+            content="A rapid atmospheric pressure drop of more than 3 hPa per hour often indicates an approaching weather system. Communities should prepare for potential severe weather including heavy rain, strong winds, or storms within 12-24 hours.",
+            category="weather_advisory",
+            tags=["pressure", "storms", "prediction", "preparation"],
+            date_created=datetime.now(),
+            source="system"
+        ),
+        WeatherKnowledge(
+            id=str(uuid.uuid4()),
+            title="Heat Index and Heat Stress Prevention",
+            content="When heat index exceeds 32°C (90°F), outdoor workers and livestock face heat stress risk. Schedule heavy work for early morning or evening, ensure adequate water supply, provide shade, and monitor for heat exhaustion symptoms.",
+            category="best_practice",
+            tags=["heat", "temperature", "health", "livestock", "safety"],
+            date_created=datetime.now(),
+            source="system"
+        ),
+        WeatherKnowledge(
+            id=str(uuid.uuid4()),
+            title="Rainfall Intensity and Flood Risk",
+            content="Rainfall rates exceeding 25mm per hour pose flash flood risks, especially in areas with poor drainage. Communities should clear drainage systems, avoid low-lying areas, and prepare emergency supplies. Agricultural fields may require drainage management.",
+            category="weather_advisory",
+            tags=["rainfall", "flooding", "drainage", "emergency"],
+            date_created=datetime.now(),
+            source="system"
+        )
+    ]
+
+
+def default_knowledge_fingerprint(items: List[WeatherKnowledge]) -> str:
+    """Identify the default documents an embeddings asset was built from"""
+    digest = hashlib.sha256(str(DEFAULT_KB_SCHEMA_VERSION).encode("utf-8"))
+    for knowledge in items:
+        digest.update(b"\0" + knowledge.content.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def load_default_embeddings(items: List[WeatherKnowledge], encoder: Any, vector_size: int) -> Optional[np.ndarray]:
+    """Load the embeddings built by scripts/build_default_kb.py, or None if missing or stale"""
+    try:
+        with open(DEFAULT_KB_META_PATH, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("fingerprint") != default_knowledge_fingerprint(items):
+            return None
+        if meta.get("encoder") != type(encoder).__name__:
+            return None
+        embeddings = np.load(DEFAULT_KB_EMBEDDINGS_PATH, mmap_mode="r")
+    except (OSError, ValueError):
+        return None
+    
+    return embeddings if embeddings.shape == (len(items), vector_size) else None
+
+
 class RAGService:
     """RAG service for weather knowledge management using Qdrant"""
     
@@ -38,123 +167,182 @@ class RAGService:
         qdrant_url: str = "http://localhost:6333",
         collection_name: str = "weather_knowledge"
     ):
-        self.client = QdrantClient(url=qdrant_url, timeout=60)
+        # gRPC sends vectors as packed floats rather than JSON; set QDRANT_PREFER_GRPC=false
+        # where only the REST port is reachable (e.g. single-port hosting)
+        self.client = AsyncQdrantClient(
+            url=qdrant_url,
+            grpc_port=int(os.getenv("QDRANT_GRPC_PORT", "6334")),
+            prefer_grpc=os.getenv("QDRANT_PREFER_GRPC", "true").lower() == "true",
+            timeout=60
+        )
         self.collection_name = collection_name
-        self.encoder = SentenceTransformer('all-MiniLM-L6-v2')  # Lightweight model
-        self.vector_size = 384  # all-MiniLM-L6-v2 output dimension
+        self.encoder = load_encoder()  # Model2Vec static embeddings, or a MiniLM fallback
+        # Static embeddings mean-pool token vectors, so word order never changes the result
+        self._order_insensitive = isinstance(self.encoder, StaticSentenceEncoder)
+        self.vector_size = self.encoder.get_sentence_embedding_dimension()
+        self._query_embeddings: "OrderedDict[str, np.ndarray]" = OrderedDict()  # LRU by normalized query
+        
+        # Collection setup runs once, on first use; a marker file lets warm restarts skip it
+        # as long as the server still has the collection
+        self._initialized = False
+        self._init_lock = asyncio.Lock()
+        marker_id = hashlib.blake2b(
+            f"{qdrant_url}|{type(self.encoder).__name__}|{self.vector_size}".encode("utf-8"), digest_size=6
+        ).hexdigest()
+        self._ready_marker = os.path.join(READY_MARKER_DIR, f"ready-{collection_name}-{marker_id}")
         
-        # Initialize collection
-        asyncio.create_task(self._initialize_collection())
+        # Pending (requests, future) pairs for the next coalesced batch query
+        self._pending_queries: List[tuple] = []
+        self._pending_request_count = 0
+        self._flush_task: Optional[asyncio.Task] = None
+        self._batch_tasks: set = set()
     
-    async def _initialize_collection(self):
-        """Initialize Qdrant collection with weather knowledge schema"""
+    async def _ensure_initialized(self):
+        """Initialize the collection on first use; idempotent and safe under concurrent callers"""
+        if self._initialized:
+            return
+        async with self._init_lock:
+            if self._initialized:
+                return
+            if await self._marker_is_current() or await self._initialize_collection():
+                self._initialized = True
+    
+    async def _marker_is_current(self) -> bool:
+        """Trust the ready marker only while the collection exists (storage may have been reset)"""
+        if not os.path.exists(self._ready_marker):
+            return False
+        try:
+            if await self.client.collection_exists(self.collection_name):
+                return True
+        except Exception as e:
+            print(f"Error checking collection: {e}")
+            return False
+        
+        os.remove(self._ready_marker)  # Stale: the collection is gone, so set it up again
+        return False
+    
+    async def _initialize_collection(self) -> bool:
+        """Initialize Qdrant collection with weather knowledge schema, returning whether it is ready"""
         try:
             # Check if collection exists
-            collections = self.client.get_collections().collections
+            collections = (await self.client.get_collections()).collections
             collection_exists = any(c.name == self.collection_name for c in collections)
             
+            # Vectors from a different encoder cannot be searched; rebuild the collection
+            if collection_exists:
+                info = await self.client.get_collection(self.collection_name)
+                if info.config.params.vectors.size != self.vector_size:
+                    print(f"Recreating {self.collection_name} for {self.vector_size}-dim embeddings")
+                    await self.client.delete_collection(self.collection_name)
+                    collection_exists = False
+                elif info.config.quantization_config is None:
+                    # Collections created before quantization was enabled are upgraded in place
+                    await self.client.update_collection(
+                        collection_name=self.collection_name,
+                        quantization_config=QUANTIZATION_CONFIG,
+                        hnsw_config=HNSW_CONFIG
+                    )
+            
             if not collection_exists:
-                self.client.create_collection(
+                await self.client.create_collection(
                     collection_name=self.collection_name,
                     vectors_config=VectorParams(
                         size=self.vector_size,
                         distance=Distance.COSINE
-                    )
+                    ),
+                    quantization_config=QUANTIZATION_CONFIG,
+                    hnsw_config=HNSW_CONFIG
                 )
-                
+            
+            # Keyword indexes let filtered searches prune during HNSW traversal (and back the
+            # stats facet); created before the first upsert so they are built incrementally
+            for field_name in PAYLOAD_INDEX_FIELDS:
+                await self.client.create_payload_index(
+                    collection_name=self.collection_name,
+                    field_name=field_name,
+                    field_schema=models.PayloadSchemaType.KEYWORD
+                )
+            
+            if not collection_exists:
                 # Add default weather knowledge
                 await self._populate_default_knowledge()
+            
+            os.makedirs(READY_MARKER_DIR, exist_ok=True)
+            with open(self._ready_marker, "w", encoding="utf-8"):
+                pass
+            return True
                 
         except Exception as e:
             print(f"Error initializing collection: {e}")
+            return False
     
     async def _populate_default_knowledge(self):
-        """Populate collection with default weather knowledge"""
-        default_knowledge = [
-            WeatherKnowledge(
-                id=str(uuid.uuid4()),
-                title="High Humidity and Thunderstorm Formation",
-                content="When humidity levels exceed 80% combined with rising temperatures, the likelihood of thunderstorm formation increases significantly. Farmers should secure outdoor equipment and avoid tall structures. Livestock should be moved to sheltered areas.",
-                category="weather_advisory",
-                tags=["humidity", "thunderstorms", "farming", "safety"],
-                date_created=datetime.now(),
-                source="system"
-            ),
-            WeatherKnowledge(
-                id=str(uuid.uuid4()),
-                title="Temperature Drop and Frost Protection",
-                content="When nighttime temperatures are forecast to drop below 2°C, there is high risk of frost formation. Farmers should cover sensitive crops, drain irrigation systems, and provide additional shelter for livestock. Morning inspections are critical.",
-                category="best_practice",
-                tags=["frost", "temperature", "crops", "livestock"],
-                date_created=datetime.now(),
-                source="system"
-            ),
-            WeatherKnowledge(
-                id=str(uuid.uuid4()),
-                title="Wind Speed and Agricultural Activities",
-                content="Wind speeds above 15 m/s (54 km/h) make most agricultural activities dangerous. Avoid operating tall equipment, postpone spraying activities, and secure loose materials. Harvest operations should be suspended until winds subside.",
-                category="best_practice",
-                tags=["wind", "farming", "safety", "equipment"],
-                date_created=datetime.now(),
-                source="system"
-            ),
-            WeatherKnowledge(
-                id=str(uuid.uuid4()),
-                title="Pressure Drop and Weather System Approach",
-                content="A rapid atmospheric pressure drop of more than 3 hPa per hour often indicates an approaching weather system. Communities should prepare for potential severe weather including heavy rain, strong winds, or storms within 12-24 hours.",
-                category="weather_advisory",
-                tags=["pressure", "storms", "prediction", "preparation"],
-                date_created=datetime.now(),
-                source="system"
-            ),
-            WeatherKnowledge(
-                id=str(uuid.uuid4()),
-                title="Heat Index and Heat Stress Prevention",
-                content="When heat index exceeds 32°C (90°F), outdoor workers and livestock face heat stress risk. Schedule heavy work for early morning or evening, ensure adequate water supply, provide shade, and monitor for heat exhaustion symptoms.",
-                category="best_practice",
-                tags=["heat", "temperature", "health", "livestock", "safety"],
-                date_created=datetime.now(),
-                source="system"
-            ),
-            WeatherKnowledge(
-                id=str(uuid.uuid4()),
-                title="Rainfall Intensity and Flood Risk",
-                content="Rainfall rates exceeding 25mm per hour pose flash flood risks, especially in areas with poor drainage. Communities should clear drainage systems, avoid low-lying areas, and prepare emergency supplies. Agricultural fields may require drainage management.",
-                category="weather_advisory",
-                tags=["rainfall", "flooding", "drainage", "emergency"],
-                date_created=datetime.now(),
-                source="system"
-            )
-        ]
-        
-        for knowledge in default_knowledge:
-            await self.add_knowledge(knowledge)
+        """Populate collection with default weather knowledge, using the prebuilt embeddings when current"""
+        default_knowledge = default_knowledge_items()
+        await self._upsert_knowledge(
+            default_knowledge,
+            embeddings=load_default_embeddings(default_knowledge, self.encoder, self.vector_size)
+        )
     
     async def add_knowledge(self, knowledge: WeatherKnowledge) -> bool:
         """Add weather knowledge to the RAG database"""
+        return await self.add_knowledge_bulk([knowledge])
+    
+    async def add_knowledge_bulk(
+        self,
+        items: List[WeatherKnowledge],
+        embeddings: Optional[np.ndarray] = None
+    ) -> bool:
+        """Add several knowledge documents with one batched encode and a single upsert
+
+        Precomputed embeddings, row-aligned with items, skip the encode.
+        """
+        await self._ensure_initialized()
+        return await self._upsert_knowledge(items, embeddings)
+    
+    async def _upsert_knowledge(
+        self,
+        items: List[WeatherKnowledge],
+        embeddings: Optional[np.ndarray] = None
+    ) -> bool:
+        """Embed (unless given embeddings) and upsert documents without the initialization check"""
+        if not items:
+            return True
+        
         try:
-            # Create embedding
-            embedding = self.encoder.encode(knowledge.content)
+            # Create embeddings in one batched forward pass
+            if embeddings is None:
+                embeddings = await asyncio.to_thread(
+                    self.encoder.encode,
+                    [knowledge.content for knowledge in items],
+                    batch_size=32,
+                    convert_to_numpy=True,
+                    normalize_embeddings=True
+                )
             
-            # Prepare point for Qdrant
-            point = PointStruct(
-                id=knowledge.id,
-                vector=embedding.tolist(),
-                payload={
-                    "title": knowledge.title,
-                    "content": knowledge.content,
-                    "category": knowledge.category,
-                    "location": knowledge.location,
-                    "date_created": knowledge.date_created.isoformat(),
-                    "tags": knowledge.tags,
-                    "source": knowledge.source
-                }
-            )
+            # Prepare points for Qdrant; PointStruct validates plain lists, so convert the matrix once
+            vectors = np.asarray(embeddings, dtype=np.float32).tolist()
+            points = [
+                PointStruct(
+                    id=knowledge.id,
+                    vector=vector,
+                    payload={
+                        "title": knowledge.title,
+                        "content": knowledge.content,
+                        "category": knowledge.category,
+                        "location": knowledge.location,
+                        "date_created": knowledge.date_created.isoformat(),
+                        "tags": knowledge.tags,
+                        "source": knowledge.source
+                    }
+                )
+                for knowledge, vector in zip(items, vectors)
+            ]
             
             # Insert into Qdrant
-            self.client.upsert(
+            await self.client.upsert(
                 collection_name=self.collection_name,
-                points=[point]
+                points=points
             )
             
             return True
@@ -172,61 +360,101 @@ class RAGService:
     ) -> List[RAGResult]:
         """Search weather knowledge using semantic similarity"""
         try:
-            # Create query embedding
-            query_embedding = self.encoder.encode(query)
+            await self._ensure_initialized()
             
-            # Prepare search filters - Use proper Qdrant models
-            search_filter = None
-            if category_filter or location_filter:
-                from qdrant_client.http import models
-                conditions = []
-
-                if category_filter:
-                    conditions.append(
-                        models.FieldCondition(
-                            key="category",
-                            match=models.MatchValue(value=category_filter)
-                        )
-                    )
-
-                if location_filter:
-                    conditions.append(
-                        models.FieldCondition(
-                            key="location",
-                            match=models.MatchValue(value=location_filter)
-                        )
-                    )
-
-                if conditions:
-                    search_filter = models.Filter(must=conditions)
+            # Create query embedding in a worker thread while the filter is prepared
+            encode_task = asyncio.create_task(self._encode_queries([query]))
+            await asyncio.sleep(0)  # Let the encode reach its worker thread before building the filter
+            search_filter = self._build_filter(category_filter, location_filter)
+            query_embedding, = await encode_task
             
             # Perform search
-            search_results = self.client.search(
+            response = await self.client.query_points(
                 collection_name=self.collection_name,
-                query_vector=query_embedding.tolist(),
+                query=query_embedding,  # query_points accepts numpy vectors directly
                 query_filter=search_filter,
                 limit=limit,
-                with_payload=True
+                with_payload=True,
+                search_params=SEARCH_PARAMS
             )
             
-            # Convert to RAGResult objects
-            results = []
-            for result in search_results:
-                rag_result = RAGResult(
-                    content=result.payload.get("content", ""),
-                    score=result.score,
-                    source=result.payload.get("source", "unknown"),
-                    category=result.payload.get("category", "unknown"),
-                    location=result.payload.get("location")
-                )
-                results.append(rag_result)
-            
-            return results
+            return self._to_rag_results(response.points)
             
         except Exception as e:
             print(f"Error searching knowledge: {e}")
             return []
     
+    async def _encode_queries(self, queries: List[str]) -> List[np.ndarray]:
+        """Embed queries, reusing cached vectors and batch-encoding only the misses"""
+        keys = [self._query_key(query) for query in queries]
+        misses = list(dict.fromkeys(key for key in keys if key not in self._query_embeddings))
+        
+        if misses:
+            # The transformer pass is CPU-bound, so run it off the event loop
+            embeddings = np.asarray(await asyncio.to_thread(self.encoder.encode, misses), dtype=np.float32)
+            for key, vector in zip(misses, embeddings):
+                self._query_embeddings[key] = vector
+        
+        vectors = []
+        for key in keys:
+            self._query_embeddings.move_to_end(key)
+            vectors.append(self._query_embeddings[key])
+        
+        while len(self._query_embeddings) > QUERY_EMBEDDING_CACHE_SIZE:
+            self._query_embeddings.popitem(last=False)
+        
+        return vectors
+    
+    def _query_key(self, query: str) -> str:
+        """Normalize a query for the embedding cache (lowercased, whitespace collapsed); for
+        order-insensitive encoders the words are also sorted, keeping duplicates, since
+        repeating a token changes the pooled vector but reordering does not"""
+        words = query.lower().split()
+        if self._order_insensitive:
+            words.sort()
+        return " ".join(words)
+    
+    @staticmethod
+    @lru_cache(maxsize=128)
+    def _build_filter(
+        category_filter: Optional[str] = None,
+        location_filter: Optional[str] = None
+    ) -> Optional[models.Filter]:
+        """Prepare search filters - Use proper Qdrant models (cached; callers must not mutate them)"""
+        conditions = []
+        
+        if category_filter:
+            conditions.append(
+                models.FieldCondition(
+                    key="category",
+                    match=models.MatchValue(value=category_filter)
+                )
+            )
+        
+        if location_filter:
+            conditions.append(
+                models.FieldCondition(
+                    key="location",
+                    match=models.MatchValue(value=location_filter)
+                )
+            )
+        
+        return models.Filter(must=conditions) if conditions else None
+    
+    @staticmethod
+    def _to_rag_results(search_results) -> List[RAGResult]:
+        """Convert Qdrant scored points to RAGResult objects"""
+        return [
+            RAGResult(
+                content=result.payload.get("content", ""),
+                score=result.score,
+                source=result.payload.get("source", "unknown"),
+                category=result.payload.get("category", "unknown"),
+                location=result.payload.get("location")
+            )
+            for result in search_results
+        ]
+    
     async def get_contextual_knowledge(
         self,
         weather_condition: str,
@@ -247,37 +475,106 @@ class RAGService:
         if location:
             enhanced_query += f" {location}"
         
-        # Search with multiple strategies
-        results = []
-        
-        # 1. Direct weather condition search
-        direct_results = await self.search_knowledge(enhanced_query, limit=3)
-        results.extend(direct_results)
-        
-        # 2. Category-specific search for audience
-        if audience == "farmers":
-            farming_results = await self.search_knowledge(
-                weather_condition, 
-                limit=2, 
-                category_filter="best_practice"
-            )
-            results.extend(farming_results)
+        try:
+            await self._ensure_initialized()
+            
+            # Both query embeddings come from one batched encode, overlapped with filter preparation
+            encode_task = asyncio.create_task(self._encode_queries([enhanced_query, weather_condition]))
+            await asyncio.sleep(0)
+            best_practice_filter = self._build_filter(category_filter="best_practice")
+            advisory_filter = self._build_filter(category_filter="weather_advisory")
+            enhanced_vector, condition_vector = (vector.tolist() for vector in await encode_task)
+            
+            # Search with multiple strategies, sent to Qdrant as a single batch query
+            # 1. Direct weather condition search
+            requests = [
+                models.QueryRequest(query=enhanced_vector, limit=3, with_payload=True, params=SEARCH_PARAMS)
+            ]
+            
+            # 2. Category-specific search for audience
+            if audience == "farmers":
+                requests.append(models.QueryRequest(
+                    query=condition_vector,
+                    filter=best_practice_filter,
+                    limit=2,
+                    with_payload=True,
+                    params=SEARCH_PARAMS
+                ))
+            
+            # 3. Advisory search
+            requests.append(models.QueryRequest(
+                query=condition_vector,
+                filter=advisory_filter,
+                limit=2,
+                with_payload=True,
+                params=SEARCH_PARAMS
+            ))
+            
+            batch_results = await self._query_batch(requests)
+        except Exception as e:
+            print(f"Error searching knowledge: {e}")
+            return []
         
-        # 3. Advisory search
-        advisory_results = await self.search_knowledge(
-            weather_condition,
-            limit=2,
-            category_filter="weather_advisory"
-        )
-        results.extend(advisory_results)
+        results = [result for response in batch_results for result in self._to_rag_results(response.points)]
         
-        # Remove duplicates and sort by relevance
-        unique_results = {}
+        # Remove duplicates (one lookup per result) and keep the five most relevant
+        unique_results: Dict[str, RAGResult] = {}
         for result in results:
-            if result.content not in unique_results or result.score > unique_results[result.content].score:
+            best = unique_results.get(result.content)
+            if best is None or result.score > best.score:
                 unique_results[result.content] = result
         
-        return sorted(unique_results.values(), key=lambda x: x.score, reverse=True)[:5]
+        return heapq.nlargest(5, unique_results.values(), key=lambda x: x.score)
+    
+    async def _query_batch(self, requests: List[models.QueryRequest]) -> List[models.QueryResponse]:
+        """Queue requests for the next coalesced query_batch_points call and await their responses"""
+        future = asyncio.get_running_loop().create_future()
+        self._pending_queries.append((requests, future))
+        self._pending_request_count += len(requests)
+        
+        if self._pending_request_count >= QUERY_BATCH_MAX_REQUESTS:
+            if self._flush_task is not None:
+                self._flush_task.cancel()
+            self._flush_queries()
+        elif self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_queries_later())
+        
+        return await future
+    
+    async def _flush_queries_later(self):
+        await asyncio.sleep(QUERY_BATCH_WINDOW)
+        self._flush_queries()
+    
+    def _flush_queries(self):
+        """Send every queued request as one Qdrant batch"""
+        pending, self._pending_queries = self._pending_queries, []
+        self._pending_request_count = 0
+        self._flush_task = None
+        if not pending:
+            return
+        
+        task = asyncio.create_task(self._send_query_batch(pending))
+        self._batch_tasks.add(task)
+        task.add_done_callback(self._batch_tasks.discard)
+    
+    async def _send_query_batch(self, pending: List[tuple]):
+        """Run one query_batch_points call and hand each caller its slice of the responses"""
+        try:
+            responses = await self.client.query_batch_points(
+                collection_name=self.collection_name,
+                requests=[request for requests, _ in pending for request in requests]
+            )
+        except Exception as e:
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        offset = 0
+        for requests, future in pending:
+            if not future.done():
+                future.set_result(responses[offset:offset + len(requests)])
+            offset += len(requests)
     
     async def add_historical_pattern(
         self,
@@ -304,33 +601,46 @@ class RAGService:
     async def get_collection_stats(self) -> Dict[str, Any]:
         """Get statistics about the knowledge collection"""
         try:
-            collection_info = self.client.get_collection(self.collection_name)
-            
-            # Get category distribution
-            category_counts = {}
-            
-            # Scroll through all points to get category stats
-            points, _ = self.client.scroll(
-                collection_name=self.collection_name,
-                limit=1000,  # Assuming we have less than 1000 documents
-                with_payload=True
-            )
-            
-            for point in points:
-                category = point.payload.get("category", "unknown")
-                category_counts[category] = category_counts.get(category, 0) + 1
+            await self._ensure_initialized()
+            collection_info = await self.client.get_collection(self.collection_name)
             
             return {
                 "total_documents": collection_info.points_count,
                 "vector_dimension": collection_info.config.params.vectors.size,
-                "category_distribution": category_counts,
+                "category_distribution": await self._category_counts(),
                 "collection_name": self.collection_name
             }
             
         except Exception as e:
             return {"error": str(e)}
     
-    def close(self):
-        """Close the Qdrant client connection"""
-        if hasattr(self.client, 'close'):
-            self.client.close()
\ No newline at end of file
+    async def _category_counts(self) -> Dict[str, int]:
+        """Category distribution aggregated server-side, without transferring any points"""
+        try:
+            response = await self.client.facet(
+                collection_name=self.collection_name,
+                key="category",
+                limit=50
+            )
+            return {hit.value: hit.count for hit in response.hits}
+        except Exception:
+            # Servers without the facet API: one approximate count per known category
+            counts = {}
+            for category in KNOWN_CATEGORIES:
+                result = await self.client.count(
+                    collection_name=self.collection_name,
+                    count_filter=self._build_filter(category_filter=category),
+                    exact=False
+                )
+                if result.count:
+                    counts[category] = result.count
+            return counts
+    
+    async def aclose(self):
+        """Send any queued queries, then close the Qdrant client connection"""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+        self._flush_queries()
+        if self._batch_tasks:
+            await asyncio.gather(*self._batch_tasks, return_exceptions=True)
+        await self.client.close()
\ No newline at end of file
@@ -0,0 +1,22 @@
+from typing import Any, Type
+
+from langchain_core.messages import SystemMessage
+from langchain_core.output_parsers import PydanticOutputParser
+from langchain_core.runnables import Runnable, RunnableLambda
+from pydantic import BaseModel
+
+
+def json_mode_structured_output(llm: Any, schema: Type[BaseModel]) -> Runnable:
+    """Structured output through OpenAI JSON mode instead of function calling
+    
+    The schema's format instructions are rendered once here and appended to every call, and the
+    reply is parsed straight into the schema; callers invoke it with a message list as usual.
+    """
+    parser = PydanticOutputParser(pydantic_object=schema)
+    format_instructions = SystemMessage(content=parser.get_format_instructions())
+    
+    return (
+        RunnableLambda(lambda messages: [*messages, format_instructions])
+        | llm.bind(response_format={"type": "json_object"})
+        | parser
+    )
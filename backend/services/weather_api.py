@@ -1,9 +1,11 @@
 import asyncio
 import httpx
+from collections import OrderedDict, defaultdict
 from typing import Dict, Any, Optional, List
 from datetime import datetime, timedelta
+import numpy as np
 import pandas as pd
-from pydantic import BaseModel
+from pydantic import BaseModel, PrivateAttr
 
 
 class WeatherData(BaseModel):
@@ -23,81 +25,172 @@ class WeatherData(BaseModel):
     uv_index: Optional[float] = None
 
 
+# Column dtypes for the forecast SoA view; everything else is kept as an object column
+FORECAST_COLUMN_DTYPES = {
+    "latitude": np.float64,
+    "longitude": np.float64,
+    "temperature": np.float64,
+    "humidity": np.int64,
+    "pressure": np.float64,
+    "wind_speed": np.float64,
+    "wind_direction": np.int64,
+    "visibility": np.float64,
+    "uv_index": np.float64
+}
+
+
 class ForecastData(BaseModel):
     """5-day forecast data model"""
     location: str
     forecasts: List[WeatherData]
+    _columns: Optional[Dict[str, np.ndarray]] = PrivateAttr(default=None)
+    
+    def columns(self) -> Dict[str, np.ndarray]:
+        """Typed column arrays (SoA) for every WeatherData field, built once and shared by all readers"""
+        if self._columns is None:
+            forecasts = self.forecasts
+            n = len(forecasts)
+            columns = {}
+            for field in WeatherData.model_fields:
+                dtype = FORECAST_COLUMN_DTYPES.get(field)
+                values = (getattr(forecast, field) for forecast in forecasts)
+                if dtype is None:
+                    columns[field] = np.fromiter(values, dtype=object, count=n)
+                elif dtype is np.float64:
+                    columns[field] = np.fromiter(
+                        (np.nan if value is None else value for value in values), dtype=dtype, count=n
+                    )
+                else:
+                    columns[field] = np.fromiter(values, dtype=dtype, count=n)
+                columns[field].flags.writeable = False  # Shared by cached forecasts; never mutate
+            self._columns = columns
+        return self._columns
+
+
+COORDINATE_CACHE_SIZE = 1024
 
 
 class OpenWeatherService:
     """OpenWeather API integration service"""
     
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, client: Optional[httpx.AsyncClient] = None):
         self.api_key = api_key
         self.base_url = "https://api.openweathermap.org/data/2.5"
-        self.geocoding_url = "http://api.openweathermap.org/geo/1.0"
-        
+        self.geocoding_url = "https://api.openweathermap.org/geo/1.0"
+        # One pooled HTTP/2 client for every call, so requests reuse open TCP/TLS connections;
+        # an injected client is shared with the caller, who closes it
+        self._owns_client = client is None
+        self._client = client or httpx.AsyncClient(
+            http2=True,
+            timeout=10.0,
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=32)
+        )
+        # City coordinates don't move: LRU of geocoding results, with one in-flight lookup per city
+        self._coord_cache: "OrderedDict[str, tuple[float, float]]" = OrderedDict()
+        self._coord_locks: "defaultdict[str, asyncio.Lock]" = defaultdict(asyncio.Lock)
+    
     async def get_coordinates(self, city_name: str, country_code: Optional[str] = None) -> tuple[float, float]:
-        """Get latitude and longitude for a city"""
+        """Get latitude and longitude for a city, geocoding each city at most once while cached"""
         query = f"{city_name}"
         if country_code:
             query += f",{country_code}"
+        key = query.strip().lower()
+        
+        coords = self._cached_coordinates(key)
+        if coords is not None:
+            return coords
+        
+        async with self._coord_locks[key]:
+            # Concurrent callers for the same city wait here and reuse the first caller's result
+            coords = self._cached_coordinates(key)
+            if coords is None:
+                coords = await self._geocode(query)
+                self._coord_cache[key] = coords
+                if len(self._coord_cache) > COORDINATE_CACHE_SIZE:
+                    self._coord_cache.popitem(last=False)
+        self._coord_locks.pop(key, None)
+        return coords
+    
+    def _cached_coordinates(self, key: str) -> Optional[tuple[float, float]]:
+        coords = self._coord_cache.get(key)
+        if coords is not None:
+            self._coord_cache.move_to_end(key)
+        return coords
+    
+    async def _geocode(self, query: str) -> tuple[float, float]:
+        """Resolve a "city[,country]" query through the geocoding API"""
+        response = await self._client.get(
+            f"{self.geocoding_url}/direct",
+            params={
+                "q": query,
+                "limit": 1,
+                "appid": self.api_key
+            }
+        )
+        response.raise_for_status()
+        data = response.json()
+        
+        if not data:
+            raise ValueError(f"City not found: {query.split(',')[0]}")
             
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.geocoding_url}/direct",
-                params={
-                    "q": query,
-                    "limit": 1,
-                    "appid": self.api_key
-                }
-            )
-            response.raise_for_status()
-            data = response.json()
-            
-            if not data:
-                raise ValueError(f"City not found: {city_name}")
-                
-            return data[0]["lat"], data[0]["lon"]
+        return data[0]["lat"], data[0]["lon"]
     
     async def get_current_weather(self, lat: float, lon: float, location_name: str = None) -> WeatherData:
         """Fetch current weather data"""
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.base_url}/weather",
-                params={
-                    "lat": lat,
-                    "lon": lon,
-                    "appid": self.api_key,
-                    "units": "metric"
-                }
-            )
-            response.raise_for_status()
-            data = response.json()
-            
-            return self._parse_current_weather(data, location_name or f"{lat},{lon}")
+        response = await self._client.get(
+            f"{self.base_url}/weather",
+            params={
+                "lat": lat,
+                "lon": lon,
+                "appid": self.api_key,
+                "units": "metric"
+            }
+        )
+        response.raise_for_status()
+        data = response.json()
+        
+        return self._parse_current_weather(data, location_name or f"{lat},{lon}")
     
     async def get_current_weather_by_city(self, city_name: str, country_code: Optional[str] = None) -> WeatherData:
         """Fetch current weather by city name"""
         lat, lon = await self.get_coordinates(city_name, country_code)
         return await self.get_current_weather(lat, lon, city_name)
     
+    async def get_current_weather_by_cities(self, city_names: List[str]) -> List[WeatherData]:
+        """Fetch current weather for several cities concurrently over the shared client"""
+        return await asyncio.gather(*(self.get_current_weather_by_city(city) for city in city_names))
+    
     async def get_forecast(self, lat: float, lon: float, location_name: str = None) -> ForecastData:
         """Fetch 5-day weather forecast"""
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.base_url}/forecast",
-                params={
-                    "lat": lat,
-                    "lon": lon,
-                    "appid": self.api_key,
-                    "units": "metric"
-                }
-            )
-            response.raise_for_status()
-            data = response.json()
-            
-            return self._parse_forecast(data, location_name or f"{lat},{lon}")
+        response = await self._client.get(
+            f"{self.base_url}/forecast",
+            params={
+                "lat": lat,
+                "lon": lon,
+                "appid": self.api_key,
+                "units": "metric"
+            }
+        )
+        response.raise_for_status()
+        data = response.json()
+        
+        return self._parse_forecast(data, location_name or f"{lat},{lon}")
+    
+    async def get_forecast_frame(self, lat: float, lon: float, location_name: str = None) -> pd.DataFrame:
+        """Fetch 5-day weather forecast straight into a DataFrame, skipping the WeatherData models"""
+        response = await self._client.get(
+            f"{self.base_url}/forecast",
+            params={
+                "lat": lat,
+                "lon": lon,
+                "appid": self.api_key,
+                "units": "metric"
+            }
+        )
+        response.raise_for_status()
+        data = response.json()
+        
+        return self.forecast_json_to_dataframe(data, location_name or f"{lat},{lon}")
     
     async def get_forecast_by_city(self, city_name: str, country_code: Optional[str] = None) -> ForecastData:
         """Fetch 5-day forecast by city name"""
@@ -106,59 +199,93 @@ class OpenWeatherService:
     
     def _parse_current_weather(self, data: Dict[str, Any], location: str) -> WeatherData:
         """Parse OpenWeather API response to WeatherData model"""
-        main = data["main"]
-        weather = data["weather"][0]
-        wind = data.get("wind", {})
-        
-        return WeatherData(
-            location=location,
-            latitude=data["coord"]["lat"],
-            longitude=data["coord"]["lon"],
-            temperature=main["temp"],
-            humidity=main["humidity"],
-            pressure=main["pressure"],
-            wind_speed=wind.get("speed", 0),
-            wind_direction=wind.get("deg", 0),
-            weather_condition=weather["main"],
-            description=weather["description"],
-            timestamp=datetime.fromtimestamp(data["dt"]),
-            visibility=data.get("visibility", 0) / 1000 if data.get("visibility") else None,  # Convert to km
-            uv_index=None  # Not available in current weather endpoint
-        )
+        coord = data["coord"]
+        return self._build_weather_data(data, location, coord["lat"], coord["lon"])
     
     def _parse_forecast(self, data: Dict[str, Any], location: str) -> ForecastData:
         """Parse forecast API response to ForecastData model"""
-        forecasts = []
-        city_data = data["city"]
+        coord = data["city"]["coord"]
+        lat, lon = coord["lat"], coord["lon"]
         
-        for item in data["list"]:
-            main = item["main"]
-            weather = item["weather"][0]
-            wind = item.get("wind", {})
-            
-            forecast_item = WeatherData(
-                location=location,
-                latitude=city_data["coord"]["lat"],
-                longitude=city_data["coord"]["lon"],
-                temperature=main["temp"],
-                humidity=main["humidity"],
-                pressure=main["pressure"],
-                wind_speed=wind.get("speed", 0),
-                wind_direction=wind.get("deg", 0),
-                weather_condition=weather["main"],
-                description=weather["description"],
-                timestamp=datetime.fromtimestamp(item["dt"]),
-                visibility=item.get("visibility", 0) / 1000 if item.get("visibility") else None,
-                uv_index=None
-            )
-            forecasts.append(forecast_item)
+        forecasts = [self._build_weather_data(item, location, lat, lon) for item in data["list"]]
+        
+        return ForecastData.model_construct(location=location, forecasts=forecasts)
+    
+    @staticmethod
+    def _build_weather_data(item: Dict[str, Any], location: str, lat: float, lon: float) -> WeatherData:
+        """Build WeatherData from one OpenWeather entry
+        
+        The API's field types are known, so values are coerced explicitly and the model is
+        built with model_construct instead of running full validation per entry.
+        """
+        main = item["main"]
+        weather = item["weather"][0]
+        wind = item.get("wind", {})
+        visibility = item.get("visibility")
         
-        return ForecastData(location=location, forecasts=forecasts)
+        return WeatherData.model_construct(
+            location=location,
+            latitude=float(lat),
+            longitude=float(lon),
+            temperature=float(main["temp"]),
+            humidity=int(main["humidity"]),
+            pressure=float(main["pressure"]),
+            wind_speed=float(wind.get("speed", 0)),
+            wind_direction=int(wind.get("deg", 0)),
+            weather_condition=weather["main"],
+            description=weather["description"],
+            timestamp=datetime.fromtimestamp(item["dt"]),
+            visibility=visibility / 1000 if visibility else None,  # Convert to km
+            uv_index=None  # Not available in current weather or forecast endpoints
+        )
     
     def weather_to_dataframe(self, weather_data: WeatherData) -> pd.DataFrame:
         """Convert WeatherData to pandas DataFrame for processing"""
-        return pd.DataFrame([weather_data.dict()])
+        return pd.DataFrame([weather_data.model_dump(mode='python')])
     
     def forecast_to_dataframe(self, forecast_data: ForecastData) -> pd.DataFrame:
         """Convert ForecastData to pandas DataFrame for processing"""
-        return pd.DataFrame([forecast.dict() for forecast in forecast_data.forecasts])
\ No newline at end of file
+        columns = forecast_data.columns()
+        return pd.DataFrame(
+            {**columns, "timestamp": pd.to_datetime(columns["timestamp"])},
+            copy=False
+        )
+    
+    def forecast_json_to_dataframe(self, data: Dict[str, Any], location: str) -> pd.DataFrame:
+        """Build the forecast DataFrame directly from the API JSON with column-wise conversions
+        
+        Produces the same columns and dtypes as forecast_to_dataframe(_parse_forecast(...)).
+        """
+        raw = pd.json_normalize(data["list"], sep="_")
+        coord = data["city"]["coord"]
+        n = len(raw)
+        
+        def column(name: str, default: float = 0) -> pd.Series:
+            if name in raw:
+                return raw[name].fillna(default)
+            return pd.Series(default, index=raw.index)
+        
+        weather = raw["weather"].str[0]
+        visibility = column("visibility", np.nan).astype(np.float64)
+        
+        return pd.DataFrame({
+            "location": [location] * n,
+            "latitude": np.full(n, coord["lat"], dtype=np.float64),
+            "longitude": np.full(n, coord["lon"], dtype=np.float64),
+            "temperature": raw["main_temp"].astype(np.float64),
+            "humidity": raw["main_humidity"].astype(np.int64),
+            "pressure": raw["main_pressure"].astype(np.float64),
+            "wind_speed": column("wind_speed").astype(np.float64),
+            "wind_direction": column("wind_deg").astype(np.int64),
+            "weather_condition": weather.str.get("main"),
+            "description": weather.str.get("description"),
+            # Local time, matching datetime.fromtimestamp in _build_weather_data
+            "timestamp": pd.to_datetime(raw["dt"].map(datetime.fromtimestamp)),
+            "visibility": visibility.where(visibility > 0) / 1000.0,  # Convert to km
+            "uv_index": np.full(n, np.nan)
+        })
+    
+    async def aclose(self):
+        """Close the pooled HTTP client, unless it was injected"""
+        if self._owns_client:
+            await self._client.aclose()
\ No newline at end of file
@@ -1,19 +1,77 @@
 import asyncio
-from typing import Dict, Any, Optional, TypedDict, List
+import logging
+import time
+import uuid
+import httpx
+from collections import OrderedDict, defaultdict
+from typing import Annotated, Callable, Dict, Any, Optional, TypedDict, List, AsyncIterator, Tuple
 from datetime import datetime, timezone, timedelta
+from langgraph.cache.memory import InMemoryCache
 from langgraph.graph import StateGraph, END
+from langgraph.types import CachePolicy
 from langchain_openai import ChatOpenAI
 from pydantic import BaseModel
 
 from agents.data_agent import DataAgent, WeatherAnalysis
 from agents.forecast_agent import ForecastAgent, ForecastAnalysis
 from agents.advice_agent import AdviceAgent, AdviceReport
+from agents.analysis_agent import AnalysisAgent, WeatherPrompts
 from services.weather_api import OpenWeatherService, WeatherData, ForecastData
 from services.rag_service import RAGService, RAGResult
+from services.llm_cache import LLMResponseCache
+
+logger = logging.getLogger(__name__)
 
 # Setup timezone (GMT+8 for Philippines)
 PHILIPPINE_TZ = timezone(timedelta(hours=8))
 
+# OpenWeather refreshes roughly every 10 minutes, so parsed responses are reused for 5
+WEATHER_CACHE_TTL = 300  # seconds
+WEATHER_CACHE_MAX_ENTRIES = 512
+
+# Conditions that always warrant knowledge retrieval, even without risk alerts
+SEVERE_CONDITIONS = frozenset({"Thunderstorm", "Rain", "Snow", "Squall", "Tornado"})
+
+# State keys streamed to clients as soon as their node finishes
+PARTIAL_RESULT_KEYS = ("data_analysis", "forecast_analysis", "advice_report")
+
+# Node-level cache for the LLM analysis and knowledge retrieval nodes
+NODE_CACHE_TTL = 600  # seconds
+
+DEFAULT_LLM_MODEL = "gpt-3.5-turbo"
+
+# Optional Redis cache of complete results, keyed per location/audience and 10-minute window
+RESULT_CACHE_WINDOW = 600  # seconds
+RESULT_CACHE_TTL = 900  # seconds; outlives its window so late hits in the window still land
+
+# Cap on locations analyzed at once in a batch, to bound concurrent upstream API calls
+BATCH_CONCURRENCY = 8
+
+
+def keep_first_error(current: Optional[str], update: Optional[str]) -> Optional[str]:
+    """State reducer: keep the earliest error, which is the root cause of any later ones"""
+    return current or update
+
+
+def _analysis_cache_key(state: "WorkflowState") -> str:
+    """Same location, audience and OpenWeather observation → same analysis"""
+    weather = state.get("current_weather")
+    if weather is None:
+        return uuid.uuid4().hex  # Nothing to analyze; never serve this from cache
+    return repr((state["location"].strip().lower(), state.get("audience"), weather.weather_condition, weather.timestamp))
+
+
+def _knowledge_cache_key(state: "WorkflowState") -> str:
+    """Key on exactly what the knowledge query is built from"""
+    weather = state.get("current_weather")
+    forecast = state.get("forecast_analysis")
+    if weather is None or forecast is None:
+        return uuid.uuid4().hex
+    return repr((
+        weather.location, state.get("audience"), weather.weather_condition, weather.description,
+        tuple(forecast.risk_alerts)
+    ))
+
 
 class WorkflowState(TypedDict):
     """State passed between workflow nodes"""
@@ -22,14 +80,32 @@ class WorkflowState(TypedDict):
     longitude: Optional[float]
     current_weather: Optional[WeatherData]
     forecast_data: Optional[ForecastData]
+    weather_prompts: Optional[WeatherPrompts]  # Rendered once per observation, shared by analyses
     data_analysis: Optional[WeatherAnalysis]
     forecast_analysis: Optional[ForecastAnalysis]
     advice_report: Optional[AdviceReport]
     rag_knowledge: Optional[List[RAGResult]]
-    error: Optional[str]
+    error: Annotated[Optional[str], keep_first_error]
     audience: str  # farmers, officials, general_public
 
 
+# Every state key with its empty value; copied (shallowly) for each run
+_STATE_TEMPLATE: WorkflowState = {
+    "location": "",
+    "latitude": None,
+    "longitude": None,
+    "current_weather": None,
+    "forecast_data": None,
+    "weather_prompts": None,
+    "data_analysis": None,
+    "forecast_analysis": None,
+    "advice_report": None,
+    "rag_knowledge": None,
+    "error": None,
+    "audience": "general"
+}
+
+
 class WeatherInsightsResult(BaseModel):
     """Final result from weather insights workflow"""
     location: str
@@ -49,28 +125,51 @@ class WeatherInsightsWorkflow:
         self,
         openai_api_key: str,
         openweather_api_key: str,
-        qdrant_url: str = "http://localhost:6333"
+        qdrant_url: str = "http://localhost:6333",
+        batch_concurrency: int = BATCH_CONCURRENCY,
+        llm_model: str = DEFAULT_LLM_MODEL,
+        redis_url: Optional[str] = None,
+        checkpoint_path: Optional[str] = None
     ):
+        self.batch_concurrency = batch_concurrency
+        self._redis = self._connect_redis(redis_url) if redis_url else None
+        self.checkpoint_path = checkpoint_path  # SQLite file; checkpointing is opened in warmup()
+        self._checkpoint_conn = None
+        self._checkpointed = None  # Graph compiled with the checkpointer, used for runs with a request_id
+        
         # Initialize LLM
         self.llm = ChatOpenAI(
-            model="gpt-3.5-turbo",
+            model=llm_model,  # gpt-4o family and newer get automatic prompt-prefix caching
             api_key=openai_api_key,
             temperature=0.3  # Slightly creative but focused
         )
         
+        # Shared HTTP/2 connection pool for outbound REST calls
+        self._http = httpx.AsyncClient(
+            http2=True,
+            timeout=10.0,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=50)
+        )
+        
         # Initialize services
-        self.weather_service = OpenWeatherService(openweather_api_key)
+        self.weather_service = OpenWeatherService(openweather_api_key, client=self._http)
         self.rag_service = RAGService(qdrant_url)
+        self.llm_cache = LLMResponseCache()  # Exact-match only: prompts embed the location and readings
+        self._weather_cache = OrderedDict()  # key -> (expires_at, current_weather, forecast_data, prompts)
+        self._weather_locks = defaultdict(asyncio.Lock)  # One in-flight fetch per cache key
+        self._retired_keys: Dict[str, float] = {}  # node-cache key -> when a failed run retired it
         
         # Initialize agents
         self.data_agent = DataAgent(self.llm)
         self.forecast_agent = ForecastAgent(self.llm)
-        self.advice_agent = AdviceAgent(self.llm)
+        self.advice_agent = AdviceAgent(self.llm, self.llm_cache)
+        self.analysis_agent = AnalysisAgent(self.llm, self.data_agent, self.forecast_agent, self.llm_cache)
         
-        # Build workflow graph
+        # Build workflow graph; both compiled graphs share one node cache
+        self._node_cache = InMemoryCache()
         self.workflow = self._build_workflow()
     
-    def _build_workflow(self) -> StateGraph:
+    def _build_workflow(self, checkpointer: Any = None) -> StateGraph:
         """Build the LangGraph workflow"""
         
         # Create workflow graph
@@ -78,20 +177,31 @@ class WeatherInsightsWorkflow:
         
         # Add nodes
         workflow.add_node("fetch_weather", self._fetch_weather_data)
-        workflow.add_node("analyze_data", self._analyze_data_quality)
-        workflow.add_node("forecast_analysis", self._analyze_forecast)
-        workflow.add_node("retrieve_knowledge", self._retrieve_relevant_knowledge)
+        workflow.add_node(
+            "analyze_all",
+            self._analyze_all,
+            cache_policy=CachePolicy(key_func=self._node_cache_key(_analysis_cache_key), ttl=NODE_CACHE_TTL)
+        )
+        workflow.add_node(
+            "retrieve_knowledge",
+            self._retrieve_relevant_knowledge,
+            cache_policy=CachePolicy(key_func=self._node_cache_key(_knowledge_cache_key), ttl=NODE_CACHE_TTL)
+        )
         workflow.add_node("generate_advice", self._generate_recommendations)
         
         # Define workflow edges
         workflow.set_entry_point("fetch_weather")
-        workflow.add_edge("fetch_weather", "analyze_data")
-        workflow.add_edge("analyze_data", "forecast_analysis")
-        workflow.add_edge("forecast_analysis", "retrieve_knowledge")
+        workflow.add_edge("fetch_weather", "analyze_all")
+        workflow.add_conditional_edges(
+            "analyze_all",
+            self._route_after_analysis,
+            {"retrieve_knowledge": "retrieve_knowledge", "generate_advice": "generate_advice"}
+        )
         workflow.add_edge("retrieve_knowledge", "generate_advice")
         workflow.add_edge("generate_advice", END)
         
-        return workflow.compile()
+        # Repeat requests replay cached node writes instead of re-running Qdrant and the LLM
+        return workflow.compile(cache=self._node_cache, checkpointer=checkpointer)
     
     async def _fetch_weather_data(self, state: WorkflowState) -> WorkflowState:
         """Node 1: Fetch current weather and forecast data"""
@@ -106,67 +216,92 @@ class WeatherInsightsWorkflow:
             else:
                 lat, lon = state["latitude"], state["longitude"]
             
-            # Fetch current weather and forecast in parallel
-            current_weather_task = self.weather_service.get_current_weather(lat, lon, location)
-            forecast_task = self.weather_service.get_forecast(lat, lon, location)
+            # Reuse recently fetched data for the same location
+            cache_key = (location.strip().lower(), lat, lon)
+            cached = self._cached_weather(cache_key)
+            if cached is None:
+                # Concurrent requests for one location (e.g. in a batch) share a single fetch
+                try:
+                    async with self._weather_locks[cache_key]:
+                        cached = self._cached_weather(cache_key)
+                        if cached is None:
+                            cached = await self._fetch_and_cache_weather(cache_key, lat, lon, location)
+                finally:
+                    self._weather_locks.pop(cache_key, None)
             
-            current_weather, forecast_data = await asyncio.gather(
-                current_weather_task,
-                forecast_task
-            )
-            
-            state["current_weather"] = current_weather
-            state["forecast_data"] = forecast_data
+            state["current_weather"], state["forecast_data"], state["weather_prompts"] = cached
             
         except Exception as e:
             state["error"] = f"Weather data fetch failed: {str(e)}"
         
         return state
     
-    async def _analyze_data_quality(self, state: WorkflowState) -> WorkflowState:
-        """Node 2: Analyze weather data quality using Data Agent"""
-        try:
-            current_weather = state.get("current_weather")
-            forecast_data = state.get("forecast_data")
-            
-            if not current_weather or not forecast_data:
-                state["error"] = "Missing weather data for analysis"
-                return state
-            
-            # Analyze current weather data quality
-            data_analysis = await self.data_agent.process_weather_data(current_weather)
-            state["data_analysis"] = data_analysis
-            
-        except Exception as e:
-            state["error"] = f"Data analysis failed: {str(e)}"
+    def _cached_weather(self, cache_key: tuple) -> Optional[Tuple[WeatherData, ForecastData, WeatherPrompts]]:
+        """Fresh (current_weather, forecast_data, prompts) for the key, or None"""
+        cached = self._weather_cache.get(cache_key)
+        if cached and cached[0] > time.monotonic():
+            self._weather_cache.move_to_end(cache_key)
+            return cached[1:]
+        return None
+    
+    async def _fetch_and_cache_weather(
+        self,
+        cache_key: tuple,
+        lat: float,
+        lon: float,
+        location: str
+    ) -> Tuple[WeatherData, ForecastData, WeatherPrompts]:
+        """Fetch current weather and forecast in parallel, render their prompt text, and cache
+        all of it for WEATHER_CACHE_TTL"""
+        current_weather, forecast_data = await asyncio.gather(
+            self.weather_service.get_current_weather(lat, lon, location),
+            self.weather_service.get_forecast(lat, lon, location)
+        )
+        prompts = self.analysis_agent.render_prompts(current_weather, forecast_data)
         
-        return state
+        self._weather_cache[cache_key] = (
+            time.monotonic() + WEATHER_CACHE_TTL, current_weather, forecast_data, prompts
+        )
+        self._weather_cache.move_to_end(cache_key)
+        while len(self._weather_cache) > WEATHER_CACHE_MAX_ENTRIES:
+            self._weather_cache.popitem(last=False)
+        
+        return current_weather, forecast_data, prompts
+    
+    # Analysis nodes return only the keys they write
     
-    async def _analyze_forecast(self, state: WorkflowState) -> WorkflowState:
-        """Node 3: Analyze forecast and predict implications using Forecast Agent"""
+    async def _analyze_all(self, state: WorkflowState) -> Dict[str, Any]:
+        """Nodes 2-3: Data quality and forecast analysis in one LLM call (Data + Forecast Agents)"""
         try:
             current_weather = state.get("current_weather")
             forecast_data = state.get("forecast_data")
             
             if not current_weather or not forecast_data:
-                state["error"] = "Missing weather data for forecast analysis"
-                return state
+                return {"error": "Missing weather data for analysis"}
             
-            # Generate forecast insights
             audience = state.get("audience", "general")
-            forecast_analysis = await self.forecast_agent.analyze_forecast(
-                current_weather, 
+            data_analysis, forecast_analysis = await self.analysis_agent.process_combined(
+                current_weather,
                 forecast_data,
-                audience
+                audience,
+                state.get("weather_prompts")
             )
-            state["forecast_analysis"] = forecast_analysis
+            return {"data_analysis": data_analysis, "forecast_analysis": forecast_analysis}
             
         except Exception as e:
-            state["error"] = f"Forecast analysis failed: {str(e)}"
-        
-        return state
+            return {"error": f"Weather analysis failed: {str(e)}"}
+    
+    def _route_after_analysis(self, state: WorkflowState) -> str:
+        """Skip the embedding + Qdrant round trip for benign weather with no risk alerts"""
+        forecast_analysis = state.get("forecast_analysis")
+        current_weather = state.get("current_weather")
+        if not forecast_analysis or not current_weather:
+            return "generate_advice"  # Nothing to search with; advice reports the missing data
+        if forecast_analysis.risk_alerts or current_weather.weather_condition in SEVERE_CONDITIONS:
+            return "retrieve_knowledge"
+        return "generate_advice"
     
-    async def _retrieve_relevant_knowledge(self, state: WorkflowState) -> WorkflowState:
+    async def _retrieve_relevant_knowledge(self, state: WorkflowState) -> Dict[str, Any]:
         """Node 4: Retrieve relevant knowledge from RAG system"""
         try:
             current_weather = state.get("current_weather")
@@ -174,8 +309,7 @@ class WeatherInsightsWorkflow:
             audience = state.get("audience", "general")
             
             if not current_weather or not forecast_analysis:
-                state["error"] = "Missing data for knowledge retrieval"
-                return state
+                return {"error": "Missing data for knowledge retrieval"}
             
             # Create search query from weather conditions and insights
             weather_conditions = f"{current_weather.weather_condition} {current_weather.description}"
@@ -191,12 +325,10 @@ class WeatherInsightsWorkflow:
                 audience=audience
             )
             
-            state["rag_knowledge"] = relevant_knowledge
+            return {"rag_knowledge": relevant_knowledge}
             
         except Exception as e:
-            state["error"] = f"Knowledge retrieval failed: {str(e)}"
-        
-        return state
+            return {"error": f"Knowledge retrieval failed: {str(e)}"}
     
     async def _generate_recommendations(self, state: WorkflowState) -> WorkflowState:
         """Node 5: Generate actionable advice using Advice Agent"""
@@ -228,40 +360,211 @@ class WeatherInsightsWorkflow:
         location: str,
         audience: str = "general",
         latitude: Optional[float] = None,
-        longitude: Optional[float] = None
+        longitude: Optional[float] = None,
+        request_id: Optional[str] = None
     ) -> WeatherInsightsResult:
-        """Run complete weather insights analysis workflow"""
-        
-        # Initialize workflow state
-        initial_state: WorkflowState = {
-            "location": location,
-            "latitude": latitude,
-            "longitude": longitude,
-            "current_weather": None,
-            "forecast_data": None,
-            "data_analysis": None,
-            "forecast_analysis": None,
-            "advice_report": None,
-            "rag_knowledge": None,
-            "error": None,
-            "audience": audience
-        }
+        """Run complete weather insights analysis workflow
+        
+        With checkpointing enabled, a retry carrying the same request_id resumes the earlier run
+        instead of starting over.
+        """
+        
+        result_key = self._result_cache_key(location, audience, latitude, longitude)
+        cached = await self._get_cached_result(result_key)
+        if cached is not None:
+            return cached if cached.location == location else cached.model_copy(update={"location": location})
+        
+        final_state = None
+        graph, config = self._graph_for(location, audience, request_id)
+        if config is not None:
+            resume_config, final_state = await self._resume_point(config)
+            if resume_config is not None:
+                final_state = await graph.ainvoke(None, resume_config)
+        
+        if final_state is None:
+            initial_state = self._initial_state(location, audience, latitude, longitude)
+            
+            # Execute workflow
+            final_state = await graph.ainvoke(initial_state, config)
+        
+        self._evict_failed(final_state)
+        result = self._build_result(location, final_state)
+        if result.success:
+            await self._store_result(result_key, result)
+        return result
+    
+    async def stream_analysis(
+        self,
+        location: str,
+        audience: str = "general",
+        latitude: Optional[float] = None,
+        longitude: Optional[float] = None,
+        request_id: Optional[str] = None
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """Run the workflow, yielding ("stage", node) as each node finishes, ("partial", {key: value})
+        for each analysis as soon as it is available, and ("result", result) last"""
+        
+        state = self._initial_state(location, audience, latitude, longitude)
+        graph, config = self._graph_for(location, audience, request_id)
+        graph_input, finished = state, False
+        if config is not None:
+            resume_config, saved = await self._resume_point(config)
+            if saved is not None:
+                state = {**state, **saved}
+                graph_input, config = None, resume_config
+                finished = resume_config is None  # The earlier run already completed
         
-        # Execute workflow
-        final_state = await self.workflow.ainvoke(initial_state)
+        if not finished:
+            async for update in graph.astream(graph_input, config, stream_mode="updates"):
+                for node, node_state in update.items():
+                    if node.startswith("__"):
+                        continue  # e.g. __metadata__ marking a node-cache hit
+                    node_state = dict(node_state or {})
+                    node_state["error"] = keep_first_error(state["error"], node_state.get("error"))
+                    partial = {
+                        key: node_state[key] for key in PARTIAL_RESULT_KEYS
+                        if node_state.get(key) is not None and state.get(key) is None
+                    }
+                    state.update(node_state)
+                    yield "stage", node
+                    
+                    if partial and not state["error"]:
+                        yield "partial", partial
+        
+        self._evict_failed(state)
+        yield "result", self._build_result(location, state)
+    
+    def _initial_state(
+        self,
+        location: str,
+        audience: str,
+        latitude: Optional[float],
+        longitude: Optional[float]
+    ) -> WorkflowState:
+        """Initialize workflow state from the shared template"""
+        state = _STATE_TEMPLATE.copy()
+        state["location"] = location
+        state["latitude"] = latitude
+        state["longitude"] = longitude
+        state["audience"] = audience
+        return state
+    
+    def _graph_for(self, location: str, audience: str, request_id: Optional[str]) -> Tuple[Any, Optional[Dict[str, Any]]]:
+        """Compiled graph and run config for a request
+        
+        Only runs with a request_id use the checkpointed graph, which requires a thread_id;
+        everything else runs on the plain graph without writing checkpoints.
+        """
+        if self._checkpointed is None or not request_id:
+            return self.workflow, None
+        thread_id = f"{location.strip().lower()}:{audience}:{request_id}"
+        return self._checkpointed, {"configurable": {"thread_id": thread_id}}
+    
+    async def _resume_point(
+        self,
+        config: Dict[str, Any]
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[WorkflowState]]:
+        """Where an earlier run of this thread left off: (config to continue from, state saved there)
+        
+        A completed run gives (None, final state) and a new thread (None, None). A failed run
+        continues from the last checkpoint before its first error, so nodes that already
+        succeeded are not executed again.
+        """
+        latest = await self._checkpointed.aget_state(config)
+        if not latest.values:
+            return None, None
+        if not latest.values.get("error"):
+            return (config if latest.next else None), latest.values
+        
+        async for snapshot in self._checkpointed.aget_state_history(config):
+            if snapshot.next and not snapshot.values.get("error"):
+                return snapshot.config, snapshot.values
+        return None, None
+    
+    async def _open_checkpointer(self):
+        """Recompile the graph with a SQLite checkpointer (optional dependency)"""
+        if not self.checkpoint_path or self._checkpoint_conn is not None:
+            return
+        try:
+            import aiosqlite
+            from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+        except ImportError:
+            logger.warning("⚠️ langgraph-checkpoint-sqlite not installed, checkpointing disabled")
+            return
+        
+        self._checkpoint_conn = await aiosqlite.connect(self.checkpoint_path)
+        self._checkpointed = self._build_workflow(checkpointer=AsyncSqliteSaver(self._checkpoint_conn))
+    
+    @staticmethod
+    def _connect_redis(redis_url: str):
+        """Redis client for the result cache, or None when the optional redis package is missing"""
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            logger.warning("⚠️ redis package not installed, result cache disabled")
+            return None
+        return redis.Redis.from_url(redis_url)
+    
+    @staticmethod
+    def _result_cache_key(
+        location: str,
+        audience: str,
+        latitude: Optional[float],
+        longitude: Optional[float]
+    ) -> str:
+        window = int(time.time() // RESULT_CACHE_WINDOW)
+        return f"wi:{location.strip().lower()}:{audience}:{latitude}:{longitude}:{window}"
+    
+    async def _get_cached_result(self, key: str) -> Optional[WeatherInsightsResult]:
+        """Cached result for the key; cache errors count as misses"""
+        if self._redis is None:
+            return None
+        try:
+            raw = await self._redis.get(key)
+            return WeatherInsightsResult.model_validate_json(raw) if raw else None
+        except Exception as e:
+            logger.warning("⚠️ Result cache read failed: %s", e)
+            return None
+    
+    async def _store_result(self, key: str, result: WeatherInsightsResult):
+        """Store a successful result; cache errors never fail the request"""
+        if self._redis is None:
+            return
+        try:
+            await self._redis.setex(key, RESULT_CACHE_TTL, result.model_dump_json())
+        except Exception as e:
+            logger.warning("⚠️ Result cache write failed: %s", e)
+    
+    def _node_cache_key(self, key_func: Callable[[WorkflowState], str]) -> Callable[[WorkflowState], str]:
+        """Wrap a node cache key so entries written by a failed run can be retired one by one"""
+        def cache_key(state: WorkflowState) -> str:
+            key = key_func(state)
+            retired_at = self._retired_keys.get(key)
+            return key if retired_at is None else f"{key}@{retired_at}"
+        return cache_key
+    
+    def _evict_failed(self, final_state: WorkflowState):
+        """Failures are returned as state, so the node cache would keep them; retire this run's keys instead
+        
+        Only the failing run's entries stop matching; other locations and audiences stay warm.
+        Retirements outlive the cached entry by at most NODE_CACHE_TTL, then are pruned.
+        """
+        if not final_state.get("error"):
+            return
+        now = time.monotonic()
+        self._retired_keys = {
+            key: retired_at for key, retired_at in self._retired_keys.items()
+            if now - retired_at < NODE_CACHE_TTL
+        }
+        for key_func in (_analysis_cache_key, _knowledge_cache_key):
+            self._retired_keys[key_func(final_state)] = now
+    
+    def _build_result(self, location: str, final_state: WorkflowState) -> WeatherInsightsResult:
+        """Compile the final workflow state into a result"""
         
         # Check for errors
         if final_state.get("error"):
-            return WeatherInsightsResult(
-                location=location,
-                analysis_time=datetime.now(PHILIPPINE_TZ),
-                data_quality=None,
-                forecast_insights=None,
-                recommendations=None,
-                relevant_knowledge=[],
-                success=False,
-                error_message=final_state["error"]
-            )
+            return self._error_result(location, final_state["error"], datetime.now(PHILIPPINE_TZ))
         
         # Compile successful result
         return WeatherInsightsResult(
@@ -270,10 +573,24 @@ class WeatherInsightsWorkflow:
             data_quality=final_state["data_analysis"],
             forecast_insights=final_state["forecast_analysis"],
             recommendations=final_state["advice_report"],
-            relevant_knowledge=final_state.get("rag_knowledge", []),
+            relevant_knowledge=final_state.get("rag_knowledge") or [],
             success=True
         )
     
+    @staticmethod
+    def _error_result(location: str, message: str, analysis_time: datetime) -> WeatherInsightsResult:
+        """Failed-analysis result; built without validation since the analysis fields are empty"""
+        return WeatherInsightsResult.model_construct(
+            location=location,
+            analysis_time=analysis_time,
+            data_quality=None,
+            forecast_insights=None,
+            recommendations=None,
+            relevant_knowledge=[],
+            success=False,
+            error_message=message
+        )
+    
     async def run_batch_analysis(
         self,
         locations: List[str],
@@ -281,51 +598,96 @@ class WeatherInsightsWorkflow:
     ) -> List[WeatherInsightsResult]:
         """Run analysis for multiple locations in parallel"""
         
-        tasks = [
-            self.run_analysis(location, audience)
-            for location in locations
-        ]
+        semaphore = asyncio.Semaphore(self.batch_concurrency)
+        started = time.perf_counter()
+        
+        async def run_limited(location: str) -> WeatherInsightsResult:
+            async with semaphore:
+                return await self.run_analysis(location, audience)
+        
+        # Locations repeated in a batch (ignoring case/whitespace) share one analysis and its LLM calls
+        unique_locations: Dict[str, str] = {}
+        for location in locations:
+            unique_locations.setdefault(location.strip().lower(), location)
+        
+        tasks = [run_limited(location) for location in unique_locations.values()]
         
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        unique_results = dict(zip(
+            unique_locations,
+            await asyncio.gather(*tasks, return_exceptions=True)
+        ))
         
-        # Handle any exceptions
+        # Timing per batch, for tuning batch_concurrency against upstream rate limits
+        logger.debug(
+            "⏱️ Batch of %d locations (%d unique) at concurrency %d took %.2fs",
+            len(locations), len(unique_locations), self.batch_concurrency, time.perf_counter() - started
+        )
+        
+        # Handle any exceptions; failures in one batch share a single timestamp
+        now = datetime.now(PHILIPPINE_TZ)
         final_results = []
-        for i, result in enumerate(results):
+        for location in locations:
+            result = unique_results[location.strip().lower()]
             if isinstance(result, Exception):
-                final_results.append(
-                    WeatherInsightsResult(
-                        location=locations[i],
-                        analysis_time=datetime.now(PHILIPPINE_TZ),
-                        data_quality=None,
-                        forecast_insights=None,
-                        recommendations=None,
-                        relevant_knowledge=[],
-                        success=False,
-                        error_message=str(result)
-                    )
-                )
+                final_results.append(self._error_result(location, str(result), now))
+            elif result.location != location:
+                final_results.append(result.model_copy(update={"location": location}))
             else:
                 final_results.append(result)
         
         return final_results
     
+    async def run_batch_analysis_iter(
+        self,
+        locations: List[str],
+        audience: str = "general"
+    ) -> AsyncIterator[Tuple[int, WeatherInsightsResult]]:
+        """Run analysis for multiple locations in parallel, yielding (index, result) as each finishes
+        
+        Indices refer to positions in locations; a repeated location yields once per position.
+        """
+        
+        semaphore = asyncio.Semaphore(self.batch_concurrency)
+        
+        positions: Dict[str, List[int]] = {}
+        for index, location in enumerate(locations):
+            positions.setdefault(location.strip().lower(), []).append(index)
+        
+        async def run_limited(key: str) -> Tuple[str, Any]:
+            async with semaphore:
+                try:
+                    return key, await self.run_analysis(locations[positions[key][0]], audience)
+                except Exception as e:
+                    return key, e
+        
+        tasks = [asyncio.create_task(run_limited(key)) for key in positions]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                key, result = await next_done
+                for index in positions[key]:
+                    location = locations[index]
+                    if isinstance(result, Exception):
+                        yield index, self._error_result(location, str(result), datetime.now(PHILIPPINE_TZ))
+                    elif result.location != location:
+                        yield index, result.model_copy(update={"location": location})
+                    else:
+                        yield index, result
+        finally:
+            # The consumer may stop early (e.g. a client disconnect); don't leave analyses running
+            for task in tasks:
+                task.cancel()
+    
     async def get_workflow_status(self) -> Dict[str, Any]:
         """Get workflow system status"""
         try:
-            # Test weather service
-            weather_status = "operational"
-            try:
-                await self.weather_service.get_coordinates("Manila")
-            except:
-                weather_status = "error"
-            
-            # Test RAG service
-            rag_status = "operational"
-            rag_stats = {}
-            try:
-                rag_stats = await self.rag_service.get_collection_stats()
-            except:
-                rag_status = "error"
+            # Probe the weather and RAG services concurrently
+            weather_res, rag_res = await asyncio.gather(
+                self._probe_weather(),
+                self._probe_rag(),
+                return_exceptions=True
+            )
+            weather_status = "error" if isinstance(weather_res, BaseException) else weather_res
+            rag_status, rag_stats = ("error", {}) if isinstance(rag_res, BaseException) else rag_res
             
             return {
                 "workflow": "operational",
@@ -347,6 +709,29 @@ class WeatherInsightsWorkflow:
                 "timestamp": datetime.now(PHILIPPINE_TZ).isoformat()
             }
     
-    def close(self):
-        """Clean up resources"""
-        self.rag_service.close()
\ No newline at end of file
+    async def _probe_weather(self) -> str:
+        """Test weather service with a live geocoding call (the coordinate cache is bypassed)"""
+        await self.weather_service._geocode("Manila")
+        return "operational"
+    
+    async def _probe_rag(self) -> Tuple[str, Dict[str, Any]]:
+        """Test RAG service, returning (status, collection stats)"""
+        return "operational", await self.rag_service.get_collection_stats()
+    
+    async def warmup(self):
+        """Open checkpointing, precompute per-audience prompts and set up the knowledge collection
+        before serving requests"""
+        await self._open_checkpointer()
+        await self.advice_agent.warmup()
+        await self.rag_service._ensure_initialized()
+    
+    async def aclose(self):
+        """Clean up resources: the shared HTTP pool, the Qdrant connection, the result cache
+        and the checkpoint database"""
+        await self.weather_service.aclose()
+        await self.rag_service.aclose()
+        await self._http.aclose()
+        if self._redis is not None:
+            await self._redis.aclose()
+        if self._checkpoint_conn is not None:
+            await self._checkpoint_conn.close()
\ No newline at end of file